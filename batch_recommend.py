@@ -0,0 +1,353 @@
+"""
+Bulk best-offer recommendations for many households.
+
+Input: one record per customer, CSV with header
+    customer_id,ref_kwh,ref_month,tariff_type,cycle,daily_fee,rates
+(rates space separated, as in a tariff catalog) or JSONL objects with the
+same keys (rates as a list). ref_month 0 means ref_kwh is annual.
+
+Estimated consumption is linear in ref_kwh, so the profile aggregate reduces
+to one kWh-per-reference-kWh vector per (cycle, month), and every catalog
+offer to one line cost = ref_kwh * slope[month] + fixed. These tables live
+in a single shared memory block that worker processes attach to. For each
+month the cheapest offer as a function of ref_kwh is the lower envelope of
+those lines, so finding a customer's best offer is a binary search.
+
+Records are read as a stream and processed in chunks; results are written in
+input order as CSV or JSONL and flushed per chunk. With --resume, records
+already present in the output are skipped (a partly written last line is
+dropped first).
+
+Usage:
+    python batch_recommend.py customers.csv --catalog example_catalog.csv --output recommendations.csv
+"""
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from multiprocessing import shared_memory
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import tariff_catalog
+import timing
+from portugal_tou import CYCLES
+from tariff_catalog import BILLED_PERIODS
+
+FIELDS = ('customer_id', 'ref_kwh', 'ref_month', 'tariff_type', 'cycle', 'daily_fee', 'rates')
+OUTPUT_FIELDS = ('customer_id', 'annual_kwh', 'current_cost', 'best_offer', 'best_cost', 'saving', 'error')
+OUTPUT_FORMATS = ('csv', 'jsonl')
+
+MONTHS = 13 # 0 (annual reference) and 1-12
+CHUNK_SIZE = 2000
+
+def iter_records(path):
+    """
+    Yields one tuple in FIELDS order per record (all values as read). A
+    JSONL line that is not a JSON object yields a ValueError naming
+    path:line instead, which Recommender.recommend turns into an error row.
+    """
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.jsonl'):
+            for lineno, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        data = json.loads(line)
+                        yield tuple(data.get(k) for k in FIELDS)
+                    except (ValueError, AttributeError):
+                        yield ValueError(f"{path}:{lineno}: not a JSON object")
+            return
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        missing = [k for k in FIELDS if k not in header]
+        if missing:
+            raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+        cols = [header.index(k) for k in FIELDS]
+        for row in reader:
+            if row:
+                yield tuple(row[i] if i < len(row) else '' for i in cols)
+
+def lower_envelope(slopes, fixed):
+    """
+    Lines y = slopes[i] * x + fixed[i]. Returns (line indices, breakpoints):
+    for x >= 0, line indices[j] is the minimum for breakpoints[j-1] <= x <
+    breakpoints[j].
+    """
+    order = sorted(range(len(slopes)), key=lambda i: (-slopes[i], fixed[i]))
+    hull = []
+    for i in order:
+        if hull and slopes[hull[-1]] == slopes[i]:
+            continue # same slope, higher fixed cost
+        while hull:
+            j = hull[-1]
+            # x from which i beats j
+            x = (fixed[i] - fixed[j]) / (slopes[j] - slopes[i])
+            if x <= 0 or (len(hull) >= 2 and x <= _crossing(slopes, fixed, hull[-2], j)):
+                hull.pop()
+            else:
+                break
+        hull.append(i)
+    breaks = [_crossing(slopes, fixed, hull[k], hull[k + 1]) for k in range(len(hull) - 1)]
+    return hull, breaks
+
+def _crossing(slopes, fixed, i, j):
+    return (fixed[j] - fixed[i]) / (slopes[i] - slopes[j])
+
+class SharedTables:
+    """
+    Per-reference-kWh consumption vectors and per-offer line coefficients in
+    one shared memory block of float64:
+        units[(cycle * MONTHS + month) * 3 + period]   (BILLED_PERIODS order)
+        slopes[offer * MONTHS + month]                 € per reference kWh
+        fixed[offer]                                   daily fee * days
+    """
+    def __init__(self, shm, noffers):
+        self.shm = shm
+        self.noffers = noffers
+        view = shm.buf.cast('d')
+        nunits = len(CYCLES) * MONTHS * len(BILLED_PERIODS)
+        self.units = view[:nunits]
+        self.slopes = view[nunits:nunits + noffers * MONTHS]
+        self.fixed = view[nunits + noffers * MONTHS:nunits + noffers * (MONTHS + 1)]
+        self._views = (view,)
+
+    @staticmethod
+    def size(noffers):
+        return 8 * (len(CYCLES) * MONTHS * len(BILLED_PERIODS) + noffers * (MONTHS + 1))
+
+    @classmethod
+    def create(cls, index, offers, days=365, column=portugal_tou.DEFAULT_COLUMN):
+        shm = shared_memory.SharedMemory(create=True, size=cls.size(len(offers)))
+        tables = cls(shm, len(offers))
+        units = []
+        for cycle_type in CYCLES:
+            for month in range(MONTHS):
+                tou = index.query(cycle_type, 1.0, month, column)
+                units.extend(tou.get(p, 0.0) for p in BILLED_PERIODS)
+        tables.units[:] = array('d', units)
+        tables.slopes[:] = array('d', [tables.slope(o.cycle, month, o.rates)
+                                       for o in offers for month in range(MONTHS)])
+        tables.fixed[:] = array('d', [o.daily_fee * days for o in offers])
+        return tables
+
+    @classmethod
+    def attach(cls, name, noffers):
+        return cls(shared_memory.SharedMemory(name=name), noffers)
+
+    def slope(self, cycle_type, month, rates):
+        base = (CYCLES.index(cycle_type) * MONTHS + month) * len(BILLED_PERIODS)
+        return sum(rates[p] * self.units[base + i] for i, p in enumerate(BILLED_PERIODS))
+
+    def annual_kwh(self, month):
+        base = month * len(BILLED_PERIODS)
+        return sum(self.units[base:base + len(BILLED_PERIODS)])
+
+    def close(self):
+        for v in (self.units, self.slopes, self.fixed) + self._views:
+            v.release()
+        self.shm.close()
+
+class Recommender:
+    """Best offer per record, from SharedTables (one envelope per month)."""
+    def __init__(self, tables, names, days=365):
+        self.tables = tables
+        self.names = names
+        self.days = days
+        n = tables.noffers
+        fixed = list(tables.fixed)
+        self.envelopes = []
+        for month in range(MONTHS):
+            slopes = [tables.slopes[o * MONTHS + month] for o in range(n)]
+            self.envelopes.append((lower_envelope(slopes, fixed), slopes, fixed))
+
+    def recommend(self, record):
+        """Returns a dict in OUTPUT_FIELDS order (error set instead of raising)."""
+        result = dict.fromkeys(OUTPUT_FIELDS, '')
+        if isinstance(record, ValueError): # unreadable input line, see iter_records
+            result['error'] = str(record)
+            return result
+        customer, ref_kwh, ref_month, tariff_type, cycle, daily_fee, rates = record
+        result['customer_id'] = customer
+        try:
+            kwh = float(ref_kwh)
+            month = int(ref_month or 0)
+            if kwh < 0 or not 0 <= month <= 12:
+                raise ValueError("ref_kwh must be >= 0 and ref_month 0-12")
+            if isinstance(rates, str):
+                rates = rates.split()
+            current = tariff_catalog.make_offer(customer, tariff_type, cycle or None, daily_fee, rates or [])
+        except (TypeError, ValueError) as e:
+            result['error'] = str(e)
+            return result
+
+        current_cost = kwh * self.tables.slope(current.cycle, month, current.rates) + current.daily_fee * self.days
+        result['annual_kwh'] = round(kwh * self.tables.annual_kwh(month), 2)
+        result['current_cost'] = round(current_cost, 2)
+        if self.tables.noffers:
+            (hull, breaks), slopes, fixed = self.envelopes[month]
+            best = hull[bisect.bisect_right(breaks, kwh)]
+            best_cost = kwh * slopes[best] + fixed[best]
+            result['best_offer'] = self.names[best]
+            result['best_cost'] = round(best_cost, 2)
+            result['saving'] = round(current_cost - best_cost, 2)
+        return result
+
+def format_rows(results, fmt):
+    if fmt == 'jsonl':
+        return ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in results)
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    writer.writerows([r[k] for k in OUTPUT_FIELDS] for r in results)
+    return buf.getvalue()
+
+# Worker state, set by _init_worker
+_recommender = None
+
+def _init_worker(name, noffers, names, days):
+    global _recommender
+    _recommender = Recommender(SharedTables.attach(name, noffers), names, days)
+
+def _process_chunk(task):
+    records, fmt = task
+    return len(records), format_rows([_recommender.recommend(r) for r in records], fmt)
+
+def completed_records(path, fmt):
+    """
+    Number of records already in an output file. A partly written last line
+    is truncated so appending continues on a clean line.
+    """
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return 0
+    with f:
+        lines = 0
+        last_newline = -1
+        offset = 0
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            pos = block.rfind(b'\n')
+            if pos >= 0:
+                last_newline = offset + pos
+            offset += len(block)
+        if last_newline + 1 < offset:
+            f.truncate(last_newline + 1)
+    return max(0, lines - (1 if fmt == 'csv' else 0))
+
+def _chunks(records, size, fmt):
+    it = iter(records)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk, fmt
+
+def run_batch(input_path, offers, output_path, fmt='csv', csv_path=None, column=portugal_tou.DEFAULT_COLUMN,
+              days=365, workers=None, resume=False, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Writes a recommendation for every record of input_path to output_path.
+    progress(done, elapsed seconds) is called after each chunk.
+    Returns (records processed in this run, elapsed seconds).
+    """
+    offers = list(offers)
+    index = portugal_tou.get_tou_index(csv_path or portugal_tou.find_profile())
+    skip = completed_records(output_path, fmt) if resume else 0
+    mode = 'a' if resume and os.path.exists(output_path) else 'w'
+    names = [o.name for o in offers]
+
+    tables = SharedTables.create(index, offers, days, column)
+    started = time.perf_counter()
+    done = 0
+    try:
+        with open(output_path, mode, encoding='utf-8', newline='') as out, \
+                timing.phase('batch.recommend') as phase:
+            if fmt == 'csv' and mode == 'w':
+                out.write(','.join(OUTPUT_FIELDS) + '\n')
+            tasks = _chunks(itertools.islice(iter_records(input_path), skip, None), chunk_size, fmt)
+
+            workers = workers or os.cpu_count() or 1
+            if workers == 1:
+                _init_worker(tables.shm.name, len(offers), names, days)
+                results = map(_process_chunk, tasks)
+                pool = None
+            else:
+                pool = multiprocessing.Pool(workers, _init_worker, (tables.shm.name, len(offers), names, days))
+                results = pool.imap(_process_chunk, tasks)
+            try:
+                for count, text in results:
+                    out.write(text)
+                    out.flush()
+                    done += count
+                    if progress:
+                        progress(skip + done, time.perf_counter() - started)
+            except BaseException:
+                if pool is not None:
+                    pool.terminate()
+                raise
+            finally:
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+            phase.rows = done
+    finally:
+        global _recommender
+        if _recommender is not None and _recommender.tables.shm.name == tables.shm.name:
+            _recommender.tables.close()
+            _recommender = None
+        tables.close()
+        tables.shm.unlink()
+    return done, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend the cheapest catalog offer for many customers.")
+    parser.add_argument("records", help="Customer records (CSV, or JSONL with a .jsonl extension)")
+    parser.add_argument("--catalog", required=True, help="Offers to choose from (CSV or JSON catalog)")
+    parser.add_argument("--output", required=True, help="Output file")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="Output format (default: from the output extension, else csv)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"Records per work unit (default: {CHUNK_SIZE})")
+    parser.add_argument("--resume", action='store_true', help="Skip records already in the output file")
+    parser.add_argument("--days", type=int, default=365, help="Billing days per year (default: 365)")
+    parser.add_argument("--btn-class", choices=['A', 'B', 'C'], default='C', help="Load profile class (default: C)")
+    parser.add_argument("--profile-year", type=int, help="Year of the load profile in rlp/ (default: latest)")
+    args = parser.parse_args()
+
+    fmt = args.format or ('jsonl' if args.output.endswith('.jsonl') else 'csv')
+    try:
+        offers = list(tariff_catalog.iter_catalog(args.catalog))
+        csv_path = portugal_tou.find_profile(args.profile_year)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    last = [0.0]
+    def progress(done, elapsed):
+        if elapsed - last[0] >= 5:
+            last[0] = elapsed
+            print(f"  {done} records, {done / elapsed:.0f} records/s", file=sys.stderr)
+
+    try:
+        done, elapsed = run_batch(args.records, offers, args.output, fmt, csv_path, f"BTN {args.btn_class} - Wh",
+                                  args.days, args.workers, args.resume, args.chunk_size, progress)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    rate = f"{done / elapsed:.0f}" if elapsed > 0 else '-'
+    print(f"Wrote {done} recommendations to {args.output} in {elapsed:.2f} s ({rate} records/s)")
+
+if __name__ == "__main__":
+    main()
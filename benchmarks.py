@@ -0,0 +1,237 @@
+"""
+Reproducible performance benchmarks.
+
+Times period classification, profile loading, TOU aggregation, cost
+evaluation, PV/battery simulation, smart-meter ingest and end-to-end CLI
+latency. Synthetic
+multi-year, multi-customer meter data is generated locally with a fixed seed.
+
+Usage:
+    python benchmarks.py                         # print results
+    python benchmarks.py --save baseline.json    # record a baseline
+    python benchmarks.py --compare baseline.json --threshold 0.25
+        # exit status 1 if any benchmark is more than 25% slower than the baseline
+    python benchmarks.py --quick --only classify # smaller datasets, subset of benchmarks
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import meter_ingest
+import portugal_tou
+import rlp_store
+import solar
+import tariff_catalog
+from price_comparison_argparse import get_tou_cost
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RLP_PATH = portugal_tou.find_profile()
+
+BENCHMARKS = []
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+class Context:
+    def __init__(self, quick, tmpdir, repeat):
+        self.quick = quick
+        self.tmpdir = tmpdir
+        self.repeat = repeat
+        self.results = {}
+
+    def measure(self, name, fn, items=1, repeat=None):
+        """Runs fn `repeat` times and records the best and median wall time."""
+        times = []
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+        best = min(times)
+        self.results[name] = {
+            'seconds': best,
+            'median': statistics.median(times),
+            'items': items,
+            'items_per_sec': items / best if best > 0 else None,
+        }
+        return best
+
+def make_meter_file(path, customers, years, seed=2025):
+    """Writes a synthetic E-REDES style export (kW, end-labelled, decimal comma)."""
+    rng = random.Random(seed)
+    step = datetime.timedelta(minutes=15)
+    start = datetime.datetime(2024, 1, 1)
+    slots = int((datetime.datetime(2024 + years, 1, 1) - start) / step)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("CPE;Data;Hora;Consumo registado (kW)\n")
+        for c in range(customers):
+            cpe = f"PT{c:016d}XX"
+            base = rng.uniform(0.1, 0.4)
+            dt = start
+            for _ in range(slots):
+                end = dt + step
+                hora = '24:00' if end.hour == 0 and end.minute == 0 else f"{end.hour:02d}:{end.minute:02d}"
+                day = dt if hora == '24:00' else end
+                kw = base * (1.5 if 18 <= dt.hour < 22 else 1.0) + rng.random() * 0.2
+                f.write(f"{cpe};{day.year}/{day.month:02d}/{day.day:02d};{hora};{kw:.3f}".replace('.', ',') + "\n")
+                dt = end
+    return customers * slots
+
+@benchmark
+def classify(ctx):
+    start = datetime.datetime(2025, 1, 1)
+    timestamps = [start + datetime.timedelta(minutes=15 * i) for i in range(365 * 96)]
+    for cycle_type in portugal_tou.CYCLES:
+        cycle = portugal_tou.PortugueseTOUCycle(cycle_type)
+        cycle.classify(timestamps[:96]) # compile tables outside the timing
+        ctx.measure(f"classify.get_period_name.{cycle_type}",
+                    lambda: [cycle.get_period_name(dt) for dt in timestamps], len(timestamps))
+        ctx.measure(f"classify.bulk.{cycle_type}", lambda: cycle.classify(timestamps), len(timestamps))
+
+@benchmark
+def profile(ctx):
+    csv_path = os.path.join(ctx.tmpdir, 'rlp.csv')
+    shutil.copyfile(RLP_PATH, csv_path)
+    rows = len(rlp_store.parse_csv(csv_path)[1])
+
+    ctx.measure("profile.parse_csv", lambda: rlp_store.parse_csv(csv_path), rows, repeat=1)
+    rlp_store.load_profile(csv_path)
+    ctx.measure("profile.load_cached", lambda: rlp_store.load_profile(csv_path), rows)
+
+    profile = rlp_store.load_profile(csv_path)
+    ctx.measure("profile.build_tou_index", lambda: portugal_tou.build_tou_index(profile), rows, repeat=1)
+
+    portugal_tou.get_tou_index(csv_path)
+    queries = 10000
+    for cycle_type in portugal_tou.CYCLES:
+        ctx.measure(f"profile.load_and_calculate_tou.{cycle_type}",
+                    lambda: [portugal_tou.load_and_calculate_tou(csv_path, cycle_type, 100 + i, i % 13)
+                             for i in range(queries)], queries)
+
+@benchmark
+def costs(ctx):
+    rng = random.Random(1)
+    n = 10000 if ctx.quick else 100000
+    consumption = tariff_catalog.estimate_consumption(RLP_PATH, 3500, 0)
+    rates = [tariff_catalog.map_rates([rng.uniform(0.15, 0.25), rng.uniform(0.1, 0.18), rng.uniform(0.05, 0.12)],
+                                      'tri-hourly') for _ in range(n)]
+    daily = consumption['daily']
+    ctx.measure("costs.get_tou_cost", lambda: [get_tou_cost(daily, r, 0.3) for r in rates], n)
+
+    offers = [tariff_catalog.Offer(str(i), 'tri-hourly', rng.choice(portugal_tou.CYCLES), rng.uniform(0.2, 0.4), r)
+              for i, r in enumerate(rates)]
+    catalog = tariff_catalog.TariffCatalog(offers)
+    ctx.measure("costs.catalog_rank", lambda: list(catalog.rank(consumption, 10)), n)
+
+@benchmark
+def pv(ctx):
+    timestamps, kwh = portugal_tou.scaled_consumption(RLP_PATH, 3500, 0)
+    generation = solar.pv_model(timestamps)
+    codes = portugal_tou.PortugueseTOUCycle('daily').classify_epoch(timestamps)
+    pv_sizes = [0.5 * i for i in range(1, 11 if ctx.quick else 21)]
+    battery_sizes = [0.0, 5.0, 10.0] if ctx.quick else [0.0, 2.5, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 40.0, 50.0]
+    systems = len(pv_sizes) * len(battery_sizes)
+    ctx.measure(f"pv.sweep.{systems}", lambda: solar.sweep(kwh, generation, codes, pv_sizes, battery_sizes),
+                systems * len(kwh), repeat=1)
+
+@benchmark
+def meter(ctx):
+    customers, years = (2, 1) if ctx.quick else (10, 3)
+    path = os.path.join(ctx.tmpdir, 'meter.csv')
+    rows = make_meter_file(path, customers, years)
+
+    def ingest():
+        agg = meter_ingest.MeterAggregator()
+        agg.consume_quarter_hours(meter_ingest.iter_quarter_hours(path, meter_ingest.EREDES_FORMAT))
+        return agg
+    ctx.measure(f"meter.ingest.{customers}x{years}y", ingest, rows, repeat=1)
+
+@benchmark
+def cli(ctx):
+    script = os.path.join(HERE, 'price_comparison_argparse.py')
+    commands = {
+        'simple': ['--price1', '0.15', '--fee1', '0.50', '--price2', '0.14', '--fee2', '0.60', '--ref-kwh', '3500'],
+        'tou': ['--tariff-type', 'bi-hourly', '--cycle', 'daily', '--price1', '0.20', '0.10', '--fee1', '0.50',
+                '--price2', '0.18', '0.12', '--fee2', '0.40', '--ref-kwh', '500', '--ref-month', '1'],
+    }
+    for name, argv in commands.items():
+        cmd = [sys.executable, script] + argv
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL) # warm caches
+        ctx.measure(f"cli.{name}", lambda: subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL))
+
+def compare_results(results, baseline, threshold):
+    """
+    Returns [(name, baseline seconds, current seconds, ratio)] for benchmarks
+    slower than baseline by more than threshold (0.25 = 25%).
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get('seconds'):
+            continue
+        ratio = current['seconds'] / previous['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((name, previous['seconds'], current['seconds'], ratio))
+    return regressions
+
+def run(names=None, quick=False, repeat=5):
+    tmpdir = tempfile.mkdtemp(prefix='tou_bench_')
+    try:
+        ctx = Context(quick, tmpdir, repeat)
+        for func in BENCHMARKS:
+            if names and func.__name__ not in names:
+                continue
+            func(ctx)
+        return ctx.results
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run performance benchmarks.")
+    parser.add_argument("--only", nargs='+', choices=[f.__name__ for f in BENCHMARKS],
+                        help="Run only these benchmark groups")
+    parser.add_argument("--quick", action='store_true', help="Use smaller synthetic datasets")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per benchmark (default: 5)")
+    parser.add_argument("--save", metavar="PATH", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown vs baseline before failing (default: 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = run(args.only, args.quick, args.repeat)
+
+    print(f"{'benchmark':<45} {'best (ms)':>12} {'median (ms)':>12} {'items/s':>14}")
+    for name, r in results.items():
+        rate = f"{r['items_per_sec']:.0f}" if r['items_per_sec'] else '-'
+        print(f"{name:<45} {r['seconds'] * 1000:>12.3f} {r['median'] * 1000:>12.3f} {rate:>14}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'quick': args.quick, 'results': results}, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(results, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}.")
+
+if __name__ == "__main__":
+    main()
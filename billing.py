@@ -0,0 +1,128 @@
+"""
+Consumption and cost over arbitrary billing periods.
+
+For each cycle and TOU period, a cumulative sum of the profile's Wh is kept
+per 15-minute slot, so the profile energy of any date range is the
+difference of two entries. A bill covering e.g. 15 January to 14 February
+then scales the profile directly (instead of a whole calendar month), and
+any other range can be estimated and costed with the daily fee prorated to
+its actual number of days.
+
+Dates are mapped onto the profile's year by month and day (29 February
+counts as the 28th); a range that runs past 31 December continues from
+1 January of the profile.
+"""
+import datetime
+import functools
+import itertools
+import os
+from array import array
+from bisect import bisect_left
+
+import portugal_tou
+import rlp_store
+import timing
+from portugal_tou import CYCLES, DEFAULT_COLUMN, PERIODS
+
+class BillingIndex:
+    """
+    prefix[cycle][code][i]: profile Wh of period `code` in slots [0, i).
+    """
+    def __init__(self, timestamps, prefix, year):
+        self.timestamps = timestamps
+        self.prefix = prefix
+        self.year = year
+        self.year_days = (datetime.date(year + 1, 1, 1) - datetime.date(year, 1, 1)).days
+
+    def _slot(self, date):
+        return bisect_left(self.timestamps, rlp_store.to_epoch(datetime.datetime(date.year, date.month, date.day)))
+
+    def _redate(self, date):
+        try:
+            return date.replace(year=self.year)
+        except ValueError: # 29 February
+            return datetime.date(self.year, 2, 28)
+
+    def _slot_ranges(self, start, end):
+        """[(first slot, end slot)] covering start..end inclusive, on the profile's year."""
+        days = (end - start).days + 1
+        if days < 1:
+            raise ValueError(f"Billing period ends ({end}) before it starts ({start})")
+        if days > self.year_days:
+            raise ValueError(f"Billing period of {days} days is longer than the profile year")
+        first = self._redate(start)
+        stop = first + datetime.timedelta(days=days)
+        next_year = datetime.date(self.year + 1, 1, 1)
+        if stop <= next_year:
+            return [(self._slot(first), self._slot(stop))]
+        wrapped = datetime.date(self.year, 1, 1) + (stop - next_year)
+        return [(self._slot(first), len(self.timestamps)), (0, self._slot(wrapped))]
+
+    def energy(self, cycle_type, start, end):
+        """Profile Wh per period (PERIODS order) from start to end, both inclusive."""
+        prefix = self.prefix[cycle_type]
+        totals = [0.0] * len(PERIODS)
+        for a, b in self._slot_ranges(start, end):
+            for code, cumulative in enumerate(prefix):
+                totals[code] += cumulative[b] - cumulative[a]
+        return totals
+
+    def total(self, start, end):
+        return sum(self.energy(CYCLES[0], start, end))
+
+    def scaling_factor(self, ref_kwh, ref_start, ref_end):
+        """Profile Wh -> kWh factor that makes the reference period consume ref_kwh."""
+        raw = self.total(ref_start, ref_end)
+        if raw <= 0:
+            raise ValueError(f"No profile data between {ref_start} and {ref_end}")
+        return ref_kwh / raw
+
+    def estimate(self, cycle_type, ref_kwh, ref_start, ref_end, start=None, end=None):
+        """
+        Scaled kWh per period for start..end (default: the whole profile
+        year), with Super Off Peak merged into Off Peak.
+        """
+        factor = self.scaling_factor(ref_kwh, ref_start, ref_end)
+        if start is None:
+            prefix = self.prefix[cycle_type]
+            wh = [cumulative[-1] for cumulative in prefix]
+        else:
+            wh = self.energy(cycle_type, start, end)
+        return portugal_tou.merge_super_off_peak(v * factor for v in wh)
+
+def billing_days(start, end):
+    """Number of days billed from start to end, both inclusive."""
+    return (end - start).days + 1
+
+def build_billing_index(profile, column=DEFAULT_COLUMN):
+    values = profile.column(column)
+    prefix = {}
+    with timing.phase('billing.build', len(values)):
+        for cycle_type in CYCLES:
+            codes = portugal_tou.PortugueseTOUCycle(cycle_type).classify_epoch(profile.timestamps)
+            prefix[cycle_type] = [
+                array('d', itertools.accumulate(
+                    (v if c == code and v == v else 0.0 for v, c in zip(values, codes)), initial=0.0))
+                for code in range(len(PERIODS))
+            ]
+    year = rlp_store.from_epoch(profile.timestamps[0]).year
+    return BillingIndex(profile.timestamps, prefix, year)
+
+@functools.lru_cache(maxsize=8)
+def _cached_billing_index(csv_path, size, mtime_ns, column, schedule_hash):
+    return build_billing_index(rlp_store.load_profile(csv_path), column)
+
+def get_billing_index(csv_path, column=DEFAULT_COLUMN):
+    """BillingIndex for a profile CSV, kept in an in-process LRU."""
+    st = os.stat(csv_path)
+    return _cached_billing_index(os.path.abspath(csv_path), st.st_size, st.st_mtime_ns, column,
+                                 portugal_tou.schedule_version())
+
+def parse_date(text):
+    """YYYY-MM-DD or DD/MM/YYYY."""
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date {text!r}, expected YYYY-MM-DD")
@@ -0,0 +1,209 @@
+"""
+Calibrating the annual estimate from several bills.
+
+Each bill covers a calendar month or a date range and gives its kWh, and
+optionally its split per billed period (bi-hourly: fora de vazio, vazio;
+tri-hourly: ponta, cheias, vazio). The model scales the profile's energy by
+one factor per period group:
+
+    bill kWh in group h = sum over groups g of  s_g * profile kWh of (g and h) in the bill's dates
+
+Groups follow the finest split given (a single total factor when no bill
+has a split). The factors are the least-squares fit over all bills, solved
+from the small normal equations. Profile energies per bill come from the
+cumulative sums of billing.BillingIndex, so a fit costs microseconds.
+"""
+import calendar
+import datetime
+import math
+import re
+
+import billing
+from portugal_tou import PERIODS, TARIFF_GROUPS, merge_super_off_peak
+
+# Split size -> tariff type whose groups it reports
+SPLIT_TYPES = {1: 'simple', 2: 'bi-hourly', 3: 'tri-hourly'}
+
+class Bill:
+    """kwh consumed from start to end (inclusive); split: per-group kWh or None."""
+    __slots__ = ('start', 'end', 'kwh', 'split')
+
+    def __init__(self, start, end, kwh, split=None):
+        if split is not None and len(split) not in (2, 3):
+            raise ValueError("A bill split needs 2 (bi-hourly) or 3 (tri-hourly) values")
+        if split is not None and abs(sum(split) - kwh) > max(0.01 * kwh, 0.5):
+            raise ValueError(f"Bill split {list(split)} does not add up to {kwh} kWh")
+        self.start = start
+        self.end = end
+        self.kwh = float(kwh)
+        self.split = tuple(float(v) for v in split) if split is not None else None
+
+    @classmethod
+    def month(cls, year, month, kwh, split=None):
+        last = calendar.monthrange(year, month)[1]
+        return cls(datetime.date(year, month, 1), datetime.date(year, month, last), kwh, split)
+
+    @classmethod
+    def parse(cls, spec, year=None):
+        """
+        'START,END,KWH[,SPLIT...]' or 'YYYY-MM,KWH[,SPLIT...]' (or a month
+        number 1-12 of `year`), e.g. '2025-01-15,2025-02-14,300' or
+        '2025-03,280,190,90'.
+        """
+        tokens = [t.strip() for t in spec.split(',')]
+        try:
+            m = re.fullmatch(r'(\d{4})-(\d{1,2})', tokens[0])
+            if m or tokens[0].isdigit():
+                y, month = (int(m.group(1)), int(m.group(2))) if m else (year, int(tokens[0]))
+                if y is None or not 1 <= month <= 12:
+                    raise ValueError
+                values = [float(v) for v in tokens[1:]]
+                start = datetime.date(y, month, 1)
+                end = datetime.date(y, month, calendar.monthrange(y, month)[1])
+            else:
+                start, end = billing.parse_date(tokens[0]), billing.parse_date(tokens[1])
+                values = [float(v) for v in tokens[2:]]
+        except (ValueError, IndexError):
+            raise ValueError(f"Invalid bill {spec!r}, expected START,END,KWH[,SPLIT...] or YYYY-MM,KWH[,SPLIT...]") from None
+        if not values:
+            raise ValueError(f"Bill {spec!r} has no kWh")
+        return cls(start, end, values[0], values[1:] or None)
+
+def _solve(a, b):
+    """Solves a x = b (small dense system) by Gaussian elimination."""
+    n = len(b)
+    m = [row[:] + [v] for row, v in zip(a, b)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        if abs(m[pivot][col]) < 1e-12:
+            raise ValueError("The bills do not determine every period (add bills or drop the splits)")
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(n):
+            if r != col:
+                f = m[r][col] / m[col][col]
+                for c in range(col, n + 1):
+                    m[r][c] -= f * m[col][c]
+    return [m[i][n] / m[i][i] for i in range(n)]
+
+class Calibration:
+    """
+    Fitted scale per period group (profile Wh -> kWh) with fit metrics.
+    cycle_type: the cycle the bills were fitted under;
+    observations: [(bill, group, measured kWh, fitted kWh)].
+    """
+    def __init__(self, index, cycle_type, tariff_type, scales, observations):
+        self.index = index
+        self.cycle_type = cycle_type
+        self.tariff_type = tariff_type
+        self.groups = TARIFF_GROUPS[tariff_type]
+        self.scales = scales
+        self.observations = observations
+
+    def _scale(self, period):
+        for name, periods in self.groups.items():
+            if period in periods:
+                return self.scales[name]
+
+    def estimate(self, cycle_type):
+        """Annual kWh per period (Super Off Peak merged into Off Peak)."""
+        totals = [cumulative[-1] for cumulative in self.index.prefix[cycle_type]]
+        return merge_super_off_peak(wh * self._scale(p) for p, wh in zip(PERIODS, totals))
+
+    def annual_kwh(self, cycle_type):
+        return sum(self.estimate(cycle_type).values())
+
+    @property
+    def residuals(self):
+        return [measured - fitted for _, _, measured, fitted in self.observations]
+
+    @property
+    def rmse(self):
+        """Root mean square error over all observations (kWh)."""
+        r = self.residuals
+        return math.sqrt(sum(e * e for e in r) / len(r))
+
+    @property
+    def r_squared(self):
+        """Share of the variance of the observations explained by the fit (None for a single value)."""
+        measured = [o[2] for o in self.observations]
+        mean = sum(measured) / len(measured)
+        total = sum((y - mean) ** 2 for y in measured)
+        if len(measured) < 2 or total == 0:
+            return None
+        return 1.0 - sum(e * e for e in self.residuals) / total
+
+    @property
+    def mape(self):
+        """Mean absolute percentage error of the bill totals."""
+        errors = []
+        for bill in {id(o[0]): o[0] for o in self.observations}.values():
+            fitted = sum(self._bill_energy(bill).values())
+            if bill.kwh:
+                errors.append(abs(bill.kwh - fitted) / bill.kwh)
+        return sum(errors) / len(errors) if errors else None
+
+    def _bill_energy(self, bill):
+        wh = self.index.energy(self.cycle_type, bill.start, bill.end)
+        return {p: v * self._scale(p) for p, v in zip(PERIODS, wh)}
+
+    def summary(self):
+        """Fitted bills and fit metrics as printable text."""
+        lines = [f"Calibrated on {len({id(o[0]) for o in self.observations})} bill(s) ({self.tariff_type} split):"]
+        for bill, group, measured, fitted in self.observations:
+            lines.append(f"  {bill.start} to {bill.end} {group:<9} {measured:>9.2f} kWh  fitted {fitted:>9.2f}"
+                         f"  residual {measured - fitted:>+8.2f}")
+        r2 = self.r_squared
+        lines.append(f"  RMSE {self.rmse:.2f} kWh, MAPE {self.mape * 100:.1f}%, R² "
+                     + (f"{r2:.3f}" if r2 is not None else "n/a"))
+        return "\n".join(lines)
+
+    def to_dict(self, cycle_type):
+        return {
+            'annual_kwh': self.annual_kwh(cycle_type),
+            'estimate': self.estimate(cycle_type),
+            'scales': self.scales,
+            'rmse_kwh': self.rmse,
+            'r_squared': self.r_squared,
+            'mape': self.mape,
+            'bills': [{'start': str(b.start), 'end': str(b.end), 'group': label, 'kwh': y, 'fitted': f}
+                      for b, label, y, f in self.observations],
+        }
+
+def calibrate(index, bills, cycle_type):
+    """
+    Least-squares fit of the period-group scales to `bills` (see module notes).
+    index: billing.BillingIndex; cycle_type: the cycle the bill splits were
+    measured under. Returns a Calibration.
+    """
+    bills = list(bills)
+    if not bills:
+        raise ValueError("At least one bill is needed")
+    finest = max((len(b.split) if b.split else 1) for b in bills)
+    tariff_type = SPLIT_TYPES[finest]
+    groups = TARIFF_GROUPS[tariff_type]
+    names = list(groups)
+
+    # One row per observation: (bill, label, measured, coefficient per model group)
+    rows = []
+    for bill in bills:
+        wh = dict(zip(PERIODS, index.energy(cycle_type, bill.start, bill.end)))
+        if bill.split:
+            bill_groups = TARIFF_GROUPS[SPLIT_TYPES[len(bill.split)]]
+            observed = zip(bill_groups.items(), bill.split)
+        else:
+            observed = [(('total', PERIODS), bill.kwh)]
+        for (label, bill_periods), y in observed:
+            coeffs = [sum(wh[p] for p in groups[g] if p in bill_periods) for g in names]
+            rows.append((bill, label, y, coeffs))
+
+    n = len(names)
+    ata = [[sum(r[3][i] * r[3][j] for r in rows) for j in range(n)] for i in range(n)]
+    aty = [sum(r[3][i] * r[2] for r in rows) for i in range(n)]
+    solution = _solve(ata, aty)
+    if any(s < 0 for s in solution):
+        raise ValueError("The bills imply negative consumption in some period; check the values")
+
+    scales = dict(zip(names, solution))
+    observations = [(bill, label, y, sum(c * s for c, s in zip(coeffs, solution)))
+                    for bill, label, y, coeffs in rows]
+    return Calibration(index, cycle_type, tariff_type, scales, observations)
@@ -1,8 +1,11 @@
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 # Ensure local modules can be imported
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+import billing
+import calibration
 import portugal_tou
 
 def compute_total_cost(price_per_kwh, daily_fee, annual_consumption, days=365):
@@ -25,7 +28,79 @@ def get_tou_cost(tou_consumption, rates, daily_fee, days=365):
     fixed_cost = daily_fee * days
     return energy_cost + fixed_cost
 
+def preload_profile(executor):
+    """
+    Starts finding the profile and building its aggregates in the
+    background, while the user answers the prompts. Returns a Future of the
+    profile path; once it is done, load_and_calculate_tou and
+    billing.get_billing_index answer from their in-process caches.
+    """
+    def load():
+        csv_path = portugal_tou.find_profile()
+        portugal_tou.get_tou_index(csv_path)
+        billing.get_billing_index(csv_path)
+        return csv_path
+    return executor.submit(load)
+
+def read_contract(i, tariff_type, tou_consumption, total_annual_kwh):
+    """Prompts for one contract and returns (name, annual cost)."""
+    print(f"\nEnter details for Contract {i}:")
+    name = input(f"  Name (Enter for 'Contract {i}'): ").strip() or f"Contract {i}"
+    daily_fee = float(input("  Daily fee (€): "))
+
+    rates = {}
+    if tariff_type == 'simple':
+        p = float(input("  Price (€/kWh): "))
+        cost = compute_total_cost(p, daily_fee, total_annual_kwh)
+
+    elif tariff_type == 'bi-hourly':
+        # Peak (Fora de Vazio), Off-Peak (Vazio)
+        # Map internal names: Peak+Mid -> Peak(Fora Vazio), Off -> Off
+        # Logic: Input Rate Peak (Fora Vazio), Rate Off (Vazio)
+        r_peak = float(input("  Price Peak/Fora de Vazio (€/kWh): "))
+        r_off = float(input("  Price Off-Peak/Vazio (€/kWh): "))
+
+        # Map to our internal periods
+        # Peak & Mid-Peak are "Fora de Vazio"
+        rates['peak'] = r_peak
+        rates['mid_peak'] = r_peak
+        rates['off_peak'] = r_off
+        rates['super_off_peak'] = r_off # Should be merged already but just in case
+
+        cost = get_tou_cost(tou_consumption, rates, daily_fee)
+
+    elif tariff_type == 'tri-hourly':
+        # Ponta, Cheias, Vazio
+        r_peak = float(input("  Price Peak/Ponta (€/kWh): "))
+        r_mid = float(input("  Price Mid-Peak/Cheias (€/kWh): "))
+        r_off = float(input("  Price Off-Peak/Vazio (€/kWh): "))
+
+        rates['peak'] = r_peak
+        rates['mid_peak'] = r_mid
+        rates['off_peak'] = r_off
+        rates['super_off_peak'] = r_off
+
+        cost = get_tou_cost(tou_consumption, rates, daily_fee)
+
+    print(f"  => Annual Cost: €{cost:.2f}")
+    return name, cost
+
+def format_ranking(results):
+    """[(name, annual cost)] -> table lines, cheapest first, with the difference to the cheapest."""
+    ranked = sorted(results, key=lambda r: r[1])
+    width = max([len(name) for name, _ in ranked] + [8])
+    lines = [f"{'#':>3}  {'Contract':<{width}}  {'Annual cost':>12}  {'vs cheapest':>12}"]
+    for rank, (name, cost) in enumerate(ranked, start=1):
+        delta = f"+€{cost - ranked[0][1]:.2f}" if rank > 1 else "-"
+        lines.append(f"{rank:>3}  {name:<{width}}  {'€' + format(cost, '.2f'):>12}  {delta:>12}")
+    return lines
+
 def main():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        profile = preload_profile(executor)
+        run(profile)
+
+def run(profile):
     print("Electricity Price Comparison Tool")
     print("=================================")
     
@@ -62,20 +137,32 @@ def main():
     # 2. Input Consumption Reference
     print("\nConsumption Reference:")
     try:
-        ref_kwh = float(input("  Reference Amount (kWh): "))
-        ref_month = int(input("  Reference Month (1-12, or 0 for Annual Total): "))
+        num_bills = int(input("  Number of past bills to calibrate on (0 for a single reference amount): ") or 0)
+        bill_specs = []
+        for i in range(1, num_bills + 1):
+            bill_specs.append(input(f"  Bill {i} (START,END,KWH or YYYY-MM,KWH, then kWh per period if shown): "))
+        if not num_bills:
+            ref_kwh = float(input("  Reference Amount (kWh): "))
+            ref_month = int(input("  Reference Month (1-12, or 0 for Annual Total): "))
     except ValueError:
         print("Invalid input. Exiting.")
         return
 
-    # Load Profile and Calculate Split
-    print("\nLoading Load Profile (BTN C)...")
-    csv_path = os.path.join(os.path.dirname(__file__), 'rlp', 'EREDES_2025_BTN_1000kwh_15min.csv')
-    
+    # Scale the profile loaded in the background
+    if not profile.done():
+        print("\nLoading Load Profile (BTN C)...")
     try:
-        tou_consumption = portugal_tou.load_and_calculate_tou(csv_path, cycle_type, ref_kwh, ref_month)
-    except FileNotFoundError:
-        print(f"Error: Could not find RLP file at {csv_path}")
+        csv_path = profile.result()
+        if bill_specs:
+            index = billing.get_billing_index(csv_path)
+            fit = calibration.calibrate(index, [calibration.Bill.parse(spec, index.year) for spec in bill_specs],
+                                        cycle_type)
+            print(fit.summary())
+            tou_consumption = fit.estimate(cycle_type)
+        else:
+            tou_consumption = portugal_tou.load_and_calculate_tou(csv_path, cycle_type, ref_kwh, ref_month)
+    except FileNotFoundError as e:
+        print(f"Error: Could not find RLP file: {e}")
         return
     except Exception as e:
         print(f"Error processing profile: {e}")
@@ -91,46 +178,20 @@ def main():
                 print(f"  {p}: {val:.2f} kWh")
 
     # 3. Contract Details
-    num_contracts = 2
+    try:
+        num_contracts = int(input("\nNumber of contracts to compare (Enter for 2): ") or 2)
+    except ValueError:
+        print("Invalid input. Comparing 2 contracts.")
+        num_contracts = 2
+
+    results = []
     for i in range(1, num_contracts + 1):
-        print(f"\nEnter details for Contract {i}:")
-        daily_fee = float(input("  Daily fee (€): "))
-        
-        rates = {}
-        if tariff_type == 'simple':
-            p = float(input("  Price (€/kWh): "))
-            cost = compute_total_cost(p, daily_fee, total_annual_kwh)
-        
-        elif tariff_type == 'bi-hourly':
-            # Peak (Fora de Vazio), Off-Peak (Vazio)
-            # Map internal names: Peak+Mid -> Peak(Fora Vazio), Off -> Off
-            # Logic: Input Rate Peak (Fora Vazio), Rate Off (Vazio)
-            r_peak = float(input("  Price Peak/Fora de Vazio (€/kWh): "))
-            r_off = float(input("  Price Off-Peak/Vazio (€/kWh): "))
-            
-            # Map to our internal periods
-            # Peak & Mid-Peak are "Fora de Vazio"
-            rates['peak'] = r_peak
-            rates['mid_peak'] = r_peak
-            rates['off_peak'] = r_off
-            rates['super_off_peak'] = r_off # Should be merged already but just in case
-            
-            cost = get_tou_cost(tou_consumption, rates, daily_fee)
-            
-        elif tariff_type == 'tri-hourly':
-            # Ponta, Cheias, Vazio
-            r_peak = float(input("  Price Peak/Ponta (€/kWh): "))
-            r_mid = float(input("  Price Mid-Peak/Cheias (€/kWh): "))
-            r_off = float(input("  Price Off-Peak/Vazio (€/kWh): "))
-            
-            rates['peak'] = r_peak
-            rates['mid_peak'] = r_mid
-            rates['off_peak'] = r_off
-            rates['super_off_peak'] = r_off
-            
-            cost = get_tou_cost(tou_consumption, rates, daily_fee)
-            
-        print(f"  => Annual Cost: €{cost:.2f}")
+        results.append(read_contract(i, tariff_type, tou_consumption, total_annual_kwh))
+
+    if len(results) > 1:
+        print("\nRanking:")
+        for line in format_ranking(results):
+            print(line)
 
 if __name__ == "__main__":
     main()
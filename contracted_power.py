@@ -0,0 +1,197 @@
+"""
+Contracted power (kVA) sizing.
+
+The daily fee depends on the contracted power tier, and the tier only needs
+to cover the household's peak demand. Peaks are taken from 15-minute
+consumption, either the scaled profile or smart-meter readings:
+
+    peak over w slots = max over the year of (kWh in w consecutive slots) / (w / 4 h)
+
+computed for every window from one cumulative sum (linear time, the
+differences taken with map() over arrays). Quarter-hour averages smooth out
+short spikes, and a standard profile also averages many households, so the
+peak is raised by a stochastic peaking margin: the `confidence` quantile of
+a lognormal demand with mean 1 and coefficient of variation `cv`.
+
+The recommended tier is the cheapest one in the fee table whose kVA covers
+peak * margin / power_factor. Profile peaks are linear in the annual
+consumption, so in bulk each customer costs one multiplication and one
+binary search (FeeTable.recommend_many).
+"""
+import bisect
+import collections
+import csv
+import functools
+import itertools
+import json
+import math
+import operator
+import os
+from array import array
+from statistics import NormalDist
+
+import rlp_store
+import timing
+from portugal_tou import DEFAULT_COLUMN
+
+# Windows (in 15-minute slots) reported by default: 15 min and 1 h
+DEFAULT_WINDOWS = (1, 4)
+
+# Peaking margin defaults: a profile is an average of many households (its
+# quarter-hours are far smoother than any one home's), meter readings are one
+# household's quarter-hour averages
+PROFILE_CV = 2.0
+METER_CV = 0.3
+DEFAULT_CONFIDENCE = 0.95
+
+DEFAULT_FEES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example_power_fees.csv')
+
+def window_peaks(kwh, windows=DEFAULT_WINDOWS):
+    """{window: peak kW} of a 15-minute kWh series (NaN counts as 0)."""
+    prefix = array('d', itertools.accumulate((v if v == v else 0.0 for v in kwh), initial=0.0))
+    peaks = {}
+    for w in windows:
+        if w < 1 or w >= len(prefix):
+            raise ValueError(f"Window of {w} slots does not fit {len(prefix) - 1} readings")
+        peaks[w] = max(map(operator.sub, prefix[w:], prefix[:-w])) * 4.0 / w
+    return peaks
+
+def peaking_margin(cv, confidence=DEFAULT_CONFIDENCE):
+    """`confidence` quantile of a lognormal with mean 1 and coefficient of variation cv."""
+    if cv <= 0:
+        return 1.0
+    if not 0 < confidence < 1:
+        raise ValueError(f"Confidence must be between 0 and 1, got {confidence}")
+    sigma = math.sqrt(math.log(1.0 + cv * cv))
+    return math.exp(NormalDist().inv_cdf(confidence) * sigma - sigma * sigma / 2.0)
+
+class PeakTracker:
+    """
+    Streaming window peaks of one customer's readings, added in time order
+    by quarter-hour index (see quarter_hours). A gap in the readings restarts
+    the windows.
+    """
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(windows)
+        self.recent = collections.deque(maxlen=max(self.windows) + 1)
+        self.sums = dict.fromkeys(self.windows, 0.0)
+        self.best = dict.fromkeys(self.windows, 0.0)
+        self.last = None
+
+    def add(self, q, kwh):
+        if self.last is not None and q - self.last != 1:
+            self.recent.clear()
+            self.sums = dict.fromkeys(self.windows, 0.0)
+        self.last = q
+        self.recent.append(kwh)
+        n = len(self.recent)
+        for w in self.windows:
+            total = self.sums[w] + kwh
+            if n > w:
+                total -= self.recent[-w - 1]
+            self.sums[w] = total
+            if n >= w and total > self.best[w]:
+                self.best[w] = total
+
+    @property
+    def peaks(self):
+        """{window: peak kW}."""
+        return {w: kwh * 4.0 / w for w, kwh in self.best.items()}
+
+def meter_peaks(readings, windows=DEFAULT_WINDOWS):
+    """{customer: {window: peak kW}} from meter_ingest.iter_quarter_hours output."""
+    trackers = {}
+    for customer, q, kwh in readings:
+        tracker = trackers.get(customer)
+        if tracker is None:
+            tracker = trackers[customer] = PeakTracker(windows)
+        tracker.add(q, kwh)
+    return {customer: tracker.peaks for customer, tracker in trackers.items()}
+
+@functools.lru_cache(maxsize=8)
+def _cached_profile_peaks(csv_path, size, mtime_ns, column, windows):
+    profile = rlp_store.load_profile(csv_path)
+    values = profile.column(column)
+    with timing.phase('power.peaks', len(values)):
+        total = sum(v for v in values if v == v)
+        # Wh -> kWh per annual kWh
+        return {w: kw / total for w, kw in window_peaks(values, windows).items()}
+
+def profile_peaks(csv_path, annual_kwh, column=DEFAULT_COLUMN, windows=DEFAULT_WINDOWS):
+    """{window: peak kW} of the profile scaled to annual_kwh."""
+    st = os.stat(csv_path)
+    per_kwh = _cached_profile_peaks(os.path.abspath(csv_path), st.st_size, st.st_mtime_ns, column, tuple(windows))
+    return {w: kw * annual_kwh for w, kw in per_kwh.items()}
+
+class FeeTable:
+    """Daily fee (€) per contracted power tier (kVA)."""
+    def __init__(self, tiers):
+        tiers = sorted((float(kva), float(fee)) for kva, fee in tiers)
+        if not tiers:
+            raise ValueError("Fee table is empty")
+        self.kva = array('d', (t[0] for t in tiers))
+        self.fees = array('d', (t[1] for t in tiers))
+        # cheapest[i]: index of the cheapest tier among tiers i.. (the cheapest adequate one)
+        cheapest = [0] * len(tiers)
+        best = len(tiers) - 1
+        for i in range(len(tiers) - 1, -1, -1):
+            if self.fees[i] <= self.fees[best]:
+                best = i
+            cheapest[i] = best
+        self._cheapest = cheapest
+
+    @classmethod
+    def from_file(cls, path=None):
+        """CSV with kva,daily_fee columns, or a JSON list of {"kva", "daily_fee"}."""
+        path = path or DEFAULT_FEES
+        with open(path, 'r', newline='') as f:
+            try:
+                if path.endswith('.json'):
+                    return cls((item['kva'], item['daily_fee']) for item in json.load(f))
+                return cls((row['kva'], row['daily_fee']) for row in csv.DictReader(f))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}: invalid fee table ({e})") from None
+
+    def __len__(self):
+        return len(self.kva)
+
+    def recommend(self, required_kva):
+        """(kVA, daily fee) of the cheapest tier of at least required_kva."""
+        i = bisect.bisect_left(self.kva, required_kva - 1e-9)
+        if i == len(self.kva):
+            raise ValueError(f"No tier covers {required_kva:.2f} kVA (largest: {self.kva[-1]:g} kVA)")
+        best = self._cheapest[i]
+        return self.kva[best], self.fees[best]
+
+    def recommend_many(self, required_kva):
+        """Tier index per required kVA (-1 when no tier is large enough)."""
+        top = len(self.kva)
+        cheapest = self._cheapest
+        return array('i', (cheapest[i] if i < top else -1
+                           for i in (bisect.bisect_left(self.kva, r - 1e-9) for r in required_kva)))
+
+class Sizing:
+    """Recommended tier for a peak demand (kW) and peaking margin."""
+    def __init__(self, peaks, window, margin, power_factor, kva, daily_fee):
+        self.peaks = peaks
+        self.window = window
+        self.margin = margin
+        self.power_factor = power_factor
+        self.kva = kva
+        self.daily_fee = daily_fee
+
+    @property
+    def peak_kw(self):
+        return self.peaks[self.window]
+
+    @property
+    def required_kva(self):
+        return self.peak_kw * self.margin / self.power_factor
+
+def size(peaks, fee_table, cv, confidence=DEFAULT_CONFIDENCE, power_factor=1.0, window=1):
+    """Sizing from {window: peak kW}, sized on `window`."""
+    if not 0 < power_factor <= 1:
+        raise ValueError(f"Power factor must be in (0, 1], got {power_factor}")
+    margin = peaking_margin(cv, confidence)
+    kva, fee = fee_table.recommend(peaks[window] * margin / power_factor)
+    return Sizing(peaks, window, margin, power_factor, kva, fee)
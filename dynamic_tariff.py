@@ -0,0 +1,102 @@
+"""
+Indexed (dynamic) tariffs priced from a day-ahead spot price series.
+
+The price file is a CSV with a Datetime column (dd/mm/YYYY HH:MM or ISO 8601)
+and one price column per series, hourly or quarter-hourly. It goes through
+the same memory-mapped columnar cache as the load profile (rlp_store), so a
+year of prices for many offers is parsed once.
+
+Energy rate per slot: (spot + margin) * (1 + loss_factor)
+Energy cost: dot product of the slot rates with the scaled 15-minute profile.
+"""
+import calendar
+import operator
+from array import array
+
+import rlp_store
+from portugal_tou import PERIODS, merge_super_off_peak
+
+PRICE_UNITS = {'MWh': 0.001, 'kWh': 1.0} # -> €/kWh
+
+def load_prices(path, verify_hash=True):
+    """Returns the price file as an rlp_store.RLPProfile (one column per series)."""
+    return rlp_store.load_profile(path, verify_hash=verify_hash)
+
+def _year_start(t):
+    year = rlp_store.from_epoch(t).year
+    return calendar.timegm((year, 1, 1, 0, 0, 0))
+
+def align_series(series, column, slot_timestamps, scale=1.0):
+    """
+    Value of a column of `series` (rlp_store.RLPProfile) for every profile
+    slot, times `scale`. Hourly values apply to all four quarter-hours of the
+    hour. If the series covers a different year than the profile, it is
+    re-dated to the profile's year. Raises ValueError for slots without a value.
+    """
+    ts = series.timestamps
+    values = series.column(column)
+    if len(ts) < 2:
+        raise ValueError("Series needs at least two points")
+    t0 = ts[0]
+    step = ts[1] - t0
+    shift = _year_start(slot_timestamps[0]) - _year_start(t0) if len(slot_timestamps) else 0
+
+    if ts[-1] - t0 == step * (len(ts) - 1):
+        # Regular series: direct index
+        n = len(ts)
+        def lookup(t):
+            i = (t - shift - t0) // step
+            return values[i] if 0 <= i < n else float('nan')
+    else:
+        by_time = dict(zip(ts, values))
+        def lookup(t):
+            t -= shift
+            return by_time.get(t - (t - t0) % step, float('nan'))
+
+    result = array('d', [lookup(t) * scale for t in slot_timestamps])
+    for t, value in zip(slot_timestamps, result):
+        if value != value:
+            raise ValueError(f"No value for {rlp_store.from_epoch(t)}")
+    return result
+
+def align_prices(prices, column, slot_timestamps, unit='MWh'):
+    """Spot price in €/kWh for every consumption slot (see align_series)."""
+    return align_series(prices, column, slot_timestamps, PRICE_UNITS[unit])
+
+def indexed_rates(spot, margin=0.0, loss_factor=0.0):
+    """Energy rate (€/kWh) per slot: (spot + margin) * (1 + loss_factor)."""
+    k = 1.0 + loss_factor
+    return array('d', [(p + margin) * k for p in spot])
+
+def get_indexed_cost(kwh, rates, daily_fee, days=365):
+    """
+    Calculate annual cost for an indexed contract.
+    kwh, rates: per-slot consumption and €/kWh, aligned.
+    """
+    energy_cost = sum(map(operator.mul, kwh, rates))
+    return energy_cost + daily_fee * days
+
+def period_breakdown(kwh, rates, codes):
+    """
+    kWh, € and average €/kWh per TOU period (Super Off Peak merged into
+    Off Peak), for a side-by-side view with fixed TOU contracts.
+    codes: period codes per slot from PortugueseTOUCycle.classify_epoch.
+    """
+    energy = [0.0] * len(PERIODS)
+    cost = [0.0] * len(PERIODS)
+    for e, r, c in zip(kwh, rates, codes):
+        energy[c] += e
+        cost[c] += e * r
+    energy = merge_super_off_peak(energy)
+    cost = merge_super_off_peak(cost)
+    return {p: {'kwh': e, 'cost': cost[p], 'avg_rate': cost[p] / e if e else None}
+            for p, e in energy.items()}
+
+def evaluate_series(prices, kwh, slot_timestamps, margin=0.0, loss_factor=0.0, daily_fee=0.0,
+                    days=365, unit='MWh'):
+    """Annual cost for every price column of `prices`: {column name: €}."""
+    return {
+        name: get_indexed_cost(kwh, indexed_rates(align_prices(prices, i, slot_timestamps, unit),
+                                                  margin, loss_factor), daily_fee, days)
+        for i, name in enumerate(prices.names)
+    }
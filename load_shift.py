@@ -0,0 +1,169 @@
+"""
+Flexible-load shifting over the TOU period masks.
+
+A schedulable appliance (EV charging, water heater, dishwasher) needs a fixed
+energy per run within a daily time window at up to a given power. The
+baseline runs it as soon as the window opens; the optimized schedule fills
+the cheapest quarter-hours of the window first (or, for contiguous loads,
+picks the cheapest start with a sliding window).
+
+Days only differ through their period row (season, day type, transitions),
+so each distinct (today, tomorrow) row pair is scheduled once and the result
+is weighted by the number of days sharing it.
+"""
+import collections
+import datetime
+
+import portugal_tou
+import rlp_store
+from portugal_tou import PERIODS, SLOTS_PER_DAY, merge_super_off_peak
+
+SLOT_HOURS = 0.25
+
+class Appliance:
+    """
+    energy_kwh: energy per run; power_kw: maximum power.
+    window: (start, end) in hours on quarter-hours; end <= start means the
+    window ends the next day (e.g. (19, 8) for overnight EV charging).
+    weekdays: days (0=Mon) on which it runs; contiguous: must run without pauses.
+    """
+    __slots__ = ('name', 'energy_kwh', 'power_kw', 'start_slot', 'end_slot', 'weekdays', 'contiguous')
+
+    def __init__(self, name, energy_kwh, power_kw, window, weekdays=range(7), contiguous=False):
+        start, end = window
+        if start * 4 != int(start * 4) or end * 4 != int(end * 4):
+            raise ValueError(f"{name}: window must be on quarter-hours")
+        if not 0 <= start < 24 or not 0 <= end <= 24:
+            raise ValueError(f"{name}: window hours must be within 0-24")
+        if power_kw <= 0 or energy_kwh < 0:
+            raise ValueError(f"{name}: power must be positive and energy non-negative")
+        self.name = name
+        self.energy_kwh = float(energy_kwh)
+        self.power_kw = float(power_kw)
+        self.start_slot = int(start * 4)
+        self.end_slot = int(end * 4)
+        self.weekdays = frozenset(weekdays)
+        self.contiguous = contiguous
+
+        if self.window_slots() * power_kw * SLOT_HOURS < energy_kwh:
+            raise ValueError(f"{name}: {energy_kwh} kWh does not fit in the window at {power_kw} kW")
+
+    def window_slots(self):
+        if self.end_slot > self.start_slot:
+            return self.end_slot - self.start_slot
+        return SLOTS_PER_DAY - self.start_slot + self.end_slot
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        NAME:KWH:KW:START-END[:contiguous], e.g. 'ev:10:3.7:19-8' or
+        'dishwasher:1.2:2:20-7:contiguous'.
+        """
+        parts = spec.split(':')
+        if len(parts) not in (4, 5) or (len(parts) == 5 and parts[4] != 'contiguous'):
+            raise ValueError(f"Invalid load spec {spec!r}, expected NAME:KWH:KW:START-END[:contiguous]")
+        start, _, end = parts[3].partition('-')
+        return cls(parts[0], float(parts[1]), float(parts[2]), (float(start), float(end)),
+                   contiguous=len(parts) == 5)
+
+def _window_codes(appliance, row, next_row):
+    if appliance.end_slot > appliance.start_slot:
+        return row[appliance.start_slot:appliance.end_slot]
+    return row[appliance.start_slot:] + next_row[:appliance.end_slot]
+
+def _fill(order, energy, slot_kwh):
+    """kWh per window position, filling positions in `order`."""
+    alloc = {}
+    remaining = energy
+    for pos in order:
+        if remaining <= 1e-12:
+            break
+        e = min(slot_kwh, remaining)
+        alloc[pos] = e
+        remaining -= e
+    return alloc
+
+def schedule(appliance, prices, optimize=True):
+    """
+    kWh per window position for one run. prices: €/kWh per window slot.
+    """
+    n = len(prices)
+    slot_kwh = appliance.power_kw * SLOT_HOURS
+    if not optimize:
+        return _fill(range(n), appliance.energy_kwh, slot_kwh)
+
+    if not appliance.contiguous:
+        order = sorted(range(n), key=lambda i: (prices[i], i))
+        return _fill(order, appliance.energy_kwh, slot_kwh)
+
+    # Contiguous run: cheapest start via a sliding window over the run profile
+    profile = list(_fill(range(n), appliance.energy_kwh, slot_kwh).values())
+    length = len(profile)
+    best_start, best_cost = 0, None
+    for s in range(n - length + 1):
+        cost = sum(profile[k] * prices[s + k] for k in range(length))
+        if best_cost is None or cost < best_cost - 1e-12:
+            best_start, best_cost = s, cost
+    return {best_start + k: e for k, e in enumerate(profile)}
+
+class ShiftResult:
+    """Per-period kWh and cost of an appliance, baseline vs optimized."""
+    def __init__(self, appliance, baseline, optimized, baseline_cost, optimized_cost):
+        self.appliance = appliance
+        self.baseline = baseline
+        self.optimized = optimized
+        self.baseline_cost = baseline_cost
+        self.optimized_cost = optimized_cost
+
+    @property
+    def saving(self):
+        return self.baseline_cost - self.optimized_cost
+
+def optimize_loads(appliances, rates, cycle_type, year, holidays=False):
+    """
+    Schedules each appliance on every matching day of `year` under `rates`
+    ({period: €/kWh}) and returns one ShiftResult per appliance.
+    """
+    cycle = portugal_tou.PortugueseTOUCycle(cycle_type, holidays)
+    first = datetime.date(year, 1, 1)
+    ndays = (datetime.date(year + 1, 1, 1) - first).days
+
+    # Count days per (weekday, today's row, tomorrow's row)
+    patterns = collections.Counter()
+    for i in range(ndays):
+        date = first + datetime.timedelta(days=i)
+        patterns[(date.weekday(), cycle.day_row(date), cycle.day_row(date + datetime.timedelta(days=1)))] += 1
+
+    rate_by_code = [rates.get(p, 0.0) for p in PERIODS]
+    results = []
+    for appliance in appliances:
+        runs = collections.Counter()
+        for (weekday, row, next_row), count in patterns.items():
+            if weekday in appliance.weekdays:
+                runs[_window_codes(appliance, row, next_row)] += count
+
+        totals = {False: [0.0] * len(PERIODS), True: [0.0] * len(PERIODS)}
+        costs = {False: 0.0, True: 0.0}
+        for codes, count in runs.items():
+            prices = [rate_by_code[c] for c in codes]
+            for optimize in (False, True):
+                for pos, e in schedule(appliance, prices, optimize).items():
+                    totals[optimize][codes[pos]] += e * count
+                    costs[optimize] += e * prices[pos] * count
+
+        results.append(ShiftResult(appliance, merge_super_off_peak(totals[False]), merge_super_off_peak(totals[True]),
+                                   costs[False], costs[True]))
+    return results
+
+def shifted_consumption(tou_consumption, results, optimized=True):
+    """Adds the appliances' per-period kWh to a {period: kWh} estimate."""
+    total = dict(tou_consumption)
+    for r in results:
+        for p, e in (r.optimized if optimized else r.baseline).items():
+            total[p] = total.get(p, 0.0) + e
+    return total
+
+def profile_year(csv_path):
+    """Calendar year covered by an RLP profile CSV."""
+    profile = rlp_store.load_profile(csv_path)
+    return rlp_store.from_epoch(profile.timestamps[0]).year
@@ -0,0 +1,264 @@
+"""
+Streaming ingest of 15-minute smart-meter exports.
+
+Readings are read row by row and aggregated into kWh per
+(customer, year, month, cycle, period), so memory does not depend on the
+number of rows. Files sorted by customer can be processed one customer at a
+time with iter_customer_totals, which keeps only the current customer.
+
+Rows are parsed straight into integer quarter-hour indices (see
+quarter_hours); no datetime is built per reading. iter_readings converts
+back to datetimes for callers that want them.
+
+The totals plug straight into get_tou_cost:
+    agg = MeterAggregator()
+    agg.consume_quarter_hours(iter_quarter_hours(path, EREDES_FORMAT))
+    get_tou_cost(agg.tou_consumption(customer, 'daily'), rates, fee, agg.days_covered(customer))
+"""
+import csv
+import datetime
+from array import array
+
+import portugal_tou
+import quarter_hours
+from portugal_tou import CYCLES, PERIODS, SLOTS_PER_DAY
+
+_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y')
+
+class MeterFormat:
+    """
+    Column layout of a meter export.
+    Either timestamp_col, or date_col + time_col, must be given.
+    unit: 'kWh' or 'Wh' per interval, or 'kW' (average power over the interval).
+    label: whether the timestamp marks the 'start' or 'end' of the interval.
+    customer_col: column identifying the installation (e.g. CPE), if any.
+    """
+    def __init__(self, value_col, timestamp_col=None, date_col=None, time_col=None,
+                 customer_col=None, unit='kWh', label='start', delimiter=None, decimal='.'):
+        if timestamp_col is None and (date_col is None or time_col is None):
+            raise ValueError("Either timestamp_col or date_col and time_col are required")
+        if unit not in ('kWh', 'Wh', 'kW'):
+            raise ValueError(f"Unknown unit: {unit}")
+        if label not in ('start', 'end'):
+            raise ValueError(f"Unknown label: {label}")
+        self.value_col = value_col
+        self.timestamp_col = timestamp_col
+        self.date_col = date_col
+        self.time_col = time_col
+        self.customer_col = customer_col
+        self.unit = unit
+        self.label = label
+        self.delimiter = delimiter
+        self.decimal = decimal
+
+# E-REDES style export: 'Data;Hora;Consumo registado (kW)', decimal comma,
+# readings labelled by the end of the 15-minute interval.
+EREDES_FORMAT = MeterFormat('Consumo registado (kW)', date_col='Data', time_col='Hora',
+                            customer_col='CPE', unit='kW', label='end', delimiter=';', decimal=',')
+
+# Plain 'Datetime,kWh' file, timestamps at the start of each interval
+SIMPLE_FORMAT = MeterFormat('kWh', timestamp_col='Datetime')
+
+METER_FORMATS = {'eredes': EREDES_FORMAT, 'simple': SIMPLE_FORMAT}
+
+class _DateParser:
+    """Parses date strings, remembering the format and the last date seen."""
+    def __init__(self):
+        self.fmt = None
+        self.last = (None, None)
+
+    def __call__(self, text):
+        if text == self.last[0]:
+            return self.last[1]
+        formats = (self.fmt,) + _DATE_FORMATS if self.fmt else _DATE_FORMATS
+        for fmt in formats:
+            try:
+                date = datetime.datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+            self.fmt = fmt
+            self.last = (text, date)
+            return date
+        raise ValueError(f"Unrecognised date: {text!r}")
+
+def _parse_time(text):
+    # H:MM, HH:MM or HH:MM:SS; 24:00 marks the end of the day
+    parts = text.split(':')
+    return int(parts[0]), int(parts[1])
+
+def iter_quarter_hours(path, fmt):
+    """
+    Yields (customer, quarter-hour index, kWh) for every valid row of a meter
+    export. The index is that of the interval's start. Rows that cannot be
+    parsed are skipped.
+    """
+    scale = {'kWh': 1.0, 'Wh': 0.001, 'kW': 0.25}[fmt.unit]
+    offset = -1 if fmt.label == 'end' else 0
+    parse_date = _DateParser()
+    last_date = day_start = None
+
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        delimiter = fmt.delimiter
+        if delimiter is None:
+            delimiter = csv.Sniffer().sniff(f.readline(), delimiters=',;\t').delimiter
+            f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [h.strip() for h in next(reader)]
+
+        value_idx = header.index(fmt.value_col)
+        customer_idx = header.index(fmt.customer_col) if fmt.customer_col else None
+        if fmt.timestamp_col is not None:
+            ts_idx = header.index(fmt.timestamp_col)
+        else:
+            date_idx = header.index(fmt.date_col)
+            time_idx = header.index(fmt.time_col)
+
+        for row in reader:
+            if not row: continue
+            try:
+                if fmt.timestamp_col is not None:
+                    date_text, _, time_text = row[ts_idx].strip().partition(' ')
+                else:
+                    date_text, time_text = row[date_idx].strip(), row[time_idx].strip()
+                if date_text != last_date:
+                    day_start = quarter_hours.from_date(parse_date(date_text))
+                    last_date = date_text
+                hour, minute = _parse_time(time_text)
+
+                value = row[value_idx].strip()
+                if fmt.decimal != '.':
+                    value = value.replace(fmt.decimal, '.')
+                kwh = float(value) * scale
+            except (ValueError, IndexError):
+                continue
+
+            customer = row[customer_idx].strip() if customer_idx is not None else None
+            yield customer, day_start + hour * 4 + minute // 15 + offset, kwh
+
+def iter_readings(path, fmt):
+    """
+    Yields (customer, datetime, kWh) for every valid row of a meter export.
+    The datetime is the start of the interval.
+    """
+    for customer, q, kwh in iter_quarter_hours(path, fmt):
+        yield customer, quarter_hours.to_datetime(q), kwh
+
+class MeterAggregator:
+    """
+    Incremental kWh totals per customer, (year, month), cycle and period,
+    keyed internally by quarter-hour index (wall clock, see quarter_hours).
+    """
+    def __init__(self, cycle_types=CYCLES):
+        self.cycles = {c: portugal_tou.PortugueseTOUCycle(c) for c in cycle_types}
+        # totals[customer][(year, month)][cycle] -> [kWh per PERIODS]
+        self.totals = {}
+        self.spans = {} # customer -> [first, last] quarter-hour index
+        self.readings = 0
+        # epoch day -> ((year, month), [(cycle, 96 period codes)])
+        self._days = {}
+
+    def _day(self, day):
+        date = quarter_hours.to_date(day * SLOTS_PER_DAY)
+        info = self._days[day] = ((date.year, date.month),
+                                  [(c, cycle.day_row(date)) for c, cycle in self.cycles.items()])
+        return info
+
+    def add_quarter_hour(self, customer, q, kwh):
+        months = self.totals.get(customer)
+        if months is None:
+            months = self.totals[customer] = {}
+            self.spans[customer] = [q, q]
+        day, slot = divmod(q, SLOTS_PER_DAY)
+        info = self._days.get(day)
+        if info is None:
+            info = self._day(day)
+        key, rows = info
+        by_cycle = months.get(key)
+        if by_cycle is None:
+            by_cycle = months[key] = {c: [0.0] * len(PERIODS) for c in self.cycles}
+        for c, row in rows:
+            by_cycle[c][row[slot]] += kwh
+
+        span = self.spans[customer]
+        if q < span[0]:
+            span[0] = q
+        elif q > span[1]:
+            span[1] = q
+        self.readings += 1
+
+    def add(self, customer, dt, kwh):
+        self.add_quarter_hour(customer, quarter_hours.from_datetime(dt), kwh)
+
+    def consume_quarter_hours(self, readings):
+        """Adds iter_quarter_hours output."""
+        for customer, q, kwh in readings:
+            self.add_quarter_hour(customer, q, kwh)
+        return self
+
+    def consume(self, readings):
+        """Adds iter_readings output."""
+        for customer, dt, kwh in readings:
+            self.add(customer, dt, kwh)
+        return self
+
+    @property
+    def customers(self):
+        return list(self.totals)
+
+    def days_covered(self, customer):
+        first, last = self.spans[customer]
+        return last // SLOTS_PER_DAY - first // SLOTS_PER_DAY + 1
+
+    def monthly(self, customer, cycle_type):
+        """{(year, month): {period: kWh}} for one customer and cycle."""
+        return {key: dict(zip(PERIODS, by_cycle[cycle_type]))
+                for key, by_cycle in sorted(self.totals[customer].items())}
+
+    def tou_consumption(self, customer, cycle_type, months=None):
+        """
+        kWh per period over all months (or the given (year, month) keys),
+        with Super Off Peak merged into Off Peak, as used by get_tou_cost.
+        """
+        sums = [0.0] * len(PERIODS)
+        for key, by_cycle in self.totals[customer].items():
+            if months is not None and key not in months:
+                continue
+            for i, val in enumerate(by_cycle[cycle_type]):
+                sums[i] += val
+        return portugal_tou.merge_super_off_peak(sums)
+
+def load_series(readings, typecode='d'):
+    """
+    {customer: quarter_hours.QuarterHourSeries} of the raw 15-minute kWh
+    from iter_quarter_hours output, for analyses that need every reading
+    (peaks, load shapes). Readings are buffered as integer quarter-hour
+    indices and values in arrays, so a year of one customer takes well under
+    1 MB.
+    """
+    buffers = {}
+    for customer, q, kwh in readings:
+        buf = buffers.get(customer)
+        if buf is None:
+            buf = buffers[customer] = (array('i'), array(typecode))
+        buf[0].append(q)
+        buf[1].append(kwh)
+    return {customer: quarter_hours.QuarterHourSeries.from_readings(indices, values, typecode)
+            for customer, (indices, values) in buffers.items()}
+
+def iter_customer_totals(readings, cycle_types=CYCLES):
+    """
+    Yields (customer, MeterAggregator) from iter_quarter_hours output each
+    time the customer changes, for exports sorted by customer. Only one
+    customer is held in memory.
+    """
+    current = None
+    agg = None
+    for customer, q, kwh in readings:
+        if agg is None or customer != current:
+            if agg is not None:
+                yield current, agg
+            current = customer
+            agg = MeterAggregator(cycle_types)
+        agg.add_quarter_hour(customer, q, kwh)
+    if agg is not None:
+        yield current, agg
@@ -1,190 +1,440 @@
-import csv
 import datetime
+import functools
+import json
+import os
+import re
+from array import array
+
+import quarter_hours
+import rlp_store
+import timing
+import tou_calendar
+import tou_schedule
+from tou_calendar import WEEKDAY, SATURDAY, SUNDAY, WINTER, SUMMER
+from tou_schedule import PERIODS, SLOTS_PER_DAY
+
+def merge_super_off_peak(values):
+    """
+    {period: value} for values in PERIODS order, with Super Off Peak merged
+    into Off Peak as residential contracts bill them.
+    """
+    result = dict(zip(PERIODS, values))
+    result['off_peak'] += result.pop('super_off_peak')
+    return result
+
+class TimeInterval(quarter_hours.SlotInterval):
+    """
+    Interval of the day given in decimal hours (e.g. 9.25 to 10.5). start and
+    end stay in hours; the bounds are kept as integer quarter-hour slots
+    (start_slot, end_slot) so boundary checks are exact.
+    """
+    __slots__ = ()
 
-class TimeInterval:
     def __init__(self, start, end):
-        self.start = float(start)
-        self.end = float(end)
+        super().__init__(quarter_hours.hours_to_slot(start), quarter_hours.hours_to_slot(end))
+
+    @property
+    def start(self):
+        return quarter_hours.slot_to_hours(self.start_slot)
+
+    @property
+    def end(self):
+        return quarter_hours.slot_to_hours(self.end_slot)
 
     def contains(self, hour_decimal):
-        # Handle crossing midnight if needed, but the provided rules usually split at 0
-        if self.start <= self.end:
-            return self.start <= hour_decimal < self.end
-        else:
-            # Crosses midnight (e.g. 22 to 2) - Not used in provided rules but good for robustness if needed
-            return self.start <= hour_decimal or hour_decimal < self.end
+        # Crossing midnight (e.g. 22 to 2) is handled by SlotInterval
+        return super().contains(quarter_hours.hour_slot(hour_decimal))
 
 class PortugueseTOUCycle:
     """
     Implementation of Portuguese TOU Cycles (Diário/Semanal).
+    schedule: tou_schedule.Schedule defining the cycle (default: the ERSE
+    schedule in schedules/erse.json).
     """
-    def __init__(self, cycle_type='daily'):
+    def __init__(self, cycle_type='daily', holidays=False, schedule=None):
         self.cycle_type = cycle_type
+        self.holidays = holidays # treat national holidays as Sundays
+        self.schedule = schedule or tou_schedule.load_schedule()
+        if cycle_type not in self.schedule.cycles:
+            raise ValueError(f"Unknown cycle {cycle_type!r} in schedule {self.schedule.name!r}")
+        self._day_rows = {}
 
     def _is_summer_time(self, dt):
         """
         Determine if it is Summer Time (Hora Legal de Verão).
-        Portugal (CET/CEST): Last Sunday March -> Last Sunday Oct.
-        Using a simplified rule based on date ranges as requested.
-        """
-        # Last Sunday of March
-        march_31 = datetime.date(dt.year, 3, 31)
-        last_sunday_march = march_31 - datetime.timedelta(days=(march_31.weekday() + 1) % 7)
-        
-        # Last Sunday of October
-        oct_31 = datetime.date(dt.year, 10, 31)
-        last_sunday_oct = oct_31 - datetime.timedelta(days=(oct_31.weekday() + 1) % 7)
-
-        current_date = dt.date()
-        
-        # Summer time starts at 1AM UTC on last Sunday of March and ends at 2AM UTC on last Sunday Oct
-        # Simplified: Check if date is strictly between
-        if last_sunday_march < current_date < last_sunday_oct:
-            return True
-        elif current_date == last_sunday_march:
-             return dt.hour >= 1 # After 1AM
-        elif current_date == last_sunday_oct:
-             return dt.hour < 2 # Before 2AM
-        
-        return False
+        Portugal: Last Sunday March -> Last Sunday Oct, see tou_calendar.
+        """
+        return tou_calendar.is_summer_time(dt)
 
     def _get_intervals(self, is_summer, is_weekend, weekday):
         """
         Returns dictionary of {period_name: [intervals]}
         weekday: 0=Mon, 6=Sun
         """
-        intervals = {
-            'peak': [],         # Ponta
-            'mid_peak': [],     # Cheias
-            'off_peak': [],     # Vazio
-            'super_off_peak': [] # Super Vazio
-        }
-        
-        if self.cycle_type == 'daily':
-            if not is_summer: # Winter
-                intervals['peak'] = [TimeInterval(9, 10.5), TimeInterval(18, 20.5)]
-                intervals['mid_peak'] = [TimeInterval(8, 9), TimeInterval(10.5, 18), TimeInterval(20.5, 22)]
-                intervals['off_peak'] = [TimeInterval(6, 8), TimeInterval(22, 24), TimeInterval(0, 2)]
-                intervals['super_off_peak'] = [TimeInterval(2, 6)]
-            else: # Summer
-                intervals['peak'] = [TimeInterval(10.5, 13), TimeInterval(19.5, 21)]
-                intervals['mid_peak'] = [TimeInterval(8, 10.5), TimeInterval(13, 19.5), TimeInterval(21, 22)]
-                intervals['off_peak'] = [TimeInterval(6, 8), TimeInterval(22, 24), TimeInterval(0, 2)]
-                intervals['super_off_peak'] = [TimeInterval(2, 6)]
-                
-        elif self.cycle_type == 'weekly':
-            is_saturday = (weekday == 5)
-            is_sunday = (weekday == 6)
-            
-            if not is_summer: # Winter
-                if not is_weekend: # Mon-Fri
-                    intervals['peak'] = [TimeInterval(9.5, 12), TimeInterval(18.5, 21)]
-                    intervals['mid_peak'] = [TimeInterval(7, 9.5), TimeInterval(12, 18.5), TimeInterval(21, 24)]
-                    intervals['off_peak'] = [TimeInterval(0, 2), TimeInterval(6, 7)]
-                    intervals['super_off_peak'] = [TimeInterval(2, 6)]
-                elif is_saturday:
-                    intervals['mid_peak'] = [TimeInterval(9.5, 13), TimeInterval(18.5, 22)]
-                    intervals['off_peak'] = [TimeInterval(0, 2), TimeInterval(6, 9.5), TimeInterval(13, 18.5), TimeInterval(22, 24)]
-                    intervals['super_off_peak'] = [TimeInterval(2, 6)]
-                elif is_sunday:
-                    intervals['off_peak'] = [TimeInterval(0, 2), TimeInterval(6, 24)]
-                    intervals['super_off_peak'] = [TimeInterval(2, 6)]
-            
-            else: # Summer
-                if not is_weekend: # Mon-Fri
-                    intervals['peak'] = [TimeInterval(9.25, 12.25)]
-                    intervals['mid_peak'] = [TimeInterval(7, 9.25), TimeInterval(12.25, 24)]
-                    intervals['off_peak'] = [TimeInterval(0, 2), TimeInterval(6, 7)]
-                    intervals['super_off_peak'] = [TimeInterval(2, 6)]
-                elif is_saturday:
-                    intervals['mid_peak'] = [TimeInterval(9, 14), TimeInterval(20, 22)]
-                    intervals['off_peak'] = [TimeInterval(0, 2), TimeInterval(6, 9), TimeInterval(14, 20), TimeInterval(22, 24)]
-                    intervals['super_off_peak'] = [TimeInterval(2, 6)]
-                elif is_sunday:
-                    intervals['off_peak'] = [TimeInterval(0, 2), TimeInterval(6, 24)]
-                    intervals['super_off_peak'] = [TimeInterval(2, 6)]
-        
-        return intervals
+        day_type = SUNDAY if weekday == 6 else SATURDAY if weekday == 5 else WEEKDAY
+        spans = self.schedule.intervals(self.cycle_type, SUMMER if is_summer else WINTER, day_type)
+        return {name: [TimeInterval(start, end) for start, end in intervals] for name, intervals in spans.items()}
+
+    @property
+    def table(self):
+        """
+        Period codes indexed by (season, day type, quarter-hour slot), see
+        tou_schedule.Schedule.table. Season: 0=Winter, 1=Summer.
+        """
+        return self.schedule.table(self.cycle_type)
+
+    def _table_row(self, season, day_type):
+        base = (season * 3 + day_type) * SLOTS_PER_DAY
+        return self.table[base:base + SLOTS_PER_DAY]
+
+    def day_row(self, date):
+        """
+        Returns the 96 period codes for a calendar date.
+        On DST transition days the row switches season at the transition hour.
+        """
+        row = self._day_rows.get(date)
+        if row is not None:
+            return row
+
+        season, day_type, transition = tou_calendar.decode(tou_calendar.day_code(date, self.holidays))
+        row = self._table_row(season, day_type)
+        if transition != tou_calendar.NO_TRANSITION:
+            # Transition day: the other season from the transition hour on
+            hour = (tou_calendar.SUMMER_START_HOUR if transition == tou_calendar.SPRING_FORWARD
+                    else tou_calendar.SUMMER_END_HOUR)
+            row = row[:hour * 4] + self._table_row(1 - season, day_type)[hour * 4:]
+
+        self._day_rows[date] = row
+        return row
+
+    def _fold_code(self, dt):
+        # Repeated hour after the clocks go back is already winter time
+        if tou_calendar.decode(tou_calendar.day_code(dt.date()))[2] == tou_calendar.FALL_BACK \
+                and dt.hour == tou_calendar.SUMMER_END_HOUR - 1:
+            day_type = tou_calendar.decode(tou_calendar.day_code(dt.date(), self.holidays))[1]
+            return self._table_row(WINTER, day_type)[dt.hour * 4 + dt.minute // 15]
+        return self.day_row(dt.date())[dt.hour * 4 + dt.minute // 15]
+
+    def get_period_code(self, dt):
+        if dt.fold:
+            return self._fold_code(dt)
+        return self.day_row(dt.date())[dt.hour * 4 + dt.minute // 15]
 
     def get_period_name(self, dt):
-        is_summer = self._is_summer_time(dt)
-        weekday = dt.weekday()
-        is_weekend = weekday >= 5
-        
-        intervals_map = self._get_intervals(is_summer, is_weekend, weekday)
-        
-        current_hour = dt.hour + dt.minute / 60.0
-        
-        for period_name, intervals in intervals_map.items():
-            for interval in intervals:
-                if interval.contains(current_hour):
-                    return period_name
-        
-        return 'off_peak'
-
-def load_and_calculate_tou(csv_path, cycle_type, ref_kwh, ref_month):
+        return PERIODS[self.get_period_code(dt)]
+
+    def classify(self, timestamps):
+        """
+        Classifies a sequence of datetimes in one call.
+        Returns an array('B') of period codes (see PERIODS).
+        """
+        codes = array('B')
+        append = codes.append
+        last_date = None
+        row = None
+        for dt in timestamps:
+            date = dt.date()
+            if date != last_date:
+                row = self.day_row(date)
+                last_date = date
+            if dt.fold:
+                append(self._fold_code(dt))
+                continue
+            append(row[dt.hour * 4 + dt.minute // 15])
+        return codes
+
+    def classify_quarter_hours(self, indices):
+        """
+        Same as classify() for quarter-hour indices (see quarter_hours).
+        """
+        codes = array('B')
+        append = codes.append
+        last_day = None
+        row = None
+        for q in indices:
+            day, slot = divmod(q, SLOTS_PER_DAY)
+            if day != last_day:
+                row = self.day_row(_epoch_day_to_date(day))
+                last_day = day
+            append(row[slot])
+        return codes
+
+    def classify_epoch(self, seconds):
+        """
+        Same as classify() for wall-clock epoch seconds (see rlp_store).
+        """
+        codes = array('B')
+        append = codes.append
+        last_day = None
+        row = None
+        for t in seconds:
+            day, sec = divmod(t, 86400)
+            if day != last_day:
+                row = self.day_row(_epoch_day_to_date(day))
+                last_day = day
+            append(row[sec // 900])
+        return codes
+
+def _epoch_day_to_date(day):
+    return datetime.date(1970, 1, 1) + datetime.timedelta(days=day)
+
+CYCLES = ('daily', 'weekly')
+
+RLP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rlp')
+
+def find_profile(year=None, rlp_dir=RLP_DIR):
     """
-    Parses the RLP CSV and returns scaled consumption for each TOU period.
+    Path of the E-REDES BTN profile CSV for `year` (EREDES_<year>_BTN_*.csv),
+    or of the latest year available when year is None.
     """
-    tou_totals = {'peak': 0.0, 'mid_peak': 0.0, 'off_peak': 0.0, 'super_off_peak': 0.0}
-    raw_month_total = 0.0
-    raw_annual_total = 0.0
-    
-    cycle = PortugueseTOUCycle(cycle_type)
-
-    with open(csv_path, 'r') as f:
-        reader = csv.reader(f)
-        header = next(reader) 
-        # Header: Datetime, BTN A - Wh, BTN B - Wh, BTN C - Wh
-        # We assume BTN C is index 3
-        
-        btn_c_idx = 3
-
-        for row in reader:
-            if not row: continue
-            dt_str = row[0]
-            try:
-                # Format: 01/01/2025 00:00
-                dt = datetime.datetime.strptime(dt_str, "%d/%m/%Y %H:%M")
-            except ValueError:
-                continue
+    profiles = {}
+    for name in sorted(os.listdir(rlp_dir)):
+        m = re.match(r'EREDES_(\d{4})_BTN_.*\.csv$', name)
+        if m:
+            profiles.setdefault(int(m.group(1)), os.path.join(rlp_dir, name))
+    if year is None and profiles:
+        year = max(profiles)
+    if year not in profiles:
+        raise FileNotFoundError(f"No RLP profile for {year or 'any year'} in {rlp_dir}")
+    return profiles[year]
 
-            try:
-                val = float(row[btn_c_idx])
-            except (ValueError, IndexError):
-                continue
+# Profile column used for residential estimates (BTN C)
+DEFAULT_COLUMN = 2
+
+INDEX_SUFFIX = '.tou.json'
+
+def schedule_version():
+    """
+    Hash of the compiled schedules of every cycle. Persisted aggregates are
+    only reused while this matches, so editing the schedule file rebuilds them.
+    """
+    return tou_schedule.load_schedule().digest(CYCLES)
+
+class TOUIndex:
+    """
+    Aggregated profile energy: Wh per (profile column, cycle, month, period).
+    totals[cycle_type][column] is a 12 x len(PERIODS) list (January first).
+    Any scaling query is a lookup plus a multiply.
+    """
+    def __init__(self, names, totals, source_hash, schedule_hash):
+        self.names = names
+        self.totals = totals
+        self.source_hash = source_hash
+        self.schedule_hash = schedule_hash
+
+    def _column_index(self, column):
+        if isinstance(column, int):
+            return column
+        return self.names.index(column)
+
+    def month_totals(self, cycle_type, column=DEFAULT_COLUMN):
+        """Returns the 12 x len(PERIODS) Wh table for a cycle and column."""
+        return self.totals[cycle_type][self._column_index(column)]
+
+    def raw_total(self, column=DEFAULT_COLUMN, month=0):
+        """Profile Wh for a month (1-12), or the whole year if month is 0."""
+        months = self.totals[CYCLES[0]][self._column_index(column)]
+        if month > 0:
+            return sum(months[month - 1])
+        return sum(sum(m) for m in months)
+
+    def scaling_factor(self, ref_kwh, ref_month, column=DEFAULT_COLUMN):
+        raw = self.raw_total(column, ref_month)
+        if raw > 0:
+            # If user consumed X in Jan, and Jan is Y% of total in profile, then Annual = X / Y%.
+            # Or simply: Scale everything by (User_Jan / Profile_Jan)
+            return (ref_kwh * 1000) / raw # input kwh -> Wh
+        if ref_month > 0:
+            print(f"Warning: No data found for month {ref_month} in profile.")
+        return 1.0
+
+    def period_totals(self, cycle_type, column=DEFAULT_COLUMN):
+        """Annual profile Wh per period (in PERIODS order)."""
+        months = self.month_totals(cycle_type, column)
+        return [sum(m[i] for m in months) for i in range(len(PERIODS))]
+
+    def query(self, cycle_type, ref_kwh, ref_month, column=DEFAULT_COLUMN):
+        """
+        Scaled annual kWh per period, with Super Off Peak merged into Off Peak.
+        """
+        scaling_factor = self.scaling_factor(ref_kwh, ref_month, column)
+
+        # Apply scaling and convert Wh to kWh
+        return merge_super_off_peak((val * scaling_factor) / 1000.0
+                                    for val in self.period_totals(cycle_type, column))
+
+    def to_json(self):
+        return {
+            'source_hash': self.source_hash,
+            'schedule_hash': self.schedule_hash,
+            'names': self.names,
+            'totals': self.totals,
+        }
 
-            raw_annual_total += val
-            
-            # If ref_month is specified (1-12), track total for that month
-            if ref_month > 0 and dt.month == ref_month:
-                raw_month_total += val
-            
-            period = cycle.get_period_name(dt)
-            tou_totals[period] += val
-
-    # Calculate scaling factor
-    scaling_factor = 1.0
-    if ref_month > 0:
-        if raw_month_total > 0:
-             # Scale so that the specific month matches ref_kwh
-             # BUT we want annual estimate. 
-             # So we assume the *shape* is correct. 
-             # If user consumed X in Jan, and Jan is Y% of total in profile, then Annual = X / Y%.
-             # Or simply: Scale everything by (User_Jan / Profile_Jan)
-             scaling_factor = (ref_kwh * 1000) / raw_month_total # input kwh -> Wh
-        else:
-             print(f"Warning: No data found for month {ref_month} in profile.")
-    else:
-        if raw_annual_total > 0:
-             scaling_factor = (ref_kwh * 1000) / raw_annual_total
-
-    # Apply scaling and convert Wh to kWh
-    final_totals = {}
-    for p, val in tou_totals.items():
-        final_totals[p] = (val * scaling_factor) / 1000.0
-        
-    # Merge Super Off Peak into Off Peak for Residential
-    final_totals['off_peak'] += final_totals.pop('super_off_peak', 0)
-    
-    return final_totals
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['names'], data['totals'], data['source_hash'], data['schedule_hash'])
+
+def build_tou_index(profile):
+    """
+    Aggregates an rlp_store.RLPProfile into a TOUIndex in a single pass.
+    Missing (NaN) readings are skipped.
+    """
+    ncols = len(profile.values)
+    nperiods = len(PERIODS)
+    with timing.phase('index.classify', len(profile.timestamps) * len(CYCLES)):
+        codes = {c: PortugueseTOUCycle(c).classify_epoch(profile.timestamps) for c in CYCLES}
+    # flat[cycle][(col * 12 + month - 1) * nperiods + code]
+    flat = {c: [0.0] * (ncols * 12 * nperiods) for c in CYCLES}
+    code_columns = [(flat[c], codes[c]) for c in CYCLES]
+
+    with timing.phase('index.aggregate', len(profile.timestamps)):
+        last_day = None
+        month_base = 0
+        for i, t in enumerate(profile.timestamps):
+            day = t // 86400
+            if day != last_day:
+                month_base = (_epoch_day_to_date(day).month - 1) * nperiods
+                last_day = day
+            for col in range(ncols):
+                val = profile.values[col][i]
+                if val != val: continue # NaN: missing reading
+                base = col * 12 * nperiods + month_base
+                for totals, cycle_codes in code_columns:
+                    totals[base + cycle_codes[i]] += val
+
+    totals = {}
+    for c in CYCLES:
+        totals[c] = [
+            [flat[c][(col * 12 + m) * nperiods:(col * 12 + m + 1) * nperiods] for m in range(12)]
+            for col in range(ncols)
+        ]
+    return TOUIndex(list(profile.names), totals, profile.source_hash, schedule_version())
+
+def _read_index(index_path, source_hash, schedule_hash):
+    try:
+        with open(index_path, 'r') as f:
+            index = TOUIndex.from_json(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if index.source_hash != source_hash or index.schedule_hash != schedule_hash:
+        return None
+    return index
+
+def _write_index(index_path, index):
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(index.to_json(), f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+
+@functools.lru_cache(maxsize=8)
+def _cached_tou_index(csv_path, size, mtime_ns, schedule_hash):
+    profile = rlp_store.load_profile(csv_path)
+    index_path = csv_path + INDEX_SUFFIX
+    with timing.phase('index.read'):
+        index = _read_index(index_path, profile.source_hash, schedule_hash)
+    if index is None:
+        index = build_tou_index(profile)
+        with timing.phase('index.write'):
+            _write_index(index_path, index)
+    return index
+
+def get_tou_index(csv_path):
+    """
+    Returns the TOUIndex for a profile CSV. The index is persisted next to the
+    CSV and kept in an in-process LRU; both are refreshed when the CSV or the
+    cycle schedules change.
+    """
+    st = os.stat(csv_path)
+    return _cached_tou_index(os.path.abspath(csv_path), st.st_size, st.st_mtime_ns, schedule_version())
+
+# Billed groups of TOU periods per tariff type
+TARIFF_GROUPS = {
+    'simple': {'total': PERIODS},
+    'bi-hourly': {'peak': ('peak', 'mid_peak'), 'off_peak': ('off_peak', 'super_off_peak')}, # Fora de Vazio / Vazio
+    'tri-hourly': {'peak': ('peak',), 'mid_peak': ('mid_peak',), 'off_peak': ('off_peak', 'super_off_peak')},
+}
+
+class TOUSummary:
+    """
+    Scaled annual kWh for every profile column x cycle x tariff type.
+    kwh[column][cycle] is {period: kWh} with all four PERIODS.
+    """
+    def __init__(self, kwh, ref_kwh, ref_month):
+        self.kwh = kwh
+        self.ref_kwh = ref_kwh
+        self.ref_month = ref_month
+
+    @property
+    def columns(self):
+        return list(self.kwh)
+
+    def periods(self, column, cycle_type):
+        return self.kwh[column][cycle_type]
+
+    def annual_kwh(self, column):
+        return sum(self.kwh[column][CYCLES[0]].values())
+
+    def grouped(self, column, cycle_type, tariff_type):
+        """kWh per billed group of tariff_type, e.g. {'peak': .., 'off_peak': ..}."""
+        periods = self.kwh[column][cycle_type]
+        return {group: sum(periods[p] for p in members)
+                for group, members in TARIFF_GROUPS[tariff_type].items()}
+
+    def combinations(self):
+        """Yields (column, cycle, tariff_type, grouped kWh) for every combination."""
+        for column in self.kwh:
+            for cycle_type in CYCLES:
+                for tariff_type in TARIFF_GROUPS:
+                    yield column, cycle_type, tariff_type, self.grouped(column, cycle_type, tariff_type)
+
+    def to_dict(self):
+        return {
+            'ref_kwh': self.ref_kwh,
+            'ref_month': self.ref_month,
+            'columns': {
+                column: {
+                    cycle_type: {t: self.grouped(column, cycle_type, t) for t in TARIFF_GROUPS}
+                    for cycle_type in CYCLES
+                }
+                for column in self.kwh
+            },
+        }
+
+def calculate_all_tou(csv_path, ref_kwh, ref_month):
+    """
+    Scaled consumption for every profile column, cycle and tariff type from a
+    single aggregation of the profile. Each column is scaled to ref_kwh.
+    """
+    index = get_tou_index(csv_path)
+    kwh = {}
+    for col, name in enumerate(index.names):
+        factor = index.scaling_factor(ref_kwh, ref_month, col)
+        kwh[name] = {
+            c: {p: val * factor / 1000.0 for p, val in zip(PERIODS, index.period_totals(c, col))}
+            for c in CYCLES
+        }
+    return TOUSummary(kwh, ref_kwh, ref_month)
+
+def load_and_calculate_tou(csv_path, cycle_type, ref_kwh, ref_month, column=DEFAULT_COLUMN):
+    """
+    Parses the RLP CSV and returns scaled consumption for each TOU period.
+    column: profile column name or index (default BTN C).
+    """
+    index = get_tou_index(csv_path)
+    with timing.phase('index.query'):
+        return index.query(cycle_type, ref_kwh, ref_month, column)
+
+def scaled_consumption(csv_path, ref_kwh, ref_month, column=DEFAULT_COLUMN):
+    """
+    Scaled 15-minute consumption as (timestamps, array('d') of kWh per slot).
+    Timestamps are the profile's wall-clock epoch seconds (see rlp_store).
+    Missing readings count as 0 kWh.
+    """
+    factor = get_tou_index(csv_path).scaling_factor(ref_kwh, ref_month, column) / 1000.0
+    profile = rlp_store.load_profile(csv_path)
+    values = profile.column(column)
+    return profile.timestamps, array('d', [v * factor if v == v else 0.0 for v in values])
@@ -1,4 +1,8 @@
+import time
+_STARTED = time.perf_counter()
+
 import argparse
+import json
 import sys
 import os
 
@@ -6,6 +10,20 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import portugal_tou
+import tariff_catalog
+import meter_ingest
+import dynamic_tariff
+import sensitivity
+import tou_breakeven
+import load_shift
+import solar
+import timing
+import billing
+import calibration
+import contracted_power
+import scenario_cache
+
+_IMPORT_SECONDS = time.perf_counter() - _STARTED
 
 def compute_total_cost(price_per_kwh, daily_fee, annual_consumption, days=365):
     """
@@ -38,6 +56,335 @@ def find_break_even(price1, fee1, price2, fee2, days=365):
     except ZeroDivisionError:
         return None
 
+def run_catalog(args):
+    """
+    Ranks every offer of args.catalog against the estimated consumption.
+    """
+    if args.ref_kwh is None:
+        print("Error: --ref-kwh is required with --catalog.")
+        sys.exit(1)
+
+    column = f"BTN {args.btn_class} - Wh"
+    try:
+        csv_path = portugal_tou.find_profile(args.profile_year)
+        catalog = tariff_catalog.TariffCatalog.from_file(args.catalog)
+        consumption = tariff_catalog.estimate_consumption(csv_path, args.ref_kwh, args.ref_month, column)
+    except (OSError, ValueError) as e:
+        print(f"Error loading catalog: {e}")
+        sys.exit(1)
+
+    effective_annual_kwh = sum(next(iter(consumption.values())).values())
+    print(f"Estimated Annual Consumption: {effective_annual_kwh:.2f} kWh")
+    print(f"Cheapest {min(args.top, len(catalog))} of {len(catalog)} offers:")
+    cache = get_cache(args)
+    if cache is not None:
+        ranking = [(r['rank'], r['name'], r['tariff_type'], r['cycle'], r['cost'])
+                   for r in cache.rank(catalog.offers, csv_path, args.ref_kwh, args.ref_month, column,
+                                       args.top, args.days)]
+    else:
+        ranking = [(rank, o.name, o.tariff_type, o.cycle, cost)
+                   for rank, o, cost in catalog.rank(consumption, args.top, args.days)]
+    for rank, name, tariff_type, cycle, cost in ranking:
+        cycle = '' if tariff_type == 'simple' else f" {cycle}"
+        print(f"  {rank:>3}. {name} ({tariff_type}{cycle}): €{cost:.2f}")
+
+    if args.sensitivity:
+        report_sensitivity(args, catalog.offers)
+
+def get_cache(args):
+    """ScenarioCache on --cache-dir, or None when results are not cached."""
+    if not args.cache_dir:
+        return None
+    try:
+        return scenario_cache.ScenarioCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 2**20))
+    except OSError as e:
+        print(f"Warning: result cache disabled ({e})")
+        return None
+
+def load_meter(args):
+    """
+    Streams args.meter_file and returns (MeterAggregator, customer).
+    """
+    fmt = meter_ingest.METER_FORMATS[args.meter_format]
+    readings = meter_ingest.iter_quarter_hours(args.meter_file, fmt)
+    if args.meter_customer is not None:
+        readings = (r for r in readings if r[0] == args.meter_customer)
+    try:
+        agg = meter_ingest.MeterAggregator().consume_quarter_hours(readings)
+    except (OSError, ValueError) as e:
+        print(f"Error reading meter file: {e}")
+        sys.exit(1)
+
+    if not agg.customers:
+        print("Error: No readings found in meter file.")
+        sys.exit(1)
+    customer = agg.customers[0]
+    if len(agg.customers) > 1:
+        print(f"Meter file holds {len(agg.customers)} customers; using {customer}. Use --meter-customer to choose.")
+    print(f"Metered {agg.readings} readings over {agg.days_covered(customer)} days.")
+    return agg, customer
+
+def indexed_cost(args):
+    """
+    Annual cost of the indexed offer described by the --spot-* arguments,
+    using the scaled 15-minute profile. Prints a per-period breakdown.
+    """
+    if args.spot_fee is None:
+        print("Error: --spot-fee is required with --spot-prices.")
+        sys.exit(1)
+    if args.meter_file or args.ref_kwh is None:
+        print("Error: --spot-prices needs --ref-kwh (meter files are not supported).")
+        sys.exit(1)
+
+    # Simple comparisons treat --ref-kwh as annual
+    ref_month = args.ref_month if args.tariff_type != 'simple' else 0
+    column = f"BTN {args.btn_class} - Wh"
+    try:
+        csv_path = portugal_tou.find_profile(args.profile_year)
+        timestamps, kwh = portugal_tou.scaled_consumption(csv_path, args.ref_kwh, ref_month, column)
+        prices = dynamic_tariff.load_prices(args.spot_prices)
+        spot = dynamic_tariff.align_prices(prices, args.spot_column or 0, timestamps, args.spot_unit)
+    except (OSError, ValueError) as e:
+        print(f"Error loading spot prices: {e}")
+        sys.exit(1)
+
+    rates = dynamic_tariff.indexed_rates(spot, args.spot_margin, args.spot_loss)
+    codes = portugal_tou.PortugueseTOUCycle(args.cycle).classify_epoch(timestamps)
+    print(f"Indexed offer by {args.cycle} TOU period:")
+    for period, b in dynamic_tariff.period_breakdown(kwh, rates, codes).items():
+        if b['kwh'] > 0:
+            print(f"  {period}: {b['kwh']:.2f} kWh at avg €{b['avg_rate']:.4f}/kWh = €{b['cost']:.2f}")
+    return dynamic_tariff.get_indexed_cost(kwh, rates, args.spot_fee, args.days)
+
+def report_sensitivity(args, offers):
+    """
+    Runs the --sensitivity Monte Carlo over `offers` and prints the results.
+    """
+    if args.ref_kwh is None or args.meter_file:
+        print("Error: --sensitivity needs --ref-kwh (meter files are not supported).")
+        sys.exit(1)
+    # Simple comparisons treat --ref-kwh as annual
+    ref_month = args.ref_month if args.tariff_type != 'simple' or args.catalog else 0
+    try:
+        index = portugal_tou.get_tou_index(portugal_tou.find_profile(args.profile_year))
+    except OSError as e:
+        print(f"Error loading profile: {e}")
+        sys.exit(1)
+
+    result = sensitivity.run_sensitivity(
+        index, offers, args.ref_kwh, ref_month, scenarios=args.sensitivity, seed=args.seed,
+        workers=args.workers, days=args.days, kwh_spread=args.kwh_spread, shape_spread=args.shape_spread,
+        sample_month=args.sample_month, column=f"BTN {args.btn_class} - Wh")
+
+    print(f"Sensitivity over {result.scenarios} scenarios (seed {args.seed}):")
+    print(f"  {'Contract':<30} {'P(cheapest)':>11} {'P5':>10} {'P50':>10} {'P95':>10}")
+    rows = zip(offers, result.probability_cheapest(), result.percentiles((5, 50, 95)))
+    for offer, p, pct in sorted(rows, key=lambda r: -r[1]):
+        print(f"  {offer.name:<30} {p:>11.1%} {pct[5]:>10.2f} {pct[50]:>10.2f} {pct[95]:>10.2f}")
+
+def report_tou_break_even(args, annual_kwh):
+    """
+    Prints where the two TOU contracts break even, using the profile's
+    per-period split for args.cycle.
+    """
+    try:
+        index = portugal_tou.get_tou_index(portugal_tou.find_profile(args.profile_year))
+    except OSError as e:
+        print(f"Error loading profile: {e}")
+        sys.exit(1)
+    column = f"BTN {args.btn_class} - Wh"
+    offers = [tariff_catalog.make_offer(str(i), args.tariff_type, args.cycle, fee, prices)
+              for i, (prices, fee) in enumerate([(args.price1, args.fee1), (args.price2, args.fee2)], start=1)]
+    c1, c2 = tou_breakeven.linear_costs(index, offers, args.days, column)
+    off_share = tou_breakeven.profile_shares(index, args.cycle, column)['off_peak']
+
+    kwh = tou_breakeven.break_even_kwh(c1, c2, off_share)
+    if kwh is None:
+        print(f"No break-even consumption at the profile off-peak share ({off_share:.1%}).")
+    else:
+        print(f"Break-even consumption at {off_share:.1%} off-peak: {kwh:.2f} kWh per year")
+    share = tou_breakeven.break_even_share(c1, c2, annual_kwh)
+    if share is None:
+        print(f"No break-even off-peak share at {annual_kwh:.2f} kWh.")
+    else:
+        print(f"Break-even off-peak share at {annual_kwh:.2f} kWh: {share:.1%}")
+
+    if args.breakeven_csv:
+        shares = tou_breakeven.linspace(0.0, 1.0, 101)
+        with open(args.breakeven_csv, 'w') as f:
+            f.write("off_peak_share,break_even_kwh\n")
+            for x, k in zip(shares, tou_breakeven.break_even_curve(c1, c2, shares)):
+                f.write(f"{x:.2f},{'' if k != k else f'{k:.2f}'}\n")
+        print(f"Break-even curve written to {args.breakeven_csv}")
+
+def report_load_shift(args, tou_consumption, contracts):
+    """
+    Adds the --shift-load appliances to the TOU estimate and prints, per
+    contract, what scheduling them into the cheapest quarter-hours saves
+    compared with running them as soon as their window opens.
+    contracts: [(label, rates, daily_fee)]
+    """
+    try:
+        appliances = [load_shift.Appliance.parse(spec) for spec in args.shift_load]
+        year = load_shift.profile_year(portugal_tou.find_profile(args.profile_year))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    for label, rates, fee in contracts:
+        results = load_shift.optimize_loads(appliances, rates, args.cycle, year)
+        print(f"Flexible loads under {label}:")
+        for r in results:
+            print(f"  {r.appliance.name}: €{r.baseline_cost:.2f} -> €{r.optimized_cost:.2f} "
+                  f"(saves €{r.saving:.2f} per year)")
+        shifted = load_shift.shifted_consumption(tou_consumption, results)
+        split = ", ".join(f"{p}: {kwh:.2f} kWh" for p, kwh in shifted.items() if kwh > 0)
+        print(f"  New split: {split}")
+        unshifted = load_shift.shifted_consumption(tou_consumption, results, optimized=False)
+        before = get_tou_cost(unshifted, rates, fee, args.days)
+        after = get_tou_cost(shifted, rates, fee, args.days)
+        print(f"  Total: €{before:.2f} unshifted, €{after:.2f} shifted")
+
+def report_solar(args, contracts):
+    """
+    Nets PV generation (and an optional battery) against the estimated
+    profile and prints the grid import / export per TOU period and the cost
+    of each contract, with exports paid at --export-price.
+    contracts: [(label, rates, daily_fee)]
+    """
+    if args.ref_kwh is None or args.meter_file:
+        print("Error: --pv-kwp / --pv-file need --ref-kwh (meter files are not supported).")
+        sys.exit(1)
+    # Simple comparisons treat --ref-kwh as annual
+    ref_month = args.ref_month if args.tariff_type != 'simple' else 0
+    try:
+        csv_path = portugal_tou.find_profile(args.profile_year)
+        timestamps, kwh = portugal_tou.scaled_consumption(csv_path, args.ref_kwh, ref_month,
+                                                          f"BTN {args.btn_class} - Wh")
+        if args.pv_file:
+            pv = solar.load_pv(args.pv_file, args.pv_column or 0, timestamps, args.pv_unit)
+        else:
+            pv = solar.pv_model(timestamps, args.pv_yield)
+        battery = solar.Battery(args.battery_kwh, args.battery_kw, args.battery_efficiency) if args.battery_kwh else None
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    codes = portugal_tou.PortugueseTOUCycle(args.cycle).classify_epoch(timestamps)
+    kwp = args.pv_kwp if args.pv_kwp is not None else 1.0
+    result = solar.simulate(kwh, pv, codes, kwp, battery)
+
+    system = f"{kwp:g} kWp PV" + (f" + {args.battery_kwh:g} kWh battery" if battery else "")
+    print(f"With {system} ({result.generation:.2f} kWh generated, {result.self_consumption:.1%} self-consumed):")
+    for period in result.imports:
+        print(f"  {period}: import {result.imports[period]:.2f} kWh, export {result.exports[period]:.2f} kWh")
+    export_rates = tariff_catalog.map_rates([args.export_price], 'simple')
+    export_credit = get_tou_cost(result.exports, export_rates, 0.0, args.days)
+    for label, rates, fee in contracts:
+        cost = get_tou_cost(result.imports, rates, fee, args.days) - export_credit
+        print(f"  {label}: €{cost:.2f}")
+
+def size_contracted_power(args, meter, customer, bill, fit):
+    """
+    Prints the peak demand and the recommended contracted power for
+    --size-power and returns the contracted_power.Sizing.
+    """
+    try:
+        fees = contracted_power.FeeTable.from_file(args.power_fees)
+        if meter is not None:
+            fmt = meter_ingest.METER_FORMATS[args.meter_format]
+            readings = (r for r in meter_ingest.iter_quarter_hours(args.meter_file, fmt) if r[0] == customer)
+            peaks = contracted_power.meter_peaks(readings)[customer]
+            cv, source = contracted_power.METER_CV, "meter readings"
+        else:
+            csv_path = portugal_tou.find_profile(args.profile_year)
+            column = f"BTN {args.btn_class} - Wh"
+            if fit is not None:
+                annual_kwh = fit.annual_kwh(args.cycle)
+            elif bill is not None:
+                annual_kwh = sum(bill[0].estimate(args.cycle, args.ref_kwh, bill[1], bill[2]).values())
+            elif args.ref_kwh is not None:
+                ref_month = args.ref_month if args.tariff_type != 'simple' else 0
+                index = portugal_tou.get_tou_index(csv_path)
+                annual_kwh = index.scaling_factor(args.ref_kwh, ref_month, column) * index.raw_total(column) / 1000.0
+            else:
+                print("Error: --size-power needs --ref-kwh, --bill or --meter-file.")
+                sys.exit(1)
+            peaks = contracted_power.profile_peaks(csv_path, annual_kwh, column)
+            cv, source = contracted_power.PROFILE_CV, f"profile scaled to {annual_kwh:.2f} kWh"
+        if args.peak_cv is not None:
+            cv = args.peak_cv
+        sizing = contracted_power.size(peaks, fees, cv, args.peak_confidence, args.power_factor)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error sizing contracted power: {e}")
+        sys.exit(1)
+
+    print(f"Peak demand from {source}: {sizing.peaks[1]:.2f} kW (15 min), {sizing.peaks[4]:.2f} kW (1 h)")
+    print(f"  With a {sizing.margin:.2f}x peaking margin ({args.peak_confidence:.0%} confidence): "
+          f"{sizing.required_kva:.2f} kVA needed")
+    print(f"  Recommended contracted power: {sizing.kva:g} kVA at €{sizing.daily_fee:.4f}/day")
+    return sizing
+
+def contract_rates(args):
+    """[(label, {period: €/kWh}, daily fee)] for --price1/--fee1 and --price2/--fee2."""
+    contracts = []
+    for i, (prices, fee) in enumerate([(args.price1, args.fee1), (args.price2, args.fee2)], start=1):
+        try:
+            contracts.append((f"Contract {i}", tariff_catalog.map_rates(prices, args.tariff_type), fee))
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    return contracts
+
+def load_bill_period(args):
+    """
+    (BillingIndex, start, end) for --bill-start/--bill-end, or None when no
+    billing period was given.
+    """
+    if not args.bill_start and not args.bill_end:
+        return None
+    if not (args.bill_start and args.bill_end):
+        print("Error: --bill-start and --bill-end must be given together.")
+        sys.exit(1)
+    if args.meter_file or args.ref_kwh is None:
+        print("Error: --bill-start/--bill-end need --ref-kwh (the bill's consumption).")
+        sys.exit(1)
+    try:
+        start, end = billing.parse_date(args.bill_start), billing.parse_date(args.bill_end)
+        index = billing.get_billing_index(portugal_tou.find_profile(args.profile_year), f"BTN {args.btn_class} - Wh")
+        index.scaling_factor(args.ref_kwh, start, end)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    return index, start, end
+
+def load_calibration(args):
+    """calibration.Calibration fitted to the --bill values, or None when none were given."""
+    if not args.bill:
+        return None
+    if args.meter_file or args.bill_start or args.ref_kwh is not None:
+        print("Error: --bill replaces --ref-kwh, --bill-start/--bill-end and --meter-file.")
+        sys.exit(1)
+    try:
+        index = billing.get_billing_index(portugal_tou.find_profile(args.profile_year), f"BTN {args.btn_class} - Wh")
+        bills = [calibration.Bill.parse(spec, index.year) for spec in args.bill]
+        with timing.phase('calibration.fit', len(bills)):
+            fit = calibration.calibrate(index, bills, args.cycle)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(fit.summary())
+    return fit
+
+def report_bill(args, bill):
+    """Prints each contract's cost for the billing period, fees prorated to its days."""
+    index, start, end = bill
+    days = billing.billing_days(start, end)
+    consumption = index.estimate(args.cycle, args.ref_kwh, start, end, start, end)
+    print(f"For the billing period {start} to {end} ({days} days, {sum(consumption.values()):.2f} kWh):")
+    for label, rates, fee in contract_rates(args):
+        print(f"  {label}: €{get_tou_cost(consumption, rates, fee, days):.2f}")
+
 def main():
     parser = argparse.ArgumentParser(
         description="Compare two energy contracts (Simple or TOU) and compute cost."
@@ -53,15 +400,15 @@ def main():
     parser.add_argument("--cycle", choices=['daily', 'weekly'], default='daily',
                         help="Cycle type for TOU tariffs (default: daily)")
 
-    parser.add_argument("--price1", type=float, nargs='+', required=True,
+    parser.add_argument("--price1", type=float, nargs='+',
                         help="Price(s) (€/kWh) for Contract 1. Simple: 1 val. Bi: Peak, Off. Tri: Peak, Mid, Off.")
-    parser.add_argument("--fee1", type=float, required=True,
+    parser.add_argument("--fee1", type=float,
                         help="Daily fixed fee (€) for Contract 1")
     
     # Contract 2
-    parser.add_argument("--price2", type=float, nargs='+', required=True,
+    parser.add_argument("--price2", type=float, nargs='+',
                         help="Price(s) (€/kWh) for Contract 2. Matches tariff-type structure.")
-    parser.add_argument("--fee2", type=float, required=True,
+    parser.add_argument("--fee2", type=float,
                         help="Daily fixed fee (€) for Contract 2")
 
     # Consumption Reference
@@ -69,6 +416,103 @@ def main():
                         help="Reference consumption amount (kWh). Required for TOU or Cost Calculation.")
     parser.add_argument("--ref-month", type=int, default=0,
                         help="Reference month (1-12) or 0 for Annual. Required for TOU.")
+    parser.add_argument("--bill-start", metavar="DATE",
+                        help="First day of the bill --ref-kwh comes from (YYYY-MM-DD); replaces --ref-month")
+    parser.add_argument("--bill-end", metavar="DATE",
+                        help="Last day of that bill (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--bill", action='append', metavar="START,END,KWH[,SPLIT...]",
+                        help="A past bill to calibrate the annual estimate on, e.g. 2025-01-15,2025-02-14,300 "
+                             "or 2025-03,280; add the kWh per billed period (2 or 3 values) when the bill "
+                             "shows them. Repeatable; replaces --ref-kwh")
+
+    # Catalog mode
+    parser.add_argument("--catalog", metavar="PATH",
+                        help="Rank every offer in a catalog file (CSV or JSON) instead of comparing two contracts.")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of cheapest catalog offers to show (default: 10)")
+
+    # Smart-meter data
+    parser.add_argument("--meter-file", metavar="PATH",
+                        help="Use real 15-minute meter readings instead of the estimated profile.")
+    parser.add_argument("--meter-format", choices=sorted(meter_ingest.METER_FORMATS), default='eredes',
+                        help="Layout of --meter-file (default: eredes)")
+    parser.add_argument("--meter-customer", metavar="ID",
+                        help="Installation (CPE) to use when --meter-file holds several customers")
+
+    # Indexed (spot) offer
+    parser.add_argument("--spot-prices", metavar="PATH",
+                        help="Also cost an indexed offer from a spot price CSV (Datetime + price columns).")
+    parser.add_argument("--spot-column", default=None,
+                        help="Price column in --spot-prices (default: first)")
+    parser.add_argument("--spot-unit", choices=sorted(dynamic_tariff.PRICE_UNITS), default='MWh',
+                        help="Unit of the spot prices, €/MWh or €/kWh (default: MWh)")
+    parser.add_argument("--spot-margin", type=float, default=0.0,
+                        help="Retailer margin added to the spot price (€/kWh)")
+    parser.add_argument("--spot-loss", type=float, default=0.0,
+                        help="Loss factor applied to spot price plus margin (e.g. 0.15)")
+    parser.add_argument("--spot-fee", type=float,
+                        help="Daily fixed fee (€) for the indexed offer")
+
+    # Sensitivity analysis
+    parser.add_argument("--sensitivity", type=int, metavar="N",
+                        help="Run N Monte Carlo scenarios and report how often each contract is cheapest.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for --sensitivity (default: 0)")
+    parser.add_argument("--workers", type=int, help="Worker processes for --sensitivity (default: all cores)")
+    parser.add_argument("--kwh-spread", type=float, default=0.2,
+                        help="Lognormal sigma of the reference consumption (default: 0.2)")
+    parser.add_argument("--shape-spread", type=float, default=0.1,
+                        help="Lognormal sigma of the monthly and peak-share load shape (default: 0.1)")
+    parser.add_argument("--sample-month", action='store_true',
+                        help="Also sample the reference month uniformly")
+
+    parser.add_argument("--breakeven-csv", metavar="PATH",
+                        help="Write the TOU break-even curve (off-peak share vs annual kWh) to a CSV file")
+
+    parser.add_argument("--shift-load", action='append', metavar="NAME:KWH:KW:START-END[:contiguous]",
+                        help="Flexible load run daily within a time window (e.g. ev:10:3.7:19-8); "
+                             "reports the saving from shifting it to the cheapest periods. Repeatable.")
+
+    # Solar PV and battery
+    parser.add_argument("--pv-kwp", type=float,
+                        help="Installed PV power (kWp); generation is netted against the estimated profile")
+    parser.add_argument("--pv-file", metavar="PATH",
+                        help="PV power per kWp (Datetime + power columns); default: simple clear-sky model")
+    parser.add_argument("--pv-column", default=None, help="Power column in --pv-file (default: first)")
+    parser.add_argument("--pv-unit", choices=sorted(solar.POWER_UNITS), default='kW',
+                        help="Unit of the --pv-file values (default: kW)")
+    parser.add_argument("--pv-yield", type=float, default=solar.DEFAULT_YIELD,
+                        help=f"Annual yield of the PV model, kWh/kWp (default: {solar.DEFAULT_YIELD:g})")
+    parser.add_argument("--battery-kwh", type=float, default=0.0, help="Usable battery capacity (kWh)")
+    parser.add_argument("--battery-kw", type=float, help="Battery power limit (kW, default: half the capacity)")
+    parser.add_argument("--battery-efficiency", type=float, default=0.9,
+                        help="Battery round-trip efficiency (default: 0.9)")
+    parser.add_argument("--export-price", type=float, default=0.0,
+                        help="Price paid for energy exported to the grid (€/kWh, default: 0)")
+
+    parser.add_argument("--size-power", action='store_true',
+                        help="Recommend the contracted power (kVA) from peak demand; "
+                             "--fee1/--fee2 default to the recommended tier's fee")
+    parser.add_argument("--power-fees", metavar="PATH",
+                        help="Daily fee per kVA tier, CSV kva,daily_fee (default: example_power_fees.csv)")
+    parser.add_argument("--peak-confidence", type=float, default=contracted_power.DEFAULT_CONFIDENCE,
+                        help="Confidence of the peaking margin (default: 0.95)")
+    parser.add_argument("--peak-cv", type=float,
+                        help=f"Demand variability of the peaking margin (default: {contracted_power.PROFILE_CV:g} "
+                             f"for the profile, {contracted_power.METER_CV:g} for meter readings)")
+    parser.add_argument("--power-factor", type=float, default=1.0,
+                        help="Power factor for kW -> kVA (default: 1.0)")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="Reuse TOU estimates and catalog rankings cached in DIR (created if missing)")
+    parser.add_argument("--cache-max-mb", type=float, default=scenario_cache.MAX_BYTES / 2**20,
+                        help=f"Size limit of --cache-dir in MB (default: {scenario_cache.MAX_BYTES >> 20})")
+    parser.add_argument("--profile-year", type=int,
+                        help="Year of the E-REDES load profile in rlp/ (default: latest available)")
+    parser.add_argument("--btn-class", choices=['A', 'B', 'C'], default='C',
+                        help="Load profile class used for the estimate (default: C, standard residential)")
+
+    parser.add_argument("--profile", nargs='?', const='-', metavar="JSON_PATH",
+                        help="Time each phase (imports, CSV parsing, classification, aggregation, costing) "
+                             "and print a table, or write JSON to JSON_PATH")
 
     # Backward compatibility alias
     parser.add_argument("--consumption", type=float, required=False, help=argparse.SUPPRESS)
@@ -78,20 +522,88 @@ def main():
     # Handle alias
     if args.ref_kwh is None and args.consumption is not None:
         args.ref_kwh = args.consumption
+    if args.sensitivity is not None and args.sensitivity <= 0:
+        parser.error("--sensitivity must be a positive number of scenarios")
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers must be positive")
+    if args.top <= 0:
+        parser.error("--top must be positive")
+
+    if not args.profile:
+        run_comparison(args, parser)
+        return
+
+    timing.enable()
+    timing.record('startup.imports', _IMPORT_SECONDS)
+    try:
+        with timing.phase('cli.run'):
+            run_comparison(args, parser)
+    finally:
+        report_profile(args.profile, timing.disable())
+
+def report_profile(path, recorder):
+    """Prints the phase timings as a table ('-') or writes them as JSON."""
+    if path == '-':
+        print("Timing by phase:")
+        print(recorder.table())
+    else:
+        with open(path, 'w') as f:
+            json.dump({'phases': recorder.to_dict()}, f, indent=2)
+        print(f"Phase timings written to {path}")
+
+def run_comparison(args, parser):
+    if args.catalog:
+        run_catalog(args)
+        return
+
+    for name in ('price1', 'price2') + (() if args.size_power else ('fee1', 'fee2')):
+        if getattr(args, name) is None:
+            parser.error(f"--{name} is required unless --catalog is given")
+
+    meter = customer = None
+    if args.meter_file:
+        meter, customer = load_meter(args)
+        # Fixed fees cover the metered days
+        args.days = meter.days_covered(customer)
+
+    bill = load_bill_period(args)
+    fit = load_calibration(args)
+
+    if args.size_power:
+        sizing = size_contracted_power(args, meter, customer, bill, fit)
+        # Contracts without a fee are charged the recommended tier's fee
+        for name in ('fee1', 'fee2'):
+            if getattr(args, name) is None:
+                setattr(args, name, sizing.daily_fee)
 
     # Calculate effective annual kWh
     effective_annual_kwh = 0.0
 
-    if args.tariff_type != 'simple':
-        if args.ref_kwh is None:
-             print("Error: --ref-kwh is required for TOU tariffs.")
+    if args.tariff_type != 'simple' and meter is not None:
+        tou_consumption = meter.tou_consumption(customer, args.cycle)
+        effective_annual_kwh = sum(tou_consumption.values())
+
+    elif args.tariff_type != 'simple':
+        if args.ref_kwh is None and fit is None:
+             print("Error: --ref-kwh or --bill is required for TOU tariffs.")
              sys.exit(1)
         
         # Load TOU Profile
-        print(f"Loading Load Profile (BTN C) for {args.tariff_type} {args.cycle}...")
-        csv_path = os.path.join(os.path.dirname(__file__), 'rlp', 'EREDES_2025_BTN_1000kwh_15min.csv')
+        print(f"Loading Load Profile (BTN {args.btn_class}) for {args.tariff_type} {args.cycle}...")
         try:
-            tou_consumption = portugal_tou.load_and_calculate_tou(csv_path, args.cycle, args.ref_kwh, args.ref_month)
+            if fit is not None:
+                tou_consumption = fit.estimate(args.cycle)
+            elif bill is not None:
+                tou_consumption = bill[0].estimate(args.cycle, args.ref_kwh, bill[1], bill[2])
+            else:
+                csv_path = portugal_tou.find_profile(args.profile_year)
+                cache = get_cache(args)
+                if cache is not None:
+                    tou_consumption = cache.tou_consumption(csv_path, args.cycle, args.ref_kwh, args.ref_month,
+                                                            f"BTN {args.btn_class} - Wh")
+                else:
+                    tou_consumption = portugal_tou.load_and_calculate_tou(csv_path, args.cycle, args.ref_kwh,
+                                                                          args.ref_month, f"BTN {args.btn_class} - Wh")
         except Exception as e:
             print(f"Error loading profile: {e}")
             sys.exit(1)
@@ -99,35 +611,12 @@ def main():
         effective_annual_kwh = sum(tou_consumption.values())
         print(f"Estimated Annual Consumption: {effective_annual_kwh:.2f} kWh")
 
-        # Map rates
-        # Bi: Peak, Off
-        # Tri: Peak, Mid, Off
-        
-        def map_rates(rates_list, t_type):
-            r = {}
-            if t_type == 'bi-hourly':
-                if len(rates_list) < 2:
-                    print("Error: Bi-hourly requires 2 rates (Peak, Off).")
-                    sys.exit(1)
-                r['peak'] = rates_list[0]
-                r['mid_peak'] = rates_list[0]
-                r['off_peak'] = rates_list[1]
-                r['super_off_peak'] = rates_list[1]
-            elif t_type == 'tri-hourly':
-                if len(rates_list) < 3:
-                     print("Error: Tri-hourly requires 3 rates (Peak, Mid, Off).")
-                     sys.exit(1)
-                r['peak'] = rates_list[0]
-                r['mid_peak'] = rates_list[1]
-                r['off_peak'] = rates_list[2]
-                r['super_off_peak'] = rates_list[2]
-            return r
-
-        rates1 = map_rates(args.price1, args.tariff_type)
-        rates2 = map_rates(args.price2, args.tariff_type)
+    if args.tariff_type != 'simple':
+        (_, rates1, _), (_, rates2, _) = contract_rates(args)
         
-        cost1 = get_tou_cost(tou_consumption, rates1, args.fee1, args.days)
-        cost2 = get_tou_cost(tou_consumption, rates2, args.fee2, args.days)
+        with timing.phase('cost.get_tou_cost', 2):
+            cost1 = get_tou_cost(tou_consumption, rates1, args.fee1, args.days)
+            cost2 = get_tou_cost(tou_consumption, rates2, args.fee2, args.days)
         
     else:
         # Simple Tariff
@@ -138,10 +627,21 @@ def main():
         p1 = args.price1[0]
         p2 = args.price2[0]
         
-        if args.ref_kwh is not None:
-            effective_annual_kwh = args.ref_kwh
-            cost1 = compute_total_cost(p1, args.fee1, effective_annual_kwh, args.days)
-            cost2 = compute_total_cost(p2, args.fee2, effective_annual_kwh, args.days)
+        if meter is not None:
+            effective_annual_kwh = sum(meter.tou_consumption(customer, args.cycle).values())
+            with timing.phase('cost.compute_total_cost', 2):
+                cost1 = compute_total_cost(p1, args.fee1, effective_annual_kwh, args.days)
+                cost2 = compute_total_cost(p2, args.fee2, effective_annual_kwh, args.days)
+        elif args.ref_kwh is not None or fit is not None:
+            if fit is not None:
+                effective_annual_kwh = fit.annual_kwh(args.cycle)
+            elif bill is not None:
+                effective_annual_kwh = sum(bill[0].estimate(args.cycle, args.ref_kwh, bill[1], bill[2]).values())
+            else:
+                effective_annual_kwh = args.ref_kwh
+            with timing.phase('cost.compute_total_cost', 2):
+                cost1 = compute_total_cost(p1, args.fee1, effective_annual_kwh, args.days)
+                cost2 = compute_total_cost(p2, args.fee2, effective_annual_kwh, args.days)
         else:
             cost1 = None
             cost2 = None
@@ -154,7 +654,8 @@ def main():
                 print(f"Break-even consumption: {breakeven:.2f} kWh per year")
 
     if cost1 is not None and cost2 is not None:
-        print(f"For estimated annual consumption of {effective_annual_kwh:.2f} kWh:")
+        basis = "metered consumption" if meter is not None else "estimated annual consumption"
+        print(f"For {basis} of {effective_annual_kwh:.2f} kWh:")
         print(f"  Contract 1: €{cost1:.2f}")
         print(f"  Contract 2: €{cost2:.2f}")
         winner = "1" if cost1 < cost2 else "2" if cost2 < cost1 else "tie"
@@ -163,6 +664,39 @@ def main():
         else:
             print("  => Both contracts cost the same.")
 
+    if bill is not None:
+        report_bill(args, bill)
+
+    if args.tariff_type != 'simple' and cost1 is not None:
+        report_tou_break_even(args, effective_annual_kwh)
+
+    if args.pv_kwp is not None or args.pv_file:
+        report_solar(args, contract_rates(args))
+
+    if args.shift_load:
+        if args.tariff_type == 'simple':
+            print("Error: --shift-load needs a TOU tariff type.")
+            sys.exit(1)
+        report_load_shift(args, tou_consumption, [("Contract 1", rates1, args.fee1), ("Contract 2", rates2, args.fee2)])
+
+    if args.sensitivity:
+        try:
+            offers = [tariff_catalog.make_offer(f"Contract {i}", args.tariff_type, args.cycle, fee, prices)
+                      for i, (prices, fee) in enumerate([(args.price1, args.fee1), (args.price2, args.fee2)], start=1)]
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        report_sensitivity(args, offers)
+
+    if args.spot_prices:
+        cost_spot = indexed_cost(args)
+        print(f"  Indexed (spot): €{cost_spot:.2f}")
+        fixed = [c for c in (cost1, cost2) if c is not None]
+        if fixed and cost_spot < min(fixed):
+            print("  => The indexed offer is cheapest.")
+        elif fixed:
+            print("  => The indexed offer is not the cheapest.")
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,179 @@
+"""
+Integer quarter-hour representation.
+
+A point in time is the quarter-hour index
+
+    q = days since 1970-01-01 * 96 + slot of the day (0-95)
+
+on the same wall clock as rlp_store (q == epoch seconds // 900), small enough
+for a 32-bit array (about 2 million in 2025). Times of day
+are slots 0-96; intervals of the day are pairs of slots. Conversions to and
+from datetimes, epoch seconds and decimal hours happen only at the API
+boundary, so comparisons inside are exact integer comparisons (a float hour
+such as 10.5 is slot 42 and nothing else).
+
+A regular 15-minute series is stored as its first index and one array of
+values (QuarterHourSeries): 8 bytes per reading ('d') or 4 ('f'), against
+more than 100 bytes for a (datetime, float) pair in a list.
+"""
+import datetime
+import math
+from array import array
+
+from tou_schedule import SLOTS_PER_DAY
+
+SECONDS_PER_SLOT = 900
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_DATE = _EPOCH.date()
+
+def from_epoch(seconds):
+    """Wall-clock epoch seconds (see rlp_store) -> quarter-hour index."""
+    return seconds // SECONDS_PER_SLOT
+
+def to_epoch(q):
+    return q * SECONDS_PER_SLOT
+
+def from_epoch_array(seconds, typecode='i'):
+    """Epoch seconds sequence -> array of quarter-hour indices."""
+    return array(typecode, [t // SECONDS_PER_SLOT for t in seconds])
+
+def from_datetime(dt):
+    """Wall-clock datetime -> index of the quarter-hour containing it."""
+    days = (dt.date() - _EPOCH_DATE).days
+    return days * SLOTS_PER_DAY + dt.hour * 4 + dt.minute // 15
+
+def to_datetime(q):
+    """Quarter-hour index -> datetime of its start."""
+    return _EPOCH + datetime.timedelta(minutes=15 * q)
+
+def from_date(date):
+    """Index of the first quarter-hour of a date."""
+    return (date - _EPOCH_DATE).days * SLOTS_PER_DAY
+
+def to_date(q):
+    return _EPOCH_DATE + datetime.timedelta(days=q // SLOTS_PER_DAY)
+
+def split(q):
+    """(epoch day, slot of the day)."""
+    return divmod(q, SLOTS_PER_DAY)
+
+def hours_to_slot(hours):
+    """Decimal hours on a quarter-hour (0-24) -> slot; ValueError otherwise."""
+    slot = hours * 4
+    if slot != int(slot) or not 0 <= slot <= SLOTS_PER_DAY:
+        raise ValueError(f"{hours} h is not a quarter-hour between 0 and 24")
+    return int(slot)
+
+def slot_to_hours(slot):
+    return slot / 4.0
+
+def hour_slot(hours):
+    """Slot containing any decimal hour (floor), for lookups."""
+    return math.floor(hours * 4)
+
+class SlotInterval:
+    """
+    Quarter-hours [start_slot, end_slot) of a day; end_slot < start_slot runs
+    past midnight. start_slot == end_slot is empty (as in tou_schedule), the
+    whole day is (0, 96).
+    """
+    __slots__ = ('start_slot', 'end_slot')
+
+    def __init__(self, start_slot, end_slot):
+        self.start_slot = start_slot
+        self.end_slot = end_slot
+
+    @classmethod
+    def from_hours(cls, start, end):
+        return cls(hours_to_slot(start), hours_to_slot(end))
+
+    @property
+    def hours(self):
+        return slot_to_hours(self.start_slot), slot_to_hours(self.end_slot)
+
+    def contains(self, slot):
+        if self.start_slot <= self.end_slot:
+            return self.start_slot <= slot < self.end_slot
+        return self.start_slot <= slot or slot < self.end_slot
+
+    def __len__(self):
+        if self.start_slot <= self.end_slot:
+            return self.end_slot - self.start_slot
+        return SLOTS_PER_DAY - self.start_slot + self.end_slot
+
+    def __eq__(self, other):
+        return (isinstance(other, SlotInterval)
+                and (self.start_slot, self.end_slot) == (other.start_slot, other.end_slot))
+
+    def __repr__(self):
+        return f"SlotInterval({self.start_slot}, {self.end_slot})"
+
+class QuarterHourSeries:
+    """
+    Regular 15-minute series: values[i] belongs to quarter-hour start + i.
+    Missing readings are NaN.
+    """
+    __slots__ = ('start', 'values')
+
+    def __init__(self, start, values):
+        self.start = start
+        self.values = values
+
+    @classmethod
+    def from_readings(cls, indices, values, typecode='d'):
+        """
+        Readings at quarter-hour `indices` (any order) -> series spanning
+        them, gaps filled with NaN; readings of the same quarter-hour are
+        added up.
+        """
+        if not len(indices):
+            return cls(0, array(typecode))
+        first = min(indices)
+        series = array(typecode, [math.nan]) * (max(indices) - first + 1)
+        for q, v in zip(indices, values):
+            i = q - first
+            series[i] = v if series[i] != series[i] else series[i] + v
+        return cls(first, series)
+
+    @classmethod
+    def from_profile(cls, profile, column, typecode='d'):
+        """Column of an rlp_store.RLPProfile (contiguous 15-minute timestamps)."""
+        timestamps = profile.timestamps
+        start = from_epoch(timestamps[0])
+        if from_epoch(timestamps[-1]) - start != len(timestamps) - 1:
+            raise ValueError("Profile timestamps are not a contiguous 15-minute series")
+        return cls(start, array(typecode, profile.column(column)))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def end(self):
+        """Index one past the last quarter-hour."""
+        return self.start + len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+    def indices(self):
+        return range(self.start, self.end)
+
+    def at(self, q):
+        """Value at quarter-hour q (NaN outside the series)."""
+        i = q - self.start
+        return self.values[i] if 0 <= i < len(self.values) else math.nan
+
+    def between(self, first, stop):
+        """Values of quarter-hours [first, stop), clipped to the series."""
+        lo = max(first - self.start, 0)
+        hi = min(stop - self.start, len(self.values))
+        return self.values[lo:hi] if lo < hi else self.values[:0]
+
+    def epoch_seconds(self):
+        """Timestamps in rlp_store's epoch seconds, e.g. for classify_epoch."""
+        return array('q', range(to_epoch(self.start), to_epoch(self.end), SECONDS_PER_SLOT))
+
+    def datetimes(self):
+        return [to_datetime(q) for q in self.indices()]
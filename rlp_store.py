@@ -0,0 +1,213 @@
+"""
+Columnar binary cache for RLP load profile CSVs.
+
+The CSV is parsed once into a flat file holding an int64 timestamp column
+followed by one float64 column per profile (BTN A/B/C). Later runs memory-map
+that file, so loading costs a stat(), a SHA-256 of the CSV (to catch edits
+that keep the size and mtime) and an mmap(), and the pages are shared by
+every process reading the same profile.
+
+Timestamps are wall-clock seconds since 1970-01-01 (the CSV's local time read
+as if it were UTC), so the calendar fields can be recovered without any
+timezone handling.
+"""
+import calendar
+import csv
+import datetime
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+import timing
+
+MAGIC = b'RLPCOL1\0'
+VERSION = 1
+
+# magic, version, source size, source mtime_ns, rows, columns, names length, sha256
+_HEADER = struct.Struct('<8sIqqqII32s')
+
+CACHE_SUFFIX = '.bin'
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def to_epoch(dt):
+    """Wall-clock datetime -> int seconds since the epoch."""
+    return calendar.timegm(dt.timetuple())
+
+def from_epoch(seconds):
+    """Inverse of to_epoch."""
+    return _EPOCH + datetime.timedelta(seconds=seconds)
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.digest()
+
+class RLPProfile:
+    """
+    Column view of a load profile.
+    timestamps: int64 sequence (epoch seconds, wall clock)
+    values: list of float64 sequences, one per column in `names`
+    Missing or unparsable readings are stored as NaN.
+    """
+    def __init__(self, names, timestamps, values, source_hash, mapping=None):
+        self.names = names
+        self.timestamps = timestamps
+        self.values = values
+        self.source_hash = source_hash
+        self._mapping = mapping # keeps the mmap alive
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def column(self, name_or_index):
+        if isinstance(name_or_index, int):
+            return self.values[name_or_index]
+        return self.values[self.names.index(name_or_index)]
+
+    def datetimes(self):
+        return [from_epoch(t) for t in self.timestamps]
+
+def _parse_timestamp(text):
+    try:
+        # Format: 01/01/2025 00:00
+        return datetime.datetime.strptime(text, "%d/%m/%Y %H:%M")
+    except ValueError:
+        try:
+            # ISO 8601, e.g. 2025-01-01T00:00 (price series)
+            return datetime.datetime.fromisoformat(text.strip())
+        except ValueError:
+            return None
+
+def parse_csv(csv_path):
+    """
+    Parses an RLP CSV into (names, array('q') timestamps, [array('d')]).
+    Rows with an unparsable timestamp are skipped.
+    """
+    with timing.phase('csv.read') as p:
+        with open(csv_path, 'r') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = [row for row in reader if row]
+        p.rows = len(rows)
+    # Header: Datetime, BTN A - Wh, BTN B - Wh, BTN C - Wh
+    names = [h.strip() for h in header[1:]]
+
+    with timing.phase('csv.parse_timestamps', len(rows)):
+        timestamps = array('q')
+        kept = []
+        for row in rows:
+            dt = _parse_timestamp(row[0])
+            if dt is not None:
+                timestamps.append(to_epoch(dt))
+                kept.append(row)
+
+    with timing.phase('csv.parse_values', len(kept)):
+        values = [array('d') for _ in names]
+        for row in kept:
+            for i, col in enumerate(values):
+                try:
+                    col.append(float(row[i + 1]))
+                except (ValueError, IndexError):
+                    col.append(float('nan'))
+
+    return names, timestamps, values
+
+def _write_cache(cache_path, st, digest, names, timestamps, values):
+    names_blob = '\n'.join(names).encode('utf-8')
+    header = _HEADER.pack(MAGIC, VERSION, st.st_size, st.st_mtime_ns,
+                          len(timestamps), len(names), len(names_blob), digest)
+    pad = (-(len(header) + len(names_blob))) % 8 # keep columns 8-byte aligned
+
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(names_blob)
+        f.write(b'\0' * pad)
+        timestamps.tofile(f)
+        for col in values:
+            col.tofile(f)
+    os.replace(tmp_path, cache_path)
+
+def _read_header(mapping):
+    if len(mapping) < _HEADER.size:
+        return None
+    fields = _HEADER.unpack_from(mapping, 0)
+    if fields[0] != MAGIC or fields[1] != VERSION:
+        return None
+    return fields
+
+def _map_cache(cache_path, st, verify_hash, csv_path):
+    """Returns an RLPProfile backed by the cache file, or None if it is stale."""
+    try:
+        f = open(cache_path, 'rb')
+    except OSError:
+        return None
+    with f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file
+            return None
+
+    fields = _read_header(mapping)
+    if fields is None:
+        mapping.close()
+        return None
+    _, _, size, mtime_ns, rows, ncols, names_len, digest = fields
+    if size != st.st_size or mtime_ns != st.st_mtime_ns:
+        mapping.close()
+        return None
+    if verify_hash and digest != file_sha256(csv_path):
+        mapping.close()
+        return None
+
+    offset = _HEADER.size
+    names = bytes(mapping[offset:offset + names_len]).decode('utf-8').split('\n')
+    offset += names_len
+    offset += (-offset) % 8
+    if offset + 8 * rows * (ncols + 1) > len(mapping):
+        mapping.close()
+        return None
+
+    view = memoryview(mapping)
+    timestamps = view[offset:offset + 8 * rows].cast('q')
+    offset += 8 * rows
+    values = []
+    for _ in range(ncols):
+        values.append(view[offset:offset + 8 * rows].cast('d'))
+        offset += 8 * rows
+    return RLPProfile(names, timestamps, values, digest.hex(), mapping)
+
+def load_profile(csv_path, cache_path=None, verify_hash=True):
+    """
+    Returns the RLPProfile for csv_path, building the binary cache if it is
+    missing or the CSV's size, mtime or SHA-256 changed. verify_hash=False
+    skips the hash and trusts size and mtime alone. If the cache cannot be
+    written the parsed arrays are returned directly.
+    """
+    if cache_path is None:
+        cache_path = csv_path + CACHE_SUFFIX
+    st = os.stat(csv_path)
+
+    with timing.phase('profile.map_cache'):
+        profile = _map_cache(cache_path, st, verify_hash, csv_path)
+    if profile is not None:
+        return profile
+
+    with timing.phase('profile.hash'):
+        digest = file_sha256(csv_path)
+    names, timestamps, values = parse_csv(csv_path)
+    try:
+        with timing.phase('profile.write_cache', len(timestamps)):
+            _write_cache(cache_path, st, digest, names, timestamps, values)
+    except OSError:
+        return RLPProfile(names, timestamps, values, digest.hex())
+
+    profile = _map_cache(cache_path, st, False, csv_path)
+    if profile is None:
+        return RLPProfile(names, timestamps, values, digest.hex())
+    return profile
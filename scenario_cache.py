@@ -0,0 +1,292 @@
+"""
+Memoized comparison results.
+
+The same questions come back over and over (same catalog, cycle, profile
+and common kWh values), so results are kept under a key that is the SHA-256
+of the canonical JSON of
+
+    namespace, inputs, profile version (source hash of the RLP CSV), schedule version
+
+Both versions are those of the TOUIndex that computes the result, so an
+entry is always stored under the schedule it was actually computed with.
+
+Numbers are canonicalised (300 and 300.0 are the same input), and a changed
+profile or schedule yields new keys, so stale entries are never returned;
+they simply age out.
+
+Two tiers:
+    memory  an LRU of the most recent entries
+    disk    (optional) one file per entry under `directory`, dropped
+            after max_age seconds and evicted oldest-used first once the
+            directory exceeds max_bytes. Files are written atomically, so
+            several processes can share the directory.
+
+    cache = ScenarioCache('~/.cache/epc')
+    cache.tou_consumption(csv_path, 'daily', 300, 1)
+    cache.rank(offers, csv_path, 300, 1, top=10)
+    cache.stats.to_dict()
+"""
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+import portugal_tou
+import tariff_catalog
+import timing
+from portugal_tou import DEFAULT_COLUMN
+
+FORMAT_VERSION = 1
+
+MEMORY_ITEMS = 1024
+MAX_BYTES = 64 << 20
+MAX_AGE = 7 * 24 * 3600
+
+_MISSING = object()
+
+def canonical(value):
+    """JSON-ready copy with ints as floats and tuples as lists, for stable keys."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(k): canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    raise TypeError(f"Cannot key on {type(value).__name__}")
+
+def make_key(namespace, inputs, profile_version, schedule_version):
+    text = json.dumps([FORMAT_VERSION, namespace, canonical(inputs), profile_version, schedule_version],
+                      sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def offers_key(offers):
+    """Canonical description of tariff_catalog Offers."""
+    return [[o.name, o.tariff_type, o.cycle, o.daily_fee, [o.rates[p] for p in tariff_catalog.BILLED_PERIODS]]
+            for o in offers]
+
+class CacheStats:
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else None
+
+    def to_dict(self):
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+class ScenarioCache:
+    """
+    In-memory LRU of memory_items entries in front of an optional disk tier
+    (see module notes). Values must be JSON serialisable; both tiers hold
+    the JSON text, so every lookup returns a fresh copy that callers may
+    modify.
+    """
+    def __init__(self, directory=None, memory_items=MEMORY_ITEMS, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = CacheStats()
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    # Memory tier
+
+    def _remember(self, key, text):
+        with self._lock:
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # Disk tier
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                created, _, text = f.read().partition('\n')
+            created = float(created)
+        except (OSError, ValueError):
+            return _MISSING
+        if time.time() - created > self.max_age:
+            self._remove(path)
+            return _MISSING
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass
+        return text
+
+    def _write(self, key, text):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                f.write(f"{time.time()!r}\n{text}")
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self.stats.writes += 1
+            if self._disk_bytes is None:
+                self._disk_bytes = self.disk_usage()
+            else:
+                self._disk_bytes += size
+            over = self._disk_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.stats.evictions += 1
+
+    def _entries(self):
+        """[(mtime, size, path)] of the disk entries."""
+        entries = []
+        if not self.directory:
+            return entries
+        # <directory>/<2 hex digits>/<key>.json: first line creation time, then the JSON value
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.json'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def disk_usage(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Drops disk entries older than max_age, then the least recently used
+        ones until the directory is below 90% of max_bytes.
+        """
+        now = time.time()
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for mtime, size, path in entries:
+            if total <= target and now - mtime <= self.max_age:
+                continue
+            self._remove(path)
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._disk_bytes = 0
+
+    # Lookups
+
+    def get(self, key, default=None):
+        with self._lock:
+            text = self._memory.get(key, _MISSING)
+            if text is not _MISSING:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return json.loads(text)
+        if self.directory:
+            text = self._read(key)
+            if text is not _MISSING:
+                try:
+                    value = json.loads(text)
+                except ValueError: # truncated by a full disk
+                    value = _MISSING
+                if value is not _MISSING:
+                    with self._lock:
+                        self.stats.disk_hits += 1
+                    self._remember(key, text)
+                    return value
+        with self._lock:
+            self.stats.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Stores value and returns its JSON round-tripped copy (as get() would)."""
+        text = json.dumps(value, separators=(',', ':'))
+        self._remember(key, text)
+        if self.directory:
+            self._write(key, text)
+        return json.loads(text)
+
+    def memoize(self, namespace, inputs, compute, profile_version, schedule_version):
+        """
+        Cached compute() for `inputs`; the key also holds the profile and
+        schedule versions compute() works from (e.g. a TOUIndex's
+        source_hash and schedule_hash).
+        """
+        key = make_key(namespace, inputs, profile_version, schedule_version)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            with timing.phase(f'cache.compute.{namespace}'):
+                value = compute()
+            value = self.put(key, value)
+        return value
+
+    # Comparison entry points
+
+    def tou_consumption(self, csv_path, cycle_type, ref_kwh, ref_month, column=DEFAULT_COLUMN):
+        """Memoized portugal_tou.load_and_calculate_tou."""
+        index = portugal_tou.get_tou_index(csv_path)
+        inputs = {'cycle': cycle_type, 'ref_kwh': ref_kwh, 'ref_month': ref_month, 'column': column}
+        return self.memoize('tou', inputs, lambda: index.query(cycle_type, ref_kwh, ref_month, column),
+                            index.source_hash, index.schedule_hash)
+
+    def rank(self, offers, csv_path, ref_kwh, ref_month, column=DEFAULT_COLUMN, top=10, days=365):
+        """
+        Memoized catalog ranking: [{'rank', 'name', 'tariff_type', 'cycle',
+        'cost'}], cheapest first.
+        """
+        inputs = {'offers': offers_key(offers), 'ref_kwh': ref_kwh, 'ref_month': ref_month,
+                  'column': column, 'top': top, 'days': days}
+
+        index = portugal_tou.get_tou_index(csv_path)
+
+        def compute():
+            consumption = {c: index.query(c, ref_kwh, ref_month, column) for c in portugal_tou.CYCLES}
+            catalog = tariff_catalog.TariffCatalog(offers)
+            return [{'rank': rank, 'name': o.name, 'tariff_type': o.tariff_type, 'cycle': o.cycle, 'cost': cost}
+                    for rank, o, cost in catalog.rank(consumption, top, days)]
+        return self.memoize('rank', inputs, compute, index.source_hash, index.schedule_hash)
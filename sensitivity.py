@@ -0,0 +1,148 @@
+"""
+Monte Carlo sensitivity of contract rankings.
+
+Each scenario samples:
+  - the reference consumption: ref_kwh * lognormal(0, kwh_spread)
+  - the reference month: the given one, or uniform over 1-12 with
+    sample_month (as if the reference figure came from another month)
+  - the load shape: a lognormal weight per month and one for the
+    peak + mid-peak (fora de vazio) share, both with sigma shape_spread
+
+Scenarios are costed from the month x period aggregates of the TOU index, so
+no profile is re-read. Work is split into fixed-size chunks, each seeded from
+(seed, chunk number), so results do not depend on the number of workers.
+"""
+import math
+import multiprocessing
+import os
+import random
+
+import portugal_tou
+from portugal_tou import CYCLES, PERIODS
+
+CHUNK_SIZE = 500
+
+_PEAK_CODES = (PERIODS.index('peak'), PERIODS.index('mid_peak'))
+
+class SensitivityResult:
+    """
+    costs: one list of sampled annual costs per offer (scenario order).
+    wins: number of scenarios in which each offer was cheapest.
+    """
+    def __init__(self, offers, costs, wins):
+        self.offers = offers
+        self.costs = costs
+        self.wins = wins
+        self.scenarios = sum(wins)
+
+    def probability_cheapest(self):
+        return [w / self.scenarios if self.scenarios else 0.0 for w in self.wins]
+
+    def percentiles(self, qs=(5, 50, 95)):
+        """{q: cost} per offer, nearest-rank percentiles."""
+        result = []
+        for costs in self.costs:
+            ordered = sorted(costs)
+            n = len(ordered)
+            result.append({q: ordered[min(n - 1, max(0, math.ceil(q / 100.0 * n) - 1))] for q in qs})
+        return result
+
+    def to_dict(self, qs=(5, 50, 95)):
+        return {
+            'scenarios': self.scenarios,
+            'offers': [
+                {'name': o.name, 'probability_cheapest': p, 'percentiles': pct}
+                for o, p, pct in zip(self.offers, self.probability_cheapest(), self.percentiles(qs))
+            ],
+        }
+
+def _offer_rows(offers):
+    # (cycle, peak, mid, off, fee) per offer
+    return [(o.cycle, o.rates['peak'], o.rates['mid_peak'], o.rates['off_peak'], o.daily_fee) for o in offers]
+
+def _run_chunk(task):
+    """Worker: costs `count` scenarios. Returns (costs per offer, wins per offer)."""
+    (month_tables, rows, ref_kwh, ref_month, days, kwh_spread, shape_spread,
+     sample_month, seed, chunk, count) = task
+    rng = random.Random(f"{seed}:{chunk}")
+    costs = [[] for _ in rows]
+    wins = [0] * len(rows)
+    nperiods = len(PERIODS)
+    off, super_off = PERIODS.index('off_peak'), PERIODS.index('super_off_peak')
+
+    for _ in range(count):
+        kwh = ref_kwh * rng.lognormvariate(0.0, kwh_spread) if kwh_spread else ref_kwh
+        month = rng.randint(1, 12) if sample_month else ref_month
+        month_w = [rng.lognormvariate(0.0, shape_spread) if shape_spread else 1.0 for _ in range(12)]
+        peak_w = rng.lognormvariate(0.0, shape_spread) if shape_spread else 1.0
+
+        # Perturbed annual Wh per period for each cycle
+        totals = {}
+        for cycle_type, months in month_tables.items():
+            t = [0.0] * nperiods
+            for w, m in zip(month_w, months):
+                for i in range(nperiods):
+                    t[i] += m[i] * w
+            for i in _PEAK_CODES:
+                t[i] *= peak_w
+            totals[cycle_type] = t
+
+        # Scale to the sampled reference (month or year) with the perturbed shape
+        any_cycle = month_tables[CYCLES[0]]
+        if month > 0:
+            ref_raw = sum(any_cycle[month - 1][i] * month_w[month - 1] * (peak_w if i in _PEAK_CODES else 1.0)
+                          for i in range(nperiods))
+        else:
+            ref_raw = sum(totals[CYCLES[0]])
+        factor = kwh / ref_raw if ref_raw > 0 else 0.0 # Wh -> scaled kWh
+
+        vectors = {}
+        for cycle_type, t in totals.items():
+            vectors[cycle_type] = (t[0] * factor, t[1] * factor, (t[off] + t[super_off]) * factor)
+
+        best = None
+        for j, (cycle_type, rp, rm, ro, fee) in enumerate(rows):
+            v = vectors[cycle_type]
+            cost = rp * v[0] + rm * v[1] + ro * v[2] + fee * days
+            costs[j].append(cost)
+            if best is None or cost < best[0]:
+                best = (cost, j)
+        wins[best[1]] += 1
+    return costs, wins
+
+def run_sensitivity(index, offers, ref_kwh, ref_month, scenarios=10000, seed=0, workers=None,
+                    days=365, kwh_spread=0.2, shape_spread=0.1, sample_month=False,
+                    column=portugal_tou.DEFAULT_COLUMN):
+    """
+    Samples `scenarios` consumption scenarios and costs every offer (see
+    tariff_catalog.Offer) in each. Returns a SensitivityResult.
+    workers: process count (default: all cores; 1 runs in-process).
+    """
+    if scenarios <= 0:
+        raise ValueError(f"scenarios must be positive, got {scenarios}")
+    if workers is not None and workers <= 0:
+        raise ValueError(f"workers must be positive, got {workers}")
+    offers = list(offers)
+    month_tables = {c: index.month_totals(c, column) for c in CYCLES}
+    rows = _offer_rows(offers)
+
+    tasks = []
+    for chunk, start in enumerate(range(0, scenarios, CHUNK_SIZE)):
+        count = min(CHUNK_SIZE, scenarios - start)
+        tasks.append((month_tables, rows, ref_kwh, ref_month, days, kwh_spread, shape_spread,
+                      sample_month, seed, chunk, count))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        results = list(map(_run_chunk, tasks))
+    else:
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            results = pool.map(_run_chunk, tasks)
+
+    costs = [[] for _ in offers]
+    wins = [0] * len(offers)
+    for chunk_costs, chunk_wins in results:
+        for j in range(len(offers)):
+            costs[j].extend(chunk_costs[j])
+            wins[j] += chunk_wins[j]
+    return SensitivityResult(offers, costs, wins)
@@ -0,0 +1,144 @@
+"""
+Solar PV and battery self-consumption on the 15-minute consumption profile.
+
+PV generation per installed kWp comes from a local file (Datetime + power
+columns, hourly or quarter-hourly, see dynamic_tariff.align_series) or from a
+simple clear-sky model: the sun's elevation at each slot, normalised to a
+given annual yield. It is netted slot by slot against the scaled profile:
+
+    net = load - kWp * generation
+    net > 0: discharge the battery, import the rest
+    net < 0: charge the battery, export the rest
+
+The battery carries its state of charge from one slot to the next, so the
+year is one loop over flat arrays, accumulating grid import and export per
+TOU period as it goes.
+"""
+import math
+from array import array
+
+import dynamic_tariff
+import rlp_store
+import tou_calendar
+from portugal_tou import PERIODS, merge_super_off_peak
+
+SLOT_HOURS = 0.25
+
+POWER_UNITS = {'W': 0.001, 'kW': 1.0}
+
+# Lisbon
+DEFAULT_LATITUDE = 38.7
+DEFAULT_LONGITUDE = -9.1
+DEFAULT_YIELD = 1500.0 # kWh per kWp per year
+
+def pv_model(slot_timestamps, annual_yield=DEFAULT_YIELD, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE):
+    """
+    kWh per kWp for every slot (wall-clock epoch seconds), proportional to
+    the sine of the sun's elevation at the middle of the slot and scaled so
+    the whole series sums to annual_yield.
+    """
+    lat = math.radians(latitude)
+    sin_lat, cos_lat = math.sin(lat), math.cos(lat)
+    shape = array('d')
+    append = shape.append
+    for t in slot_timestamps:
+        dt = rlp_store.from_epoch(t + 450)
+        n = dt.timetuple().tm_yday
+        utc_hours = dt.hour + dt.minute / 60.0 + dt.second / 3600.0 - (1 if tou_calendar.is_summer_time(dt) else 0)
+        b = 2 * math.pi * (n - 81) / 364.0
+        equation_of_time = 9.87 * math.sin(2 * b) - 7.53 * math.cos(b) - 1.5 * math.sin(b) # minutes
+        solar_hours = utc_hours + longitude / 15.0 + equation_of_time / 60.0
+        declination = math.radians(23.45) * math.sin(2 * math.pi * (284 + n) / 365.0)
+        hour_angle = math.radians(15.0 * (solar_hours - 12.0))
+        s = sin_lat * math.sin(declination) + cos_lat * math.cos(declination) * math.cos(hour_angle)
+        append(s if s > 0 else 0.0)
+
+    total = sum(shape)
+    if total > 0:
+        k = annual_yield / total
+        shape = array('d', [v * k for v in shape])
+    return shape
+
+def load_pv(path, column, slot_timestamps, unit='kW'):
+    """
+    kWh per slot from a PV power file (per kWp, or a measured system's
+    output to be used with pv_kwp=1), aligned to the profile slots.
+    """
+    series = rlp_store.load_profile(path)
+    return dynamic_tariff.align_series(series, column, slot_timestamps, POWER_UNITS[unit] * SLOT_HOURS)
+
+class Battery:
+    """
+    capacity_kwh: usable capacity; power_kw: charge and discharge limit
+    (default 0.5C); efficiency: round trip, split evenly between charging
+    and discharging. Starts empty.
+    """
+    __slots__ = ('capacity_kwh', 'power_kw', 'efficiency')
+
+    def __init__(self, capacity_kwh, power_kw=None, efficiency=0.9):
+        if capacity_kwh < 0 or not 0 < efficiency <= 1:
+            raise ValueError("Battery capacity must be non-negative and efficiency within (0, 1]")
+        self.capacity_kwh = float(capacity_kwh)
+        self.power_kw = float(power_kw if power_kw is not None else capacity_kwh / 2.0)
+        self.efficiency = efficiency
+
+class SolarResult:
+    """Grid import and export per TOU period (kWh, Super Off Peak merged into Off Peak)."""
+    def __init__(self, pv_kwp, battery, imports, exports, generation):
+        self.pv_kwp = pv_kwp
+        self.battery = battery
+        self.imports = imports
+        self.exports = exports
+        self.generation = generation
+
+    @property
+    def self_consumption(self):
+        """Share of the PV generation used on site."""
+        if not self.generation:
+            return 0.0
+        return 1.0 - sum(self.exports.values()) / self.generation
+
+def simulate(load, pv, codes, pv_kwp=1.0, battery=None):
+    """
+    Nets `pv` (kWh per kWp per slot) times pv_kwp against `load` (kWh per
+    slot), dispatching an optional Battery. codes: TOU period code per slot
+    (PortugueseTOUCycle.classify_epoch). Returns a SolarResult.
+    """
+    imports = [0.0] * len(PERIODS)
+    exports = [0.0] * len(PERIODS)
+    capacity = battery.capacity_kwh if battery else 0.0
+    step = battery.power_kw * SLOT_HOURS if battery else 0.0
+    eta = math.sqrt(battery.efficiency) if battery else 1.0
+    soc = 0.0
+
+    for l, g, c in zip(load, pv, codes):
+        net = l - g * pv_kwp
+        if net > 0:
+            if soc > 0:
+                d = min(net, step, soc * eta)
+                soc -= d / eta
+                net -= d
+            imports[c] += net
+        elif net < 0:
+            surplus = -net
+            if soc < capacity:
+                ch = min(surplus, step, (capacity - soc) / eta)
+                soc += ch * eta
+                surplus -= ch
+            exports[c] += surplus
+
+    return SolarResult(pv_kwp, battery, merge_super_off_peak(imports), merge_super_off_peak(exports), sum(pv) * pv_kwp)
+
+def sweep(load, pv, codes, pv_sizes, battery_sizes=(0.0,), power_ratio=0.5, efficiency=0.9):
+    """
+    Simulates every combination of PV size (kWp) and battery capacity (kWh,
+    0 for none, power = capacity * power_ratio). Returns SolarResults in
+    (pv, battery) order.
+    """
+    load = load if isinstance(load, array) else array('d', load)
+    results = []
+    for kwp in pv_sizes:
+        for kwh in battery_sizes:
+            battery = Battery(kwh, kwh * power_ratio, efficiency) if kwh else None
+            results.append(simulate(load, pv, codes, kwp, battery))
+    return results
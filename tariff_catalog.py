@@ -0,0 +1,137 @@
+"""
+Batch evaluation of a catalog of market offers.
+
+A catalog is a CSV or JSON file of offers, each with a name, tariff type,
+cycle, daily fee and rates in the same order as the CLI's --price1/--price2:
+    simple: price
+    bi-hourly: peak (fora de vazio), off-peak (vazio)
+    tri-hourly: peak (ponta), mid-peak (cheias), off-peak (vazio)
+
+CSV header: name,tariff_type,cycle,daily_fee,rates  (rates space separated)
+JSON: a list of objects with the same keys (rates as a list).
+
+Offers are stored column-wise as one rate row per offer over
+(peak, mid_peak, off_peak), so costing the whole catalog is a single
+matrix-vector product against the consumption vector of each cycle.
+"""
+import csv
+import heapq
+import json
+from array import array
+
+import portugal_tou
+import timing
+
+TARIFF_TYPES = tuple(portugal_tou.TARIFF_GROUPS)
+
+# Periods after Super Off Peak is merged into Off Peak
+BILLED_PERIODS = ('peak', 'mid_peak', 'off_peak')
+
+RATE_COUNTS = {'simple': 1, 'bi-hourly': 2, 'tri-hourly': 3}
+
+class Offer:
+    __slots__ = ('name', 'tariff_type', 'cycle', 'daily_fee', 'rates')
+
+    def __init__(self, name, tariff_type, cycle, daily_fee, rates):
+        self.name = name
+        self.tariff_type = tariff_type
+        self.cycle = cycle
+        self.daily_fee = daily_fee
+        self.rates = rates # {period: €/kWh} for all PERIODS
+
+    def __repr__(self):
+        return f"Offer({self.name!r}, {self.tariff_type!r}, {self.cycle!r})"
+
+def map_rates(rates_list, tariff_type):
+    """
+    Expands a list of prices into {period: €/kWh} for every TOU period.
+    Bi: Peak, Off. Tri: Peak, Mid, Off. Simple: one price for all periods.
+    """
+    expected = RATE_COUNTS.get(tariff_type)
+    if expected is None:
+        raise ValueError(f"Unknown tariff type: {tariff_type}")
+    if len(rates_list) != expected:
+        raise ValueError(f"{tariff_type} requires {expected} rate(s), got {len(rates_list)}")
+
+    if tariff_type == 'simple':
+        peak = mid = off = rates_list[0]
+    elif tariff_type == 'bi-hourly':
+        peak = mid = rates_list[0]
+        off = rates_list[1]
+    else:
+        peak, mid, off = rates_list
+    return {'peak': peak, 'mid_peak': mid, 'off_peak': off, 'super_off_peak': off}
+
+def make_offer(name, tariff_type, cycle, daily_fee, rates_list):
+    if tariff_type != 'simple' and cycle not in portugal_tou.CYCLES:
+        raise ValueError(f"Offer {name!r}: unknown cycle {cycle!r}")
+    rates = map_rates([float(r) for r in rates_list], tariff_type)
+    # Simple offers are billed the same under any cycle
+    return Offer(name, tariff_type, cycle or portugal_tou.CYCLES[0], float(daily_fee), rates)
+
+def iter_catalog(path):
+    """Yields Offers from a CSV or JSON catalog file."""
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            items = json.load(f)
+        if not isinstance(items, list):
+            raise ValueError(f"{path}: expected a list of offers")
+        for i, item in enumerate(items):
+            try:
+                yield make_offer(item['name'], item['tariff_type'], item.get('cycle'),
+                                 item['daily_fee'], item['rates'])
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                raise ValueError(f"{path}[{i}]: {e}") from None
+        return
+
+    with open(path, 'r', newline='') as f:
+        for lineno, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                yield make_offer(row['name'], row['tariff_type'], row.get('cycle') or None,
+                                 row['daily_fee'], row['rates'].split())
+            except (KeyError, ValueError, AttributeError) as e:
+                raise ValueError(f"{path}:{lineno}: {e}") from None
+
+class TariffCatalog:
+    def __init__(self, offers):
+        self.offers = list(offers)
+        # Column-major rate matrix: one array per billed period
+        self.rate_columns = [array('d', (o.rates[p] for o in self.offers)) for p in BILLED_PERIODS]
+        self.fees = array('d', (o.daily_fee for o in self.offers))
+        self.cycles = [o.cycle for o in self.offers]
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(iter_catalog(path))
+
+    def __len__(self):
+        return len(self.offers)
+
+    def costs(self, consumption_by_cycle, days=365):
+        """
+        Annual cost of every offer, in catalog order.
+        consumption_by_cycle: {cycle: {period: kWh}} as returned by
+        estimate_consumption (Super Off Peak already merged into Off Peak).
+        """
+        vectors = {c: tuple(tou.get(p, 0.0) for p in BILLED_PERIODS)
+                   for c, tou in consumption_by_cycle.items()}
+        peak, mid, off = self.rate_columns
+        with timing.phase('cost.catalog', len(self.fees)):
+            return array('d', (
+                rp * vectors[c][0] + rm * vectors[c][1] + ro * vectors[c][2] + fee * days
+                for rp, rm, ro, fee, c in zip(peak, mid, off, self.fees, self.cycles)
+            ))
+
+    def rank(self, consumption_by_cycle, top_n=10, days=365):
+        """
+        Yields (rank, offer, cost) for the top_n cheapest offers, cheapest first.
+        """
+        costs = self.costs(consumption_by_cycle, days)
+        best = heapq.nsmallest(top_n, range(len(costs)), key=costs.__getitem__)
+        for rank, i in enumerate(best, start=1):
+            yield rank, self.offers[i], costs[i]
+
+def estimate_consumption(csv_path, ref_kwh, ref_month, column=portugal_tou.DEFAULT_COLUMN):
+    """Scaled TOU consumption for every cycle: {cycle: {period: kWh}}."""
+    index = portugal_tou.get_tou_index(csv_path)
+    return {c: index.query(c, ref_kwh, ref_month, column) for c in portugal_tou.CYCLES}
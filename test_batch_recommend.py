@@ -0,0 +1,105 @@
+import unittest
+import bisect
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import batch_recommend
+import portugal_tou
+import tariff_catalog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class TestBatchRecommend(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.offers = list(tariff_catalog.iter_catalog(os.path.join(HERE, 'example_catalog.csv')))
+        self.records = os.path.join(self.tmpdir, 'customers.csv')
+        rng = random.Random(3)
+        with open(self.records, 'w') as f:
+            f.write(','.join(batch_recommend.FIELDS) + '\n')
+            for i in range(50):
+                f.write(f"C{i},{rng.uniform(50, 900):.1f},{rng.randint(0, 12)},bi-hourly,daily,0.4,0.21 0.11\n")
+            f.write("BAD,abc,1,simple,,0.3,0.16\n")
+
+    def read(self, path):
+        with open(path, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_lower_envelope(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            n = rng.randint(1, 12)
+            slopes = [rng.choice([0.1, 0.2, 0.3, rng.uniform(0, 1)]) for _ in range(n)]
+            fixed = [rng.uniform(0, 100) for _ in range(n)]
+            hull, breaks = batch_recommend.lower_envelope(slopes, fixed)
+            for x in [0, 1, 10, 50, 100, 500, 1000, 1e5] + [rng.uniform(0, 2000) for _ in range(20)]:
+                best = hull[bisect.bisect_right(breaks, x)]
+                expected = min(s * x + c for s, c in zip(slopes, fixed))
+                self.assertAlmostEqual(slopes[best] * x + fixed[best], expected, places=9)
+
+    def test_matches_catalog_rank(self):
+        out = os.path.join(self.tmpdir, 'out.csv')
+        done, _ = batch_recommend.run_batch(self.records, self.offers, out, workers=1, chunk_size=7)
+        self.assertEqual(done, 51)
+        rows = self.read(out)
+        self.assertEqual(len(rows), 51)
+        self.assertIn('could not convert', rows[-1]['error'])
+
+        catalog = tariff_catalog.TariffCatalog(self.offers)
+        csv_path = portugal_tou.find_profile()
+        with open(self.records) as f:
+            for record, row in zip(csv.DictReader(f), rows[:-1]):
+                consumption = tariff_catalog.estimate_consumption(csv_path, float(record['ref_kwh']),
+                                                                  int(record['ref_month']))
+                (_, offer, cost), = catalog.rank(consumption, 1)
+                self.assertEqual(row['best_offer'], offer.name)
+                self.assertAlmostEqual(float(row['best_cost']), cost, places=2)
+                current = tariff_catalog.make_offer('c', 'bi-hourly', 'daily', 0.4, [0.21, 0.11])
+                current_cost = tariff_catalog.TariffCatalog([current]).costs(consumption)[0]
+                self.assertAlmostEqual(float(row['saving']), current_cost - cost, places=1)
+
+    def test_malformed_jsonl_line(self):
+        records = os.path.join(self.tmpdir, 'customers.jsonl')
+        with open(records, 'w') as f:
+            good = dict(zip(batch_recommend.FIELDS, ['A', 300, 1, 'simple', None, 0.3, [0.16]]))
+            f.write(json.dumps(good) + '\n{"customer_id": "B", \n[1, 2]\n' + json.dumps(good) + '\n')
+        out = os.path.join(self.tmpdir, 'out.jsonl')
+        done, _ = batch_recommend.run_batch(records, self.offers, out, 'jsonl', workers=1)
+        self.assertEqual(done, 4)
+        with open(out) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([r['error'] for r in rows], ['', f"{records}:2: not a JSON object",
+                                                      f"{records}:3: not a JSON object", ''])
+        self.assertEqual(rows[3]['customer_id'], 'A')
+
+    def test_workers_jsonl_and_resume(self):
+        expected = os.path.join(self.tmpdir, 'expected.jsonl')
+        batch_recommend.run_batch(self.records, self.offers, expected, 'jsonl', workers=1)
+        out = os.path.join(self.tmpdir, 'out.jsonl')
+        batch_recommend.run_batch(self.records, self.offers, out, 'jsonl', workers=2, chunk_size=10)
+        with open(expected) as a, open(out) as b:
+            self.assertEqual(a.read(), b.read())
+
+        # Interrupted run: 20 complete lines and a partial one
+        with open(expected) as f:
+            lines = f.readlines()
+        with open(out, 'w') as f:
+            f.writelines(lines[:20])
+            f.write(lines[20][:15])
+        done, _ = batch_recommend.run_batch(self.records, self.offers, out, 'jsonl', workers=1, resume=True)
+        self.assertEqual(done, 31)
+        with open(out) as f:
+            self.assertEqual(f.readlines(), lines)
+        self.assertEqual(json.loads(lines[0])['customer_id'], 'C0')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import benchmarks
+import meter_ingest
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare_results(self):
+        baseline = {'a': {'seconds': 1.0}, 'b': {'seconds': 1.0}, 'c': {'seconds': 0.0}}
+        results = {'a': {'seconds': 1.2}, 'b': {'seconds': 1.3}, 'c': {'seconds': 5.0}, 'd': {'seconds': 9.0}}
+        regressions = benchmarks.compare_results(results, baseline, 0.25)
+        self.assertEqual([r[0] for r in regressions], ['b'])
+
+    def test_synthetic_meter_file(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'meter.csv')
+        rows = benchmarks.make_meter_file(path, customers=2, years=1)
+        self.assertEqual(rows, 2 * 366 * 96) # 2024 is a leap year
+
+        agg = meter_ingest.MeterAggregator()
+        agg.consume_quarter_hours(meter_ingest.iter_quarter_hours(path, meter_ingest.EREDES_FORMAT))
+        self.assertEqual(agg.readings, rows)
+        self.assertEqual(len(agg.customers), 2)
+        self.assertEqual(agg.days_covered(agg.customers[0]), 366)
+
+if __name__ == '__main__':
+    unittest.main()
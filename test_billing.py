@@ -0,0 +1,71 @@
+import unittest
+import datetime
+import os
+import random
+import sys
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import billing
+import portugal_tou
+import rlp_store
+from portugal_tou import CYCLES, PERIODS
+
+class TestBilling(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.csv_path = portugal_tou.find_profile()
+        cls.index = billing.get_billing_index(cls.csv_path)
+        cls.tou_index = portugal_tou.get_tou_index(cls.csv_path)
+
+    def test_calendar_month_matches_ref_month(self):
+        for cycle_type in CYCLES:
+            estimate = self.index.estimate(cycle_type, 300, datetime.date(2025, 1, 1), datetime.date(2025, 1, 31))
+            expected = self.tou_index.query(cycle_type, 300, 1)
+            for p in expected:
+                self.assertAlmostEqual(estimate[p], expected[p], places=6)
+
+    def test_energy_matches_slot_sum(self):
+        profile = rlp_store.load_profile(self.csv_path)
+        values = profile.column(portugal_tou.DEFAULT_COLUMN)
+        codes = portugal_tou.PortugueseTOUCycle('weekly').classify_epoch(profile.timestamps)
+        rng = random.Random(5)
+        for _ in range(5):
+            start = datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randint(0, 330))
+            end = start + datetime.timedelta(days=rng.randint(0, 30))
+            lo = rlp_store.to_epoch(datetime.datetime(start.year, start.month, start.day))
+            hi = lo + 86400 * ((end - start).days + 1)
+            expected = [0.0] * len(PERIODS)
+            for t, v, c in zip(profile.timestamps, values, codes):
+                if lo <= t < hi and v == v:
+                    expected[c] += v
+            for got, want in zip(self.index.energy('weekly', start, end), expected):
+                self.assertAlmostEqual(got, want, places=6)
+
+    def test_period_across_new_year(self):
+        december = self.index.energy('daily', datetime.date(2025, 12, 15), datetime.date(2025, 12, 31))
+        january = self.index.energy('daily', datetime.date(2025, 1, 1), datetime.date(2025, 1, 14))
+        both = self.index.energy('daily', datetime.date(2024, 12, 15), datetime.date(2025, 1, 14))
+        for a, b, c in zip(december, january, both):
+            self.assertAlmostEqual(a + b, c, places=6)
+        self.assertAlmostEqual(self.index.total(datetime.date(2025, 1, 1), datetime.date(2025, 12, 31)),
+                               self.tou_index.raw_total(), places=3)
+
+    def test_bill_estimate_and_days(self):
+        start, end = datetime.date(2025, 1, 15), datetime.date(2025, 2, 14)
+        self.assertEqual(billing.billing_days(start, end), 31)
+        bill = self.index.estimate('daily', 250, start, end, start, end)
+        self.assertAlmostEqual(sum(bill.values()), 250, places=6)
+        self.assertEqual(set(bill), {'peak', 'mid_peak', 'off_peak'})
+
+        with self.assertRaises(ValueError):
+            self.index.energy('daily', end, start)
+        with self.assertRaises(ValueError):
+            self.index.energy('daily', start, start + datetime.timedelta(days=400))
+        self.assertEqual(billing.parse_date('14/02/2025'), end)
+        with self.assertRaises(ValueError):
+            billing.parse_date('2025-02-30')
+
+if __name__ == '__main__':
+    unittest.main()
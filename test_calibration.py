@@ -0,0 +1,107 @@
+import unittest
+import datetime
+import os
+import sys
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import billing
+import calibration
+import portugal_tou
+from calibration import Bill
+
+class TestCalibration(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.csv_path = portugal_tou.find_profile()
+        cls.index = billing.get_billing_index(cls.csv_path)
+        cls.tou_index = portugal_tou.get_tou_index(cls.csv_path)
+
+    def profile_bill(self, start, end, scale, cycle_type='daily', split=0):
+        """A bill consuming exactly `scale` kWh per profile Wh over start..end."""
+        wh = dict(zip(portugal_tou.PERIODS, self.index.energy(cycle_type, start, end)))
+        if split == 3:
+            values = [wh['peak'], wh['mid_peak'], wh['off_peak'] + wh['super_off_peak']]
+        else:
+            values = [wh['peak'] + wh['mid_peak'], wh['off_peak'] + wh['super_off_peak']]
+        values = [v * scale for v in values]
+        return Bill(start, end, sum(values), values if split else None)
+
+    def test_single_month_matches_ref_month(self):
+        fit = calibration.calibrate(self.index, [Bill.month(2025, 3, 280)], 'daily')
+        expected = self.tou_index.query('daily', 280, 3)
+        for p, kwh in fit.estimate('daily').items():
+            self.assertAlmostEqual(kwh, expected[p], places=6)
+        self.assertAlmostEqual(fit.rmse, 0.0, places=9)
+        self.assertIsNone(fit.r_squared)
+
+    def test_consistent_bills_fit_exactly(self):
+        bills = [self.profile_bill(datetime.date(2025, 1, 15), datetime.date(2025, 2, 14), 0.002),
+                 self.profile_bill(datetime.date(2025, 6, 1), datetime.date(2025, 7, 31), 0.002),
+                 self.profile_bill(datetime.date(2024, 12, 1), datetime.date(2025, 1, 14), 0.002)]
+        fit = calibration.calibrate(self.index, bills, 'weekly')
+        self.assertAlmostEqual(fit.scales['total'], 0.002, places=12)
+        self.assertAlmostEqual(fit.r_squared, 1.0, places=9)
+        self.assertAlmostEqual(fit.mape, 0.0, places=9)
+        self.assertAlmostEqual(fit.annual_kwh('daily'), 0.002 * self.tou_index.raw_total(), places=3)
+
+    def test_least_squares_scale(self):
+        bills = [Bill.month(2025, 1, 300), Bill.month(2025, 4, 180), Bill.month(2025, 8, 260)]
+        fit = calibration.calibrate(self.index, bills, 'daily')
+        x = [self.index.total(b.start, b.end) for b in bills]
+        y = [b.kwh for b in bills]
+        k = sum(a * b for a, b in zip(x, y)) / sum(a * a for a in x)
+        self.assertAlmostEqual(fit.scales['total'], k, places=12)
+        for residual, a, b in zip(fit.residuals, x, y):
+            self.assertAlmostEqual(residual, b - k * a, places=6)
+        self.assertGreater(fit.rmse, 0)
+
+    def test_period_split_scales_groups(self):
+        # Vazio consumption twice as heavy as the profile's
+        bills = []
+        for month in (1, 5, 9):
+            start = datetime.date(2025, month, 1)
+            end = datetime.date(2025, month + 1, 1) - datetime.timedelta(days=1)
+            bill = self.profile_bill(start, end, 0.001, split=2)
+            bills.append(Bill(start, end, bill.split[0] + 2 * bill.split[1], (bill.split[0], 2 * bill.split[1])))
+        fit = calibration.calibrate(self.index, bills, 'daily')
+        self.assertEqual(fit.tariff_type, 'bi-hourly')
+        self.assertAlmostEqual(fit.scales['peak'], 0.001, places=12)
+        self.assertAlmostEqual(fit.scales['off_peak'], 0.002, places=12)
+        prefix = self.index.prefix['daily']
+        vazio = prefix[2][-1] + prefix[3][-1]
+        self.assertAlmostEqual(fit.estimate('daily')['off_peak'], 0.002 * vazio, places=6)
+
+    def test_mixed_bills(self):
+        start, end = datetime.date(2025, 2, 1), datetime.date(2025, 2, 28)
+        split = self.profile_bill(start, end, 0.003, 'weekly', split=3)
+        total = self.profile_bill(datetime.date(2025, 10, 1), datetime.date(2025, 10, 31), 0.003, 'weekly')
+        fit = calibration.calibrate(self.index, [split, total], 'weekly')
+        self.assertEqual(fit.tariff_type, 'tri-hourly')
+        self.assertEqual(len(fit.observations), 4)
+        for scale in fit.scales.values():
+            self.assertAlmostEqual(scale, 0.003, places=12)
+
+    def test_parse(self):
+        bill = Bill.parse("2025-01-15,2025-02-14,300")
+        self.assertEqual((bill.start, bill.end, bill.kwh, bill.split),
+                         (datetime.date(2025, 1, 15), datetime.date(2025, 2, 14), 300.0, None))
+        bill = Bill.parse("2024-02,280,190,90")
+        self.assertEqual((bill.start, bill.end, bill.split), (datetime.date(2024, 2, 1), datetime.date(2024, 2, 29),
+                                                              (190.0, 90.0)))
+        self.assertEqual(Bill.parse("3,100", 2025).start, datetime.date(2025, 3, 1))
+        for spec in ("2025-13,100", "3,100", "2025-01-01,2025-01-31", "2025-01,100,60,30", "2025-01,100,100"):
+            with self.assertRaises(ValueError):
+                Bill.parse(spec)
+
+    def test_invalid_fits(self):
+        with self.assertRaises(ValueError):
+            calibration.calibrate(self.index, [], 'daily')
+        # More Vazio than the whole bill implies negative Fora de Vazio consumption
+        bills = [Bill.month(2025, 1, 100, (1, 99)), Bill.month(2025, 2, 100, (1, 99))]
+        with self.assertRaises(ValueError):
+            calibration.calibrate(self.index, bills + [Bill.month(2025, 3, 0)], 'daily')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+from unittest import mock
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import compare_price
+import portugal_tou
+
+class TestComparePrice(unittest.TestCase):
+    def run_session(self, answers):
+        out = io.StringIO()
+        with mock.patch('builtins.input', side_effect=answers), redirect_stdout(out):
+            compare_price.main()
+        return out.getvalue()
+
+    def test_ranks_any_number_of_contracts(self):
+        output = self.run_session([
+            '2', '1',                        # bi-hourly, daily
+            '0', '300', '1',                 # 300 kWh in January
+            '3',
+            'A', '0.5', '0.20', '0.10',
+            '', '0.4', '0.18', '0.12',
+            'C', '0.3', '0.25', '0.15',
+        ])
+        expected = portugal_tou.load_and_calculate_tou(portugal_tou.find_profile(), 'daily', 300, 1)
+        costs = {
+            'A': compare_price.get_tou_cost(expected, {'peak': 0.20, 'mid_peak': 0.20, 'off_peak': 0.10}, 0.5),
+            'Contract 2': compare_price.get_tou_cost(expected, {'peak': 0.18, 'mid_peak': 0.18, 'off_peak': 0.12}, 0.4),
+            'C': compare_price.get_tou_cost(expected, {'peak': 0.25, 'mid_peak': 0.25, 'off_peak': 0.15}, 0.3),
+        }
+        ranking = output.split("Ranking:")[1].strip().splitlines()[1:]
+        self.assertEqual([line.split()[1] for line in ranking],
+                         [name.split()[0] for name in sorted(costs, key=costs.get)])
+        for name, cost in costs.items():
+            self.assertIn(f"€{cost:.2f}", output)
+
+    def test_format_ranking(self):
+        lines = compare_price.format_ranking([('B', 120.0), ('A', 100.0)])
+        self.assertIn('A', lines[1])
+        self.assertTrue(lines[1].rstrip().endswith('-'))
+        self.assertIn('+€20.00', lines[2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import datetime
+import os
+import random
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import contracted_power
+import meter_ingest
+import portugal_tou
+import quarter_hours
+import rlp_store
+from contracted_power import FeeTable, PeakTracker
+
+def brute_peak(kwh, w):
+    return max(sum(kwh[i:i + w]) for i in range(len(kwh) - w + 1)) * 4.0 / w
+
+class TestContractedPower(unittest.TestCase):
+    def setUp(self):
+        self.fees = FeeTable([(3.45, 0.20), (1.15, 0.09), (6.9, 0.36), (4.6, 0.25)])
+
+    def test_window_peaks_match_brute_force(self):
+        rng = random.Random(3)
+        kwh = [rng.random() for _ in range(500)]
+        peaks = contracted_power.window_peaks(kwh, (1, 4, 7))
+        for w in (1, 4, 7):
+            self.assertAlmostEqual(peaks[w], brute_peak(kwh, w), places=9)
+        with self.assertRaises(ValueError):
+            contracted_power.window_peaks(kwh[:3], (4,))
+
+    def test_tracker_matches_batch_and_restarts_on_gaps(self):
+        rng = random.Random(4)
+        start = quarter_hours.from_datetime(datetime.datetime(2025, 1, 1))
+        kwh = [rng.random() for _ in range(300)]
+        tracker = PeakTracker((1, 4, 8))
+        for i, v in enumerate(kwh):
+            tracker.add(start + i, v)
+        for w, kw in contracted_power.window_peaks(kwh, (1, 4, 8)).items():
+            self.assertAlmostEqual(tracker.peaks[w], kw, places=9)
+
+        tracker = PeakTracker((2,))
+        tracker.add(start, 1.0)
+        tracker.add(start + 4, 1.0)
+        self.assertEqual(tracker.peaks[2], 0.0)
+
+    def test_profile_peaks_are_linear(self):
+        csv_path = portugal_tou.find_profile()
+        small = contracted_power.profile_peaks(csv_path, 1000)
+        large = contracted_power.profile_peaks(csv_path, 5000)
+        for w in small:
+            self.assertAlmostEqual(large[w], 5 * small[w], places=9)
+        profile = rlp_store.load_profile(csv_path)
+        values = profile.column(portugal_tou.DEFAULT_COLUMN)
+        total = sum(v for v in values if v == v)
+        self.assertAlmostEqual(small[1], max(values) * 4 / total * 1000, places=9)
+
+    def test_peaking_margin(self):
+        self.assertEqual(contracted_power.peaking_margin(0), 1.0)
+        self.assertGreater(contracted_power.peaking_margin(1.0, 0.99), contracted_power.peaking_margin(1.0, 0.9))
+        self.assertGreater(contracted_power.peaking_margin(2.0), contracted_power.peaking_margin(1.0))
+        # Median of a lognormal with mean 1 is below 1
+        self.assertLess(contracted_power.peaking_margin(1.0, 0.5), 1.0)
+
+    def test_fee_table(self):
+        self.assertEqual(self.fees.recommend(3.0), (3.45, 0.20))
+        self.assertEqual(self.fees.recommend(3.45), (3.45, 0.20))
+        self.assertEqual(self.fees.recommend(0.1), (1.15, 0.09))
+        with self.assertRaises(ValueError):
+            self.fees.recommend(7.0)
+        self.assertEqual(list(self.fees.recommend_many([0.5, 2.0, 5.0, 9.0])), [0, 1, 3, -1])
+
+    def test_cheapest_adequate_tier(self):
+        # A promotional larger tier cheaper than the smaller one wins
+        fees = FeeTable([(3.45, 0.20), (4.6, 0.18), (6.9, 0.36)])
+        self.assertEqual(fees.recommend(2.0), (4.6, 0.18))
+
+    def test_size(self):
+        sizing = contracted_power.size({1: 1.0, 4: 0.8}, self.fees, cv=0.0, power_factor=0.5)
+        self.assertAlmostEqual(sizing.required_kva, 2.0)
+        self.assertEqual((sizing.kva, sizing.daily_fee), (3.45, 0.20))
+
+    def test_meter_peaks(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("Datetime,kWh\n")
+            for i, v in enumerate([0.1, 0.9, 0.5, 0.2, 0.3]):
+                f.write(f"2025-03-01 {i // 4:02d}:{i % 4 * 15:02d},{v}\n")
+        try:
+            readings = meter_ingest.iter_quarter_hours(f.name, meter_ingest.SIMPLE_FORMAT)
+            peaks = contracted_power.meter_peaks(readings)[None]
+        finally:
+            os.remove(f.name)
+        self.assertAlmostEqual(peaks[1], 3.6)
+        self.assertAlmostEqual(peaks[4], 1.9)
+
+if __name__ == '__main__':
+    unittest.main()
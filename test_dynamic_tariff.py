@@ -0,0 +1,67 @@
+import unittest
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import dynamic_tariff
+import portugal_tou
+import rlp_store
+
+class TestDynamicTariff(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write_prices(self, year, hours, name='prices.csv'):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as f:
+            f.write("Datetime,Spot,Flat\n")
+            t = datetime.datetime(year, 1, 1)
+            for h in range(hours):
+                f.write(f"{(t + datetime.timedelta(hours=h)).isoformat()},{h},100\n")
+        return dynamic_tariff.load_prices(path)
+
+    def test_align_hourly_to_quarter_hours(self):
+        prices = self.write_prices(2025, 48)
+        start = rlp_store.to_epoch(datetime.datetime(2025, 1, 1))
+        slots = [start + 900 * i for i in range(8)]
+        spot = dynamic_tariff.align_prices(prices, 'Spot', slots, 'MWh')
+        self.assertEqual(list(spot), [0.0] * 4 + [0.001] * 4)
+
+        # Series from another year is re-dated to the profile's year
+        later = [rlp_store.to_epoch(datetime.datetime(2026, 1, 1, 1, 15))]
+        self.assertEqual(list(dynamic_tariff.align_prices(prices, 0, later, 'kWh')), [1.0])
+
+        with self.assertRaises(ValueError):
+            dynamic_tariff.align_prices(prices, 0, [start + 86400 * 3], 'MWh')
+
+    def test_cost_and_breakdown(self):
+        csv_path = portugal_tou.find_profile()
+        timestamps, kwh = portugal_tou.scaled_consumption(csv_path, 3000, 0)
+        self.assertAlmostEqual(sum(kwh), 3000, places=6)
+
+        prices = self.write_prices(2025, 365 * 24)
+        spot = dynamic_tariff.align_prices(prices, 'Flat', timestamps, 'MWh')
+        rates = dynamic_tariff.indexed_rates(spot, margin=0.02, loss_factor=0.1)
+        self.assertAlmostEqual(rates[0], (0.1 + 0.02) * 1.1)
+
+        cost = dynamic_tariff.get_indexed_cost(kwh, rates, 0.3, 365)
+        self.assertAlmostEqual(cost, 3000 * 0.132 + 0.3 * 365, places=6)
+        costs = dynamic_tariff.evaluate_series(prices, kwh, timestamps, 0.02, 0.1, 0.3)
+        self.assertAlmostEqual(costs['Flat'], cost, places=6)
+
+        codes = portugal_tou.PortugueseTOUCycle('daily').classify_epoch(timestamps)
+        breakdown = dynamic_tariff.period_breakdown(kwh, rates, codes)
+        tou = portugal_tou.load_and_calculate_tou(csv_path, 'daily', 3000, 0)
+        self.assertEqual(set(breakdown), set(tou))
+        for p, b in breakdown.items():
+            self.assertAlmostEqual(b['kwh'], tou[p], places=6)
+            self.assertAlmostEqual(b['avg_rate'], 0.132)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import datetime
+import unittest
+import os
+import sys
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import load_shift
+import portugal_tou
+import tariff_catalog
+
+class TestLoadShift(unittest.TestCase):
+    def setUp(self):
+        self.rates = tariff_catalog.map_rates([0.25, 0.18, 0.10], 'tri-hourly')
+
+    def test_parse(self):
+        a = load_shift.Appliance.parse('ev:10:3.7:19-8')
+        self.assertEqual((a.name, a.energy_kwh, a.power_kw), ('ev', 10.0, 3.7))
+        self.assertEqual((a.start_slot, a.end_slot, a.window_slots()), (76, 32, 52))
+        self.assertFalse(a.contiguous)
+        self.assertTrue(load_shift.Appliance.parse('dw:1.2:2:20.5-7:contiguous').contiguous)
+        with self.assertRaises(ValueError):
+            load_shift.Appliance.parse('ev:10:3.7')
+        with self.assertRaises(ValueError):
+            load_shift.Appliance('ev', 10, 1.0, (19, 20)) # 1 kWh max in the window
+        with self.assertRaises(ValueError):
+            load_shift.Appliance('ev', 1, 1.0, (19.1, 20))
+
+    def test_schedule(self):
+        a = load_shift.Appliance('x', 1.25, 2.0, (0, 2)) # 0.5 kWh per slot
+        prices = [3, 1, 2, 1, 5, 0.5, 4, 4]
+        self.assertEqual(load_shift.schedule(a, prices, optimize=False), {0: 0.5, 1: 0.5, 2: 0.25})
+        self.assertEqual(load_shift.schedule(a, prices), {5: 0.5, 1: 0.5, 3: 0.25})
+
+        a.contiguous = True
+        # Runs 0.5, 0.5, 0.25: cheapest start is position 1 (1 + 2 + 0.5 * 1)
+        self.assertEqual(load_shift.schedule(a, prices), {1: 0.5, 2: 0.5, 3: 0.25})
+
+    def test_overnight_ev_moves_off_peak(self):
+        ev = load_shift.Appliance('ev', 10, 3.7, (19, 8))
+        (r,) = load_shift.optimize_loads([ev], self.rates, 'daily', 2025)
+        self.assertAlmostEqual(sum(r.baseline.values()), 3650.0)
+        self.assertAlmostEqual(r.optimized['off_peak'], 3650.0)
+        self.assertAlmostEqual(r.optimized_cost, 365.0)
+        self.assertGreater(r.saving, 0)
+
+    def test_matches_day_by_day_schedule(self):
+        cycle = portugal_tou.PortugueseTOUCycle('weekly')
+        loads = [load_shift.Appliance('wh', 3, 2, (12, 24), weekdays=range(5)),
+                 load_shift.Appliance('dw', 1.2, 2, (21, 9), contiguous=True)]
+        results = load_shift.optimize_loads(loads, self.rates, 'weekly', 2025)
+        rate_by_code = [self.rates[p] for p in portugal_tou.PERIODS]
+        for a, r in zip(loads, results):
+            cost = 0.0
+            day = datetime.date(2025, 1, 1)
+            while day.year == 2025:
+                if day.weekday() in a.weekdays:
+                    row = cycle.day_row(day) + cycle.day_row(day + datetime.timedelta(days=1))
+                    start = a.start_slot
+                    end = a.end_slot if a.end_slot > start else a.end_slot + portugal_tou.SLOTS_PER_DAY
+                    prices = [rate_by_code[c] for c in row[start:end]]
+                    cost += sum(e * prices[i] for i, e in load_shift.schedule(a, prices).items())
+                day += datetime.timedelta(days=1)
+            self.assertAlmostEqual(r.optimized_cost, cost, places=6)
+            self.assertLessEqual(r.optimized_cost, r.baseline_cost)
+
+    def test_shifted_consumption(self):
+        ev = load_shift.Appliance('ev', 10, 3.7, (19, 8))
+        results = load_shift.optimize_loads([ev], self.rates, 'daily', 2025)
+        base = {'peak': 100.0, 'mid_peak': 200.0, 'off_peak': 300.0}
+        shifted = load_shift.shifted_consumption(base, results)
+        self.assertAlmostEqual(shifted['off_peak'], 3950.0)
+        self.assertEqual(shifted['peak'], 100.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import meter_ingest
+import quarter_hours
+from portugal_tou import PortugueseTOUCycle
+
+class TestMeterIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'meter.csv')
+        start = datetime.datetime(2024, 12, 31, 0, 0)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("CPE;Data;Hora;Consumo registado (kW)\n")
+            for cpe in ('PT001', 'PT002'):
+                for i in range(2 * 96):
+                    end = start + datetime.timedelta(minutes=15 * (i + 1))
+                    hora = '24:00' if end.hour == 0 and end.minute == 0 else end.strftime('%H:%M')
+                    data = (end - datetime.timedelta(minutes=1)).strftime('%Y/%m/%d')
+                    f.write(f"{cpe};{data};{hora};{i % 7},5\n")
+                f.write(f"{cpe};2025/01/02;bad;1\n")
+
+    def test_iter_readings(self):
+        readings = list(meter_ingest.iter_readings(self.path, meter_ingest.EREDES_FORMAT))
+        self.assertEqual(len(readings), 2 * 2 * 96)
+        customer, dt, kwh = readings[0]
+        self.assertEqual(customer, 'PT001')
+        self.assertEqual(dt, datetime.datetime(2024, 12, 31, 0, 0))
+        self.assertEqual(kwh, 0.5 * 0.25)
+        self.assertEqual(readings[95][1], datetime.datetime(2024, 12, 31, 23, 45))
+
+        indices = list(meter_ingest.iter_quarter_hours(self.path, meter_ingest.EREDES_FORMAT))
+        self.assertEqual([(c, quarter_hours.from_datetime(dt), v) for c, dt, v in readings], indices)
+
+    def test_aggregate_per_customer_and_month(self):
+        readings = list(meter_ingest.iter_readings(self.path, meter_ingest.EREDES_FORMAT))
+        agg = meter_ingest.MeterAggregator().consume(iter(readings))
+        self.assertEqual(agg.customers, ['PT001', 'PT002'])
+        self.assertEqual(agg.days_covered('PT001'), 2)
+
+        cycle = PortugueseTOUCycle('weekly')
+        expected = {'peak': 0.0, 'mid_peak': 0.0, 'off_peak': 0.0, 'super_off_peak': 0.0}
+        for customer, dt, kwh in readings:
+            if customer == 'PT002':
+                expected[cycle.get_period_name(dt)] += kwh
+        expected['off_peak'] += expected.pop('super_off_peak')
+
+        result = agg.tou_consumption('PT002', 'weekly')
+        for p in expected:
+            self.assertAlmostEqual(result[p], expected[p], places=9)
+
+        monthly = agg.monthly('PT001', 'daily')
+        self.assertEqual(list(monthly), [(2024, 12), (2025, 1)])
+        january = agg.tou_consumption('PT001', 'daily', months={(2025, 1)})
+        self.assertAlmostEqual(sum(january.values()), sum(monthly[(2025, 1)].values()), places=9)
+
+        by_index = meter_ingest.MeterAggregator().consume_quarter_hours(
+            meter_ingest.iter_quarter_hours(self.path, meter_ingest.EREDES_FORMAT))
+        self.assertEqual(by_index.totals, agg.totals)
+        self.assertEqual(by_index.spans, agg.spans)
+
+    def test_iter_customer_totals(self):
+        readings = meter_ingest.iter_quarter_hours(self.path, meter_ingest.EREDES_FORMAT)
+        customers = [(c, agg.readings) for c, agg in meter_ingest.iter_customer_totals(readings)]
+        self.assertEqual(customers, [('PT001', 192), ('PT002', 192)])
+
+if __name__ == '__main__':
+    unittest.main()
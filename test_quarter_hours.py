@@ -0,0 +1,104 @@
+import unittest
+import datetime
+import math
+import os
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import meter_ingest
+import portugal_tou
+import quarter_hours
+import rlp_store
+from portugal_tou import TimeInterval
+from quarter_hours import QuarterHourSeries, SlotInterval
+
+class TestQuarterHours(unittest.TestCase):
+    def test_conversions(self):
+        dt = datetime.datetime(2025, 3, 30, 10, 37)
+        q = quarter_hours.from_datetime(dt)
+        self.assertEqual(q, rlp_store.to_epoch(dt) // 900)
+        self.assertEqual(quarter_hours.to_datetime(q), datetime.datetime(2025, 3, 30, 10, 30))
+        self.assertEqual(quarter_hours.split(q)[1], 42)
+        self.assertEqual(quarter_hours.to_date(q), dt.date())
+        self.assertEqual(quarter_hours.from_date(dt.date()), q - 42)
+        self.assertEqual(quarter_hours.to_epoch(quarter_hours.from_epoch(rlp_store.to_epoch(dt))),
+                         rlp_store.to_epoch(datetime.datetime(2025, 3, 30, 10, 30)))
+        self.assertEqual(quarter_hours.hours_to_slot(9.25), 37)
+        self.assertEqual(quarter_hours.slot_to_hours(37), 9.25)
+        for bad in (9.1, -0.25, 24.25):
+            with self.assertRaises(ValueError):
+                quarter_hours.hours_to_slot(bad)
+
+    def test_intervals(self):
+        day = SlotInterval.from_hours(9.25, 10.5)
+        self.assertEqual((day.start_slot, day.end_slot, len(day)), (37, 42, 5))
+        self.assertTrue(day.contains(37))
+        self.assertFalse(day.contains(42))
+        night = SlotInterval(88, 8)
+        self.assertEqual(len(night), 16)
+        self.assertTrue(night.contains(95) and night.contains(0) and not night.contains(8))
+        self.assertEqual(night.hours, (22.0, 2.0))
+
+        # Equal bounds are empty, the whole day is (0, 96)
+        empty = SlotInterval(40, 40)
+        self.assertEqual(len(empty), 0)
+        self.assertFalse(any(empty.contains(s) for s in range(96)))
+        whole = SlotInterval(0, 96)
+        self.assertEqual(len(whole), 96)
+        self.assertTrue(all(whole.contains(s) for s in range(96)))
+        for interval in (day, night, empty, whole):
+            self.assertEqual(len(interval), sum(interval.contains(s) for s in range(96)))
+
+        # Exact boundaries in decimal hours
+        interval = TimeInterval(9.25, 10.5)
+        self.assertEqual(interval, SlotInterval(37, 42))
+        self.assertEqual((interval.start, interval.end), (9.25, 10.5))
+        self.assertEqual((TimeInterval(9, 10.5).start, TimeInterval(22, 24).end), (9.0, 24.0))
+        self.assertTrue(interval.contains(9.25))
+        self.assertTrue(interval.contains(10.4999))
+        self.assertFalse(interval.contains(10.5))
+        self.assertTrue(TimeInterval(22, 2).contains(1.75))
+        with self.assertRaises(AttributeError):
+            interval.extra = 1
+
+    def test_series_from_readings(self):
+        series = QuarterHourSeries.from_readings([12, 10, 10, 14], [1.0, 0.5, 0.25, 2.0])
+        self.assertEqual((series.start, series.end), (10, 15))
+        self.assertEqual(series.values[0], 0.75)
+        self.assertTrue(math.isnan(series.values[1]))
+        self.assertEqual(series.at(12), 1.0)
+        self.assertTrue(math.isnan(series.at(99)))
+        self.assertEqual(list(series.between(13, 100))[1:], [2.0])
+        self.assertEqual(len(series.between(20, 30)), 0)
+        self.assertEqual(series.nbytes, 40)
+        self.assertEqual(len(QuarterHourSeries.from_readings([], [])), 0)
+
+    def test_series_from_profile(self):
+        profile = rlp_store.load_profile(portugal_tou.find_profile())
+        series = QuarterHourSeries.from_profile(profile, portugal_tou.DEFAULT_COLUMN, 'f')
+        self.assertEqual(len(series), len(profile))
+        self.assertEqual(list(series.epoch_seconds()), list(profile.timestamps))
+        self.assertEqual(series.nbytes, 4 * len(profile))
+        cycle = portugal_tou.PortugueseTOUCycle('weekly')
+        self.assertEqual(cycle.classify_quarter_hours(series.indices()), cycle.classify_epoch(profile.timestamps))
+        self.assertEqual(list(quarter_hours.from_epoch_array(profile.timestamps)), list(series.indices()))
+
+    def test_meter_series(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("CPE;Data;Hora;Consumo registado (kW)\n")
+            f.write("PT01;2025/01/01;00:15;0,4\nPT01;2025/01/01;00:45;1,2\nPT02;2025/01/01;00:15;2,0\n")
+        try:
+            series = meter_ingest.load_series(meter_ingest.iter_quarter_hours(f.name, meter_ingest.EREDES_FORMAT))
+        finally:
+            os.remove(f.name)
+        first = quarter_hours.from_datetime(datetime.datetime(2025, 1, 1))
+        self.assertEqual(series['PT01'].start, first)
+        self.assertEqual(len(series['PT01']), 3)
+        self.assertAlmostEqual(series['PT01'].at(first + 2), 0.3)
+        self.assertAlmostEqual(series['PT02'].at(first), 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
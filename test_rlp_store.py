@@ -0,0 +1,69 @@
+import unittest
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import rlp_store
+
+CSV_TEXT = """Datetime,BTN A - Wh,BTN B - Wh,BTN C - Wh
+01/01/2025 00:00,21.5,29.25,36.5
+01/01/2025 00:15,21.0,28.5,x
+bad,1,2,3
+01/01/2025 00:30,20.75,27.75,34.0
+,,,
+"""
+
+class TestRLPStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, 'profile.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write(CSV_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_cache_round_trip(self):
+        first = rlp_store.load_profile(self.csv_path)
+        self.assertTrue(os.path.exists(self.csv_path + rlp_store.CACHE_SUFFIX))
+        second = rlp_store.load_profile(self.csv_path)
+
+        for profile in (first, second):
+            self.assertEqual(profile.names, ['BTN A - Wh', 'BTN B - Wh', 'BTN C - Wh'])
+            self.assertEqual(len(profile), 3)
+            self.assertEqual(profile.datetimes()[2], datetime.datetime(2025, 1, 1, 0, 30))
+            self.assertEqual(list(profile.column('BTN A - Wh')), [21.5, 21.0, 20.75])
+            c = profile.column(2)
+            self.assertEqual(c[0], 36.5)
+            self.assertNotEqual(c[1], c[1]) # NaN
+
+        self.assertIsNotNone(second._mapping)
+        self.assertEqual(first.source_hash, second.source_hash)
+
+    def test_rebuild_when_source_changes(self):
+        rlp_store.load_profile(self.csv_path)
+        with open(self.csv_path, 'a') as f:
+            f.write("01/01/2025 00:45,1,2,3\n")
+        profile = rlp_store.load_profile(self.csv_path)
+        self.assertEqual(len(profile), 4)
+        self.assertEqual(profile.column(2)[3], 3.0)
+
+    def test_hash_detects_same_size_edit(self):
+        rlp_store.load_profile(self.csv_path)
+        st = os.stat(self.csv_path)
+        with open(self.csv_path, 'w') as f:
+            f.write(CSV_TEXT.replace('36.5', '99.9'))
+        os.utime(self.csv_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        stale = rlp_store.load_profile(self.csv_path, verify_hash=False)
+        self.assertEqual(stale.column(2)[0], 36.5)
+        fresh = rlp_store.load_profile(self.csv_path)
+        self.assertEqual(fresh.column(2)[0], 99.9)
+
+if __name__ == '__main__':
+    unittest.main()
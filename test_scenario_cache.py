@@ -0,0 +1,129 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import scenario_cache
+import tariff_catalog
+from scenario_cache import ScenarioCache
+
+class TestScenarioCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv_path = portugal_tou.find_profile()
+        self.calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def compute(self):
+        self.calls += 1
+        return {'value': self.calls}
+
+    def test_keys(self):
+        key = scenario_cache.make_key('tou', {'ref_kwh': 300, 'months': (1, 2)}, 'p', 's')
+        self.assertEqual(key, scenario_cache.make_key('tou', {'months': [1.0, 2], 'ref_kwh': 300.0}, 'p', 's'))
+        self.assertNotEqual(key, scenario_cache.make_key('tou', {'ref_kwh': 300, 'months': (1, 2)}, 'p2', 's'))
+        self.assertNotEqual(key, scenario_cache.make_key('tou', {'ref_kwh': 300, 'months': (1, 2)}, 'p', 's2'))
+        self.assertNotEqual(key, scenario_cache.make_key('rank', {'ref_kwh': 300, 'months': (1, 2)}, 'p', 's'))
+        with self.assertRaises(TypeError):
+            scenario_cache.make_key('tou', {'x': object()}, 'p', 's')
+
+    def test_memory_lru_and_stats(self):
+        cache = ScenarioCache(memory_items=2)
+        for n in (1, 2, 1, 3, 2):
+            cache.memoize('t', {'n': n}, self.compute, 'p', 's')
+        # 1 and 2 computed, 1 hit, 3 computed (evicting 2), 2 computed again
+        self.assertEqual(self.calls, 4)
+        stats = cache.stats.to_dict()
+        self.assertEqual((stats['memory_hits'], stats['misses'], stats['disk_hits']), (1, 4, 0))
+        self.assertAlmostEqual(stats['hit_rate'], 0.2)
+
+    def test_values_are_copies(self):
+        cache = ScenarioCache()
+        value = cache.memoize('t', {}, lambda: {'a': [1, 2]}, 'p', 's')
+        value['a'].append(3)
+        self.assertEqual(cache.memoize('t', {}, self.compute, 'p', 's'), {'a': [1, 2]})
+
+    def test_disk_tier_is_shared(self):
+        ScenarioCache(self.dir).memoize('t', {'n': 1}, self.compute, 'p', 's')
+        other = ScenarioCache(self.dir)
+        self.assertEqual(other.memoize('t', {'n': 1}, self.compute, 'p', 's'), {'value': 1})
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(other.stats.disk_hits, 1)
+        other.memoize('t', {'n': 1}, self.compute, 'p', 's')
+        self.assertEqual(other.stats.memory_hits, 1)
+
+    def test_age_eviction(self):
+        ScenarioCache(self.dir).memoize('t', {}, self.compute, 'p', 's')
+        expired = ScenarioCache(self.dir, max_age=-1)
+        self.assertEqual(expired.memoize('t', {}, self.compute, 'p', 's'), {'value': 2})
+        self.assertEqual(expired.stats.misses, 1)
+
+    def test_size_eviction_drops_least_recently_used(self):
+        cache = ScenarioCache(self.dir, max_bytes=10 ** 6)
+        used = time.time() - 100
+        for n in range(5):
+            key = scenario_cache.make_key('t', {'n': n}, 'p', 's')
+            cache.put(key, 'x' * 1000)
+            os.utime(cache._path(key), (used + n, used + n))
+        size = cache.disk_usage()
+        cache.max_bytes = size - 1
+        cache.evict()
+        remaining = sorted(mtime - used for mtime, _, _ in cache._entries())
+        self.assertEqual([round(m) for m in remaining], [1, 2, 3, 4])
+        self.assertLessEqual(cache.disk_usage(), cache.max_bytes)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_schedule_change_invalidates(self):
+        csv_path = os.path.join(self.dir, os.path.basename(self.csv_path))
+        shutil.copy(self.csv_path, csv_path)
+        cache = ScenarioCache(os.path.join(self.dir, 'cache'))
+        cache.tou_consumption(csv_path, 'daily', 300, 0)
+        with mock.patch.object(portugal_tou, 'schedule_version', return_value='changed'):
+            cache.tou_consumption(csv_path, 'daily', 300, 0)
+            index = portugal_tou.get_tou_index(csv_path)
+        self.assertEqual(cache.stats.misses, 2)
+        # Stored under the versions of the index that computed it
+        inputs = {'cycle': 'daily', 'ref_kwh': 300, 'ref_month': 0, 'column': portugal_tou.DEFAULT_COLUMN}
+        key = scenario_cache.make_key('tou', inputs, index.source_hash, 'changed')
+        self.assertIsNotNone(cache.get(key))
+
+    def test_profile_change_invalidates(self):
+        csv_path = os.path.join(self.dir, os.path.basename(self.csv_path))
+        shutil.copy(self.csv_path, csv_path)
+        cache = ScenarioCache(os.path.join(self.dir, 'cache'))
+        first = cache.tou_consumption(csv_path, 'daily', 300, 0)
+        with open(csv_path, 'r') as f:
+            lines = f.readlines()
+        stamp, *values = lines[1].strip().split(',')
+        lines[1] = ','.join([stamp] + [str(float(v) + 1000) for v in values]) + '\n'
+        with open(csv_path, 'w') as f:
+            f.writelines(lines)
+        second = cache.tou_consumption(csv_path, 'daily', 300, 0)
+        self.assertEqual(cache.stats.misses, 2)
+        self.assertNotEqual(first, second)
+        self.assertEqual(second, portugal_tou.load_and_calculate_tou(csv_path, 'daily', 300, 0))
+
+    def test_entry_points(self):
+        cache = ScenarioCache()
+        self.assertEqual(cache.tou_consumption(self.csv_path, 'weekly', 250, 3),
+                         portugal_tou.load_and_calculate_tou(self.csv_path, 'weekly', 250, 3))
+        catalog = tariff_catalog.TariffCatalog.from_file(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example_catalog.csv'))
+        consumption = tariff_catalog.estimate_consumption(self.csv_path, 250, 3)
+        expected = [(rank, o.name, cost) for rank, o, cost in catalog.rank(consumption, 3)]
+        for _ in range(2):
+            ranking = cache.rank(catalog.offers, self.csv_path, 250, 3, top=3)
+            self.assertEqual([(r['rank'], r['name'], r['cost']) for r in ranking], expected)
+        self.assertEqual(cache.stats.memory_hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+import sys
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import sensitivity
+import tariff_catalog
+
+class TestSensitivity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.csv_path = portugal_tou.find_profile()
+        cls.index = portugal_tou.get_tou_index(cls.csv_path)
+        cls.offers = [
+            tariff_catalog.make_offer('bi daily', 'bi-hourly', 'daily', 0.50, [0.20, 0.10]),
+            tariff_catalog.make_offer('tri weekly', 'tri-hourly', 'weekly', 0.45, [0.24, 0.17, 0.10]),
+            tariff_catalog.make_offer('simple', 'simple', None, 0.30, [0.16]),
+        ]
+
+    def test_no_spread_matches_point_estimate(self):
+        result = sensitivity.run_sensitivity(self.index, self.offers, 500, 1, scenarios=10,
+                                             kwh_spread=0, shape_spread=0, workers=1)
+        consumption = tariff_catalog.estimate_consumption(self.csv_path, 500, 1)
+        expected = tariff_catalog.TariffCatalog(self.offers).costs(consumption)
+        for costs, cost in zip(result.costs, expected):
+            self.assertEqual(len(costs), 10)
+            for c in costs:
+                self.assertAlmostEqual(c, cost, places=6)
+        cheapest = min(range(3), key=expected.__getitem__)
+        self.assertEqual(result.probability_cheapest()[cheapest], 1.0)
+
+    def test_deterministic_across_workers(self):
+        kwargs = dict(scenarios=1200, seed=42, sample_month=True)
+        serial = sensitivity.run_sensitivity(self.index, self.offers, 300, 0, workers=1, **kwargs)
+        parallel = sensitivity.run_sensitivity(self.index, self.offers, 300, 0, workers=2, **kwargs)
+        self.assertEqual(serial.wins, parallel.wins)
+        self.assertEqual(serial.costs, parallel.costs)
+        self.assertEqual(serial.scenarios, 1200)
+        self.assertAlmostEqual(sum(serial.probability_cheapest()), 1.0)
+
+        pct = serial.percentiles((5, 50, 95))
+        for p in pct:
+            self.assertLessEqual(p[5], p[50])
+            self.assertLessEqual(p[50], p[95])
+
+        other = sensitivity.run_sensitivity(self.index, self.offers, 300, 0, workers=1,
+                                            scenarios=1200, seed=43, sample_month=True)
+        self.assertNotEqual(serial.costs, other.costs)
+
+    def test_invalid_counts(self):
+        for kwargs in ({'scenarios': 0}, {'scenarios': -5}, {'scenarios': 10, 'workers': -1}):
+            with self.assertRaises(ValueError):
+                sensitivity.run_sensitivity(self.index, self.offers, 300, 0, **kwargs)
+
+if __name__ == '__main__':
+    unittest.main()
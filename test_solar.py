@@ -0,0 +1,73 @@
+import unittest
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import rlp_store
+import solar
+
+class TestSolar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.timestamps, cls.load = portugal_tou.scaled_consumption(portugal_tou.find_profile(), 3500, 0)
+        cls.pv = solar.pv_model(cls.timestamps)
+        cls.codes = portugal_tou.PortugueseTOUCycle('daily').classify_epoch(cls.timestamps)
+
+    def test_pv_model(self):
+        self.assertAlmostEqual(sum(self.pv), solar.DEFAULT_YIELD, places=6)
+        by_hour = [0.0] * 24
+        for t, g in zip(self.timestamps, self.pv):
+            by_hour[rlp_store.from_epoch(t).hour] += g
+        self.assertEqual(by_hour[2], 0.0)
+        self.assertEqual(max(range(24), key=by_hour.__getitem__), 13) # solar noon ~13:40 in summer time
+
+    def test_energy_balance(self):
+        battery = solar.Battery(5.0)
+        r = solar.simulate(self.load, self.pv, self.codes, 3.0, battery)
+        self.assertEqual(set(r.imports), {'peak', 'mid_peak', 'off_peak'})
+        imported = sum(r.imports.values())
+        exported = sum(r.exports.values())
+        # Generation not exported nor covering load went to battery losses (or is left stored)
+        losses = r.generation - exported - (sum(self.load) - imported)
+        self.assertGreater(losses, 0)
+        self.assertLess(losses, 0.2 * r.generation)
+
+    def test_battery_never_worse(self):
+        plain, with_battery = solar.sweep(self.load, self.pv, self.codes, [3.0], [0.0, 5.0])
+        self.assertIsNone(plain.battery)
+        self.assertLess(sum(with_battery.imports.values()), sum(plain.imports.values()))
+        self.assertGreater(with_battery.self_consumption, plain.self_consumption)
+
+        no_pv = solar.simulate(self.load, self.pv, self.codes, 0.0)
+        self.assertAlmostEqual(sum(no_pv.imports.values()), 3500, places=6)
+        self.assertEqual(sum(no_pv.exports.values()), 0.0)
+
+    def test_dispatch(self):
+        # 1 kWh/slot load, PV 4 kWh in slot 0 only; 2 kWh battery at 8 kW, lossless
+        r = solar.simulate(array('d', [1, 1, 1, 1]), array('d', [4, 0, 0, 0]), [0, 1, 1, 2], 1.0,
+                           solar.Battery(2.0, 8.0, 1.0))
+        self.assertEqual(r.exports, {'peak': 1.0, 'mid_peak': 0.0, 'off_peak': 0.0})
+        self.assertEqual(r.imports, {'peak': 0.0, 'mid_peak': 0.0, 'off_peak': 1.0})
+
+    def test_load_pv_file(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'pv.csv')
+        with open(path, 'w') as f:
+            f.write("Datetime,Power\n")
+            t = datetime.datetime(2024, 1, 1)
+            for h in range(48):
+                f.write(f"{(t + datetime.timedelta(hours=h)).isoformat()},{2000 if h == 12 else 0}\n")
+        start = rlp_store.to_epoch(datetime.datetime(2025, 1, 1, 11, 45))
+        pv = solar.load_pv(path, 'Power', [start + 900 * i for i in range(3)], 'W')
+        self.assertEqual(list(pv), [0.0, 0.5, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
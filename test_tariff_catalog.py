@@ -0,0 +1,78 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tariff_catalog
+from price_comparison_argparse import get_tou_cost
+
+CONSUMPTION = {
+    'daily': {'peak': 900.0, 'mid_peak': 2100.0, 'off_peak': 1500.0},
+    'weekly': {'peak': 500.0, 'mid_peak': 1700.0, 'off_peak': 2300.0},
+}
+
+class TestTariffCatalog(unittest.TestCase):
+    def setUp(self):
+        self.offers = [
+            tariff_catalog.make_offer('simple', 'simple', None, 0.30, [0.16]),
+            tariff_catalog.make_offer('bi daily', 'bi-hourly', 'daily', 0.30, [0.19, 0.10]),
+            tariff_catalog.make_offer('bi weekly', 'bi-hourly', 'weekly', 0.28, [0.20, 0.10]),
+            tariff_catalog.make_offer('tri daily', 'tri-hourly', 'daily', 0.31, [0.25, 0.17, 0.10]),
+        ]
+        self.catalog = tariff_catalog.TariffCatalog(self.offers)
+
+    def test_map_rates(self):
+        self.assertEqual(tariff_catalog.map_rates([0.2, 0.1], 'bi-hourly'),
+                         {'peak': 0.2, 'mid_peak': 0.2, 'off_peak': 0.1, 'super_off_peak': 0.1})
+        with self.assertRaises(ValueError):
+            tariff_catalog.map_rates([0.2], 'tri-hourly')
+
+    def test_costs_match_get_tou_cost(self):
+        costs = self.catalog.costs(CONSUMPTION, days=365)
+        for offer, cost in zip(self.offers, costs):
+            expected = get_tou_cost(CONSUMPTION[offer.cycle], offer.rates, offer.daily_fee, 365)
+            self.assertAlmostEqual(cost, expected, places=9)
+
+    def test_rank(self):
+        costs = self.catalog.costs(CONSUMPTION)
+        ranked = list(self.catalog.rank(CONSUMPTION, top_n=2))
+        self.assertEqual([r for r, _, _ in ranked], [1, 2])
+        self.assertEqual([c for _, _, c in ranked], sorted(costs)[:2])
+
+    def test_load_csv_and_json(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        csv_path = os.path.join(tmpdir, 'catalog.csv')
+        with open(csv_path, 'w') as f:
+            f.write("name,tariff_type,cycle,daily_fee,rates\n")
+            f.write("A,simple,,0.3,0.16\n")
+            f.write("B,tri-hourly,weekly,0.31,0.25 0.17 0.10\n")
+        json_path = os.path.join(tmpdir, 'catalog.json')
+        with open(json_path, 'w') as f:
+            json.dump([{'name': 'A', 'tariff_type': 'simple', 'daily_fee': 0.3, 'rates': [0.16]},
+                       {'name': 'B', 'tariff_type': 'tri-hourly', 'cycle': 'weekly',
+                        'daily_fee': 0.31, 'rates': [0.25, 0.17, 0.10]}], f)
+
+        for path in (csv_path, json_path):
+            catalog = tariff_catalog.TariffCatalog.from_file(path)
+            self.assertEqual([o.name for o in catalog.offers], ['A', 'B'])
+            self.assertEqual(catalog.offers[1].rates['mid_peak'], 0.17)
+
+        with open(csv_path, 'a') as f:
+            f.write("C,bi-hourly,daily,0.3,0.2\n")
+        with self.assertRaises(ValueError):
+            tariff_catalog.TariffCatalog.from_file(csv_path)
+
+        for bad in ([{'name': 'A', 'tariff_type': 'simple', 'rates': [0.16]}], ['A'], {'name': 'A'}):
+            with open(json_path, 'w') as f:
+                json.dump(bad, f)
+            with self.assertRaises(ValueError):
+                tariff_catalog.TariffCatalog.from_file(json_path)
+
+if __name__ == '__main__':
+    unittest.main()
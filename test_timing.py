@@ -0,0 +1,75 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import rlp_store
+import timing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class TestTiming(unittest.TestCase):
+    def tearDown(self):
+        timing.disable()
+
+    def test_disabled_records_nothing(self):
+        self.assertIsNone(timing.current())
+        with timing.phase('x') as p:
+            p.rows = 10
+        timing.record('y', 1.0)
+        self.assertIsNone(timing.disable())
+
+    def test_phases_and_listener(self):
+        seen = []
+        recorder = timing.enable(listener=lambda *event: seen.append(event))
+        for _ in range(2):
+            with timing.phase('work', 5) as p:
+                p.rows += 1
+        timing.record('imports', 0.5)
+
+        phases = recorder.to_dict()
+        self.assertEqual(list(phases), ['work', 'imports'])
+        self.assertEqual((phases['work']['calls'], phases['work']['rows']), (2, 12))
+        self.assertEqual(phases['imports']['seconds'], 0.5)
+        self.assertEqual([e[0] for e in seen], ['work', 'work', 'imports'])
+        self.assertIn('imports', recorder.table())
+        self.assertIs(timing.disable(), recorder)
+
+    def test_profile_load_phases(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        csv_path = os.path.join(tmpdir, 'rlp.csv')
+        shutil.copyfile(portugal_tou.find_profile(), csv_path)
+
+        recorder = timing.enable()
+        portugal_tou.load_and_calculate_tou(csv_path, 'daily', 500, 1)
+        phases = recorder.to_dict()
+        for name in ('csv.read', 'csv.parse_timestamps', 'csv.parse_values', 'index.classify',
+                     'index.aggregate', 'index.query'):
+            self.assertIn(name, phases)
+        rows = len(rlp_store.load_profile(csv_path))
+        self.assertEqual(phases['index.aggregate']['rows'], rows)
+
+    def test_cli_profile_json(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'phases.json')
+        subprocess.run([sys.executable, os.path.join(HERE, 'price_comparison_argparse.py'),
+                        '--tariff-type', 'bi-hourly', '--price1', '0.20', '0.10', '--fee1', '0.50',
+                        '--price2', '0.18', '0.12', '--fee2', '0.40', '--ref-kwh', '500', '--ref-month', '1',
+                        '--profile', path], check=True, stdout=subprocess.DEVNULL)
+        with open(path) as f:
+            phases = json.load(f)['phases']
+        self.assertEqual(phases['cost.get_tou_cost']['rows'], 2)
+        self.assertIn('startup.imports', phases)
+        self.assertIn('cli.run', phases)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,19 @@
 import unittest
 import datetime
+import json
 import sys
 import os
+import shutil
+import tempfile
+from unittest import mock
 
 # Ensure local modules can be imported
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from portugal_tou import PortugueseTOUCycle, TimeInterval
+from portugal_tou import (PortugueseTOUCycle, TimeInterval, PERIODS, INDEX_SUFFIX,
+                          calculate_all_tou, get_tou_index, load_and_calculate_tou, merge_super_off_peak,
+                          schedule_version)
+import rlp_store
 
 class TestPortugueseTOU(unittest.TestCase):
     def setUp(self):
@@ -79,5 +86,140 @@ class TestPortugueseTOU(unittest.TestCase):
         p = self.weekly_cycle.get_period_name(dt)
         self.assertTrue(p in ['off_peak', 'super_off_peak'])
 
+    # ERSE hour ranges (start, end) per cycle, season, day type and period,
+    # written out literally so the compiled tables are checked against an
+    # independent source rather than against schedules/erse.json itself
+    REFERENCE_HOURS = {
+        ('daily', False, 'weekday'): {
+            'peak': [(9, 10.5), (18, 20.5)],
+            'mid_peak': [(8, 9), (10.5, 18), (20.5, 22)],
+            'off_peak': [(6, 8), (22, 24), (0, 2)],
+            'super_off_peak': [(2, 6)]},
+        ('daily', True, 'weekday'): {
+            'peak': [(10.5, 13), (19.5, 21)],
+            'mid_peak': [(8, 10.5), (13, 19.5), (21, 22)],
+            'off_peak': [(6, 8), (22, 24), (0, 2)],
+            'super_off_peak': [(2, 6)]},
+        ('weekly', False, 'weekday'): {
+            'peak': [(9.5, 12), (18.5, 21)],
+            'mid_peak': [(7, 9.5), (12, 18.5), (21, 24)],
+            'off_peak': [(0, 2), (6, 7)],
+            'super_off_peak': [(2, 6)]},
+        ('weekly', False, 'saturday'): {
+            'mid_peak': [(9.5, 13), (18.5, 22)],
+            'off_peak': [(0, 2), (6, 9.5), (13, 18.5), (22, 24)],
+            'super_off_peak': [(2, 6)]},
+        ('weekly', False, 'sunday'): {
+            'off_peak': [(0, 2), (6, 24)],
+            'super_off_peak': [(2, 6)]},
+        ('weekly', True, 'weekday'): {
+            'peak': [(9.25, 12.25)],
+            'mid_peak': [(7, 9.25), (12.25, 24)],
+            'off_peak': [(0, 2), (6, 7)],
+            'super_off_peak': [(2, 6)]},
+        ('weekly', True, 'saturday'): {
+            'mid_peak': [(9, 14), (20, 22)],
+            'off_peak': [(0, 2), (6, 9), (14, 20), (22, 24)],
+            'super_off_peak': [(2, 6)]},
+        ('weekly', True, 'sunday'): {
+            'off_peak': [(0, 2), (6, 24)],
+            'super_off_peak': [(2, 6)]},
+    }
+
+    def _reference_period_name(self, cycle, dt):
+        weekday = dt.weekday()
+        if cycle.cycle_type == 'daily' or weekday < 5:
+            day_type = 'weekday'
+        else:
+            day_type = 'saturday' if weekday == 5 else 'sunday'
+        hours = self.REFERENCE_HOURS[(cycle.cycle_type, cycle._is_summer_time(dt), day_type)]
+        current_hour = dt.hour + dt.minute / 60.0
+        matches = [name for name, spans in hours.items()
+                   for start, end in spans if start <= current_hour < end]
+        self.assertEqual(len(matches), 1, (cycle.cycle_type, dt, matches))
+        return matches[0]
+
+    def test_compiled_table_matches_intervals(self):
+        start = datetime.datetime(2025, 1, 1)
+        timestamps = [start + datetime.timedelta(minutes=15 * i) for i in range(365 * 96)]
+        for cycle in (self.daily_cycle, self.weekly_cycle):
+            codes = cycle.classify(timestamps)
+            self.assertEqual(len(codes), len(timestamps))
+            for dt, code in zip(timestamps, codes):
+                expected = self._reference_period_name(cycle, dt)
+                self.assertEqual(PERIODS[code], expected, (cycle.cycle_type, dt))
+                self.assertEqual(cycle.get_period_name(dt), expected)
+
+    def test_merge_super_off_peak(self):
+        self.assertEqual(merge_super_off_peak([1.0, 2.0, 3.0, 4.0]),
+                         {'peak': 1.0, 'mid_peak': 2.0, 'off_peak': 7.0})
+
+class TestTOUIndex(unittest.TestCase):
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'rlp', 'EREDES_2025_BTN_1000kwh_15min.csv')
+
+    def _direct(self, cycle_type, ref_kwh, ref_month):
+        # Straight row scan of the CSV, scaled as in load_and_calculate_tou
+        names, timestamps, values = rlp_store.parse_csv(self.csv_path)
+        cycle = PortugueseTOUCycle(cycle_type)
+        totals = dict.fromkeys(PERIODS, 0.0)
+        month_total = annual_total = 0.0
+        for t, val in zip(timestamps, values[2]):
+            dt = rlp_store.from_epoch(t)
+            totals[cycle.get_period_name(dt)] += val
+            annual_total += val
+            if dt.month == ref_month:
+                month_total += val
+        factor = ref_kwh * 1000 / (month_total if ref_month else annual_total)
+        totals['off_peak'] += totals.pop('super_off_peak')
+        return {p: v * factor / 1000 for p, v in totals.items()}
+
+    def test_query_matches_row_scan(self):
+        for cycle_type, ref_kwh, ref_month in [('daily', 500, 1), ('weekly', 3500, 0), ('weekly', 210, 8)]:
+            expected = self._direct(cycle_type, ref_kwh, ref_month)
+            result = load_and_calculate_tou(self.csv_path, cycle_type, ref_kwh, ref_month)
+            self.assertEqual(set(result), set(expected))
+            for p in expected:
+                self.assertAlmostEqual(result[p], expected[p], places=6)
+
+    def test_index_persisted(self):
+        index = get_tou_index(self.csv_path)
+        with open(self.csv_path + INDEX_SUFFIX) as f:
+            data = json.load(f)
+        self.assertEqual(data['source_hash'], index.source_hash)
+        self.assertEqual(data['schedule_hash'], schedule_version())
+        self.assertAlmostEqual(index.raw_total(), 1_000_000, delta=1)
+
+    def test_index_follows_schedule_version(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            csv_path = shutil.copy(self.csv_path, tmpdir)
+            index = get_tou_index(csv_path)
+            self.assertIs(get_tou_index(csv_path), index)
+            with mock.patch('portugal_tou.schedule_version', return_value='edited'):
+                edited = get_tou_index(csv_path)
+            self.assertIsNot(edited, index)
+            self.assertEqual(edited.schedule_hash, 'edited')
+            self.assertEqual(get_tou_index(csv_path).schedule_hash, schedule_version())
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_summary_covers_all_combinations(self):
+        summary = calculate_all_tou(self.csv_path, 500, 1)
+        self.assertEqual(summary.columns, ['BTN A - Wh', 'BTN B - Wh', 'BTN C - Wh'])
+        combos = list(summary.combinations())
+        self.assertEqual(len(combos), 3 * 2 * 3)
+
+        for column in summary.columns:
+            for cycle_type in ('daily', 'weekly'):
+                single = load_and_calculate_tou(self.csv_path, cycle_type, 500, 1, column)
+                tri = summary.grouped(column, cycle_type, 'tri-hourly')
+                for p in ('peak', 'mid_peak', 'off_peak'):
+                    self.assertAlmostEqual(tri[p], single[p], places=9)
+                bi = summary.grouped(column, cycle_type, 'bi-hourly')
+                self.assertAlmostEqual(bi['peak'], single['peak'] + single['mid_peak'], places=9)
+                simple = summary.grouped(column, cycle_type, 'simple')
+                self.assertAlmostEqual(simple['total'], summary.annual_kwh(column), places=9)
+
 if __name__ == '__main__':
     unittest.main()
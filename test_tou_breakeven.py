@@ -0,0 +1,62 @@
+import unittest
+import os
+import sys
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import tariff_catalog
+import tou_breakeven
+from price_comparison_argparse import get_tou_cost
+
+class TestTOUBreakEven(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.csv_path = portugal_tou.find_profile()
+        cls.index = portugal_tou.get_tou_index(cls.csv_path)
+        cls.offers = [
+            tariff_catalog.make_offer('bi', 'bi-hourly', 'daily', 0.50, [0.20, 0.10]),
+            tariff_catalog.make_offer('tri', 'tri-hourly', 'daily', 0.40, [0.26, 0.15, 0.09]),
+            tariff_catalog.make_offer('simple', 'simple', None, 0.30, [0.16]),
+        ]
+        cls.costs = tou_breakeven.linear_costs(cls.index, cls.offers)
+
+    def test_linear_cost_matches_get_tou_cost(self):
+        tou = portugal_tou.load_and_calculate_tou(self.csv_path, 'daily', 3000, 0)
+        off_share = tou['off_peak'] / sum(tou.values())
+        for offer, c in zip(self.offers, self.costs):
+            expected = get_tou_cost(tou, offer.rates, offer.daily_fee, 365)
+            self.assertAlmostEqual(c.cost(3000, off_share), expected, places=6)
+
+    def test_break_even_points(self):
+        bi, tri, simple = self.costs
+        kwh = tou_breakeven.break_even_kwh(tri, simple, 0.3)
+        self.assertIsNotNone(kwh)
+        self.assertAlmostEqual(tri.cost(kwh, 0.3), simple.cost(kwh, 0.3), places=6)
+
+        share = tou_breakeven.break_even_share(bi, simple, 4000)
+        self.assertIsNotNone(share)
+        self.assertAlmostEqual(bi.cost(4000, share), simple.cost(4000, share), places=6)
+
+        self.assertIsNone(tou_breakeven.break_even_kwh(simple, simple, 0.3))
+        self.assertIsNone(tou_breakeven.break_even_share(simple, simple, 4000))
+
+    def test_curve_and_grid(self):
+        bi, _, simple = self.costs
+        shares = tou_breakeven.linspace(0.0, 1.0, 11)
+        curve = tou_breakeven.break_even_curve(bi, simple, shares)
+        for x, k in zip(shares, curve):
+            expected = tou_breakeven.break_even_kwh(bi, simple, x)
+            if expected is None:
+                self.assertNotEqual(k, k)
+            else:
+                self.assertAlmostEqual(k, expected, places=6)
+
+        kwh_values = tou_breakeven.linspace(100, 10000, 50)
+        grid = tou_breakeven.difference_grid(bi, simple, kwh_values, shares)
+        self.assertEqual((len(grid), len(grid[0])), (11, 50))
+        self.assertAlmostEqual(grid[3][7], bi.cost(kwh_values[7], shares[3]) - simple.cost(kwh_values[7], shares[3]))
+
+if __name__ == '__main__':
+    unittest.main()
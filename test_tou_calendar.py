@@ -0,0 +1,72 @@
+import unittest
+import datetime
+import os
+import sys
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tou_calendar
+from portugal_tou import PortugueseTOUCycle, find_profile
+
+class TestTOUCalendar(unittest.TestCase):
+    def test_dst_transitions(self):
+        self.assertEqual(tou_calendar.dst_transitions(2024),
+                         (datetime.date(2024, 3, 31), datetime.date(2024, 10, 27)))
+        self.assertEqual(tou_calendar.dst_transitions(2025),
+                         (datetime.date(2025, 3, 30), datetime.date(2025, 10, 26)))
+        self.assertEqual(tou_calendar.dst_transitions(2026),
+                         (datetime.date(2026, 3, 29), datetime.date(2026, 10, 25)))
+
+    def test_holidays(self):
+        self.assertEqual(tou_calendar.easter(2024), datetime.date(2024, 3, 31))
+        self.assertEqual(tou_calendar.easter(2025), datetime.date(2025, 4, 20))
+        holidays = tou_calendar.portuguese_holidays(2025)
+        self.assertEqual(len(holidays), 13)
+        self.assertIn(datetime.date(2025, 4, 18), holidays) # Good Friday
+        self.assertIn(datetime.date(2025, 6, 19), holidays) # Corpus Christi
+
+    def test_calendar_table(self):
+        table = tou_calendar.CalendarTable(2024, 2026)
+        self.assertEqual(len(table), 366 + 365 + 365)
+        self.assertEqual(table.lookup(datetime.date(2025, 7, 5)),
+                         (tou_calendar.SUMMER, tou_calendar.SATURDAY, tou_calendar.NO_TRANSITION))
+        self.assertEqual(table.lookup(datetime.date(2026, 1, 5)),
+                         (tou_calendar.WINTER, tou_calendar.WEEKDAY, tou_calendar.NO_TRANSITION))
+        transitions = list(table.transitions())
+        self.assertEqual(len(transitions), 6)
+        self.assertEqual(transitions[-1], (datetime.date(2026, 10, 25), tou_calendar.FALL_BACK))
+        with self.assertRaises(KeyError):
+            table.lookup(datetime.date(2027, 1, 1))
+
+    def test_transition_hours(self):
+        # Spring forward: from 01:00 local
+        self.assertFalse(tou_calendar.is_summer_time(datetime.datetime(2026, 3, 29, 0, 45)))
+        self.assertTrue(tou_calendar.is_summer_time(datetime.datetime(2026, 3, 29, 2, 0)))
+        # Fall back: the repeated 01:00-01:59 is winter on its second pass
+        self.assertTrue(tou_calendar.is_summer_time(datetime.datetime(2026, 10, 25, 1, 30)))
+        self.assertFalse(tou_calendar.is_summer_time(datetime.datetime(2026, 10, 25, 1, 30, fold=1)))
+        self.assertFalse(tou_calendar.is_summer_time(datetime.datetime(2026, 10, 25, 2, 0)))
+
+    def test_cycle_uses_calendar(self):
+        weekly = PortugueseTOUCycle('weekly')
+        # Summer weekday 09:15-12:15 peak, fall-back hour repeated in winter
+        self.assertEqual(weekly.get_period_name(datetime.datetime(2026, 7, 1, 10, 0)), 'peak')
+        daily = PortugueseTOUCycle('daily')
+        first = datetime.datetime(2026, 10, 25, 1, 15)
+        self.assertEqual(daily.classify([first, first.replace(fold=1)]).tolist(),
+                         [daily.get_period_code(first), daily.get_period_code(first.replace(fold=1))])
+
+        # Freedom Day 2025 is a Friday: Sunday schedule only with holidays enabled
+        dt = datetime.datetime(2025, 4, 25, 10, 0)
+        self.assertEqual(weekly.get_period_name(dt), 'peak')
+        self.assertEqual(PortugueseTOUCycle('weekly', holidays=True).get_period_name(dt), 'off_peak')
+
+    def test_find_profile(self):
+        self.assertTrue(find_profile().endswith('EREDES_2025_BTN_1000kwh_15min.csv'))
+        self.assertEqual(find_profile(2025), find_profile())
+        with self.assertRaises(FileNotFoundError):
+            find_profile(1999)
+
+if __name__ == '__main__':
+    unittest.main()
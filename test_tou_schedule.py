@@ -0,0 +1,78 @@
+import unittest
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import tou_schedule
+from tou_schedule import ScheduleError
+
+FLAT_DAY = {'peak': ['18:00-21:00'], 'off_peak': ['21:00-18:00']}
+
+def flat_schedule(day=FLAT_DAY):
+    return {'name': 'test', 'cycles': {'retailer': {'winter': {'all': day}, 'summer': {'all': day}}}}
+
+class TestTOUSchedule(unittest.TestCase):
+    def test_default_schedule_tables(self):
+        # ERSE schedule as previously hardcoded in PortugueseTOUCycle
+        expected = {
+            'daily': '565d5e0902976673fbd596d3b8eccf83a87448fea7d4eaf19d280e558a38b0fa',
+            'weekly': '31dfc1bbe838c384f373d192e77587672dc9c6032262f303476325f2f23fe19e',
+        }
+        schedule = tou_schedule.load_schedule()
+        for cycle_type, digest in expected.items():
+            self.assertEqual(hashlib.sha256(schedule.table(cycle_type)).hexdigest(), digest)
+        self.assertEqual(portugal_tou.schedule_version(), schedule.digest(portugal_tou.CYCLES))
+
+    def test_interval_masks(self):
+        self.assertEqual(tou_schedule.interval_mask('00:00-00:30'), 0b11)
+        self.assertEqual(tou_schedule.interval_mask('23:45-00:15'), 1 | 1 << 95)
+        self.assertEqual(tou_schedule.interval_mask('00:00-24:00'), tou_schedule.FULL_DAY)
+        self.assertEqual(tou_schedule.describe_mask(tou_schedule.interval_mask('22:00-02:00')),
+                         '00:00-02:00, 22:00-24:00')
+        for bad in ('09:10-10:00', '9-10', '10:00-10:00', '25:00-01:00'):
+            with self.assertRaises(ScheduleError):
+                tou_schedule.interval_mask(bad)
+
+    def test_validation(self):
+        with self.assertRaisesRegex(ScheduleError, 'peak and off_peak overlap at 18:00-18:30'):
+            tou_schedule.compile_day({'peak': ['18:00-21:00'], 'off_peak': ['21:00-18:30']})
+        with self.assertRaisesRegex(ScheduleError, 'no period covers 17:00-18:00'):
+            tou_schedule.compile_day({'peak': ['18:00-21:00'], 'off_peak': ['21:00-17:00']})
+        with self.assertRaisesRegex(ScheduleError, 'unknown period'):
+            tou_schedule.compile_day({'shoulder': ['00:00-24:00']})
+        with self.assertRaisesRegex(ScheduleError, 'missing summer'):
+            tou_schedule.parse_schedule({'cycles': {'x': {'winter': {'all': FLAT_DAY}}}})
+        with self.assertRaisesRegex(ScheduleError, 'unknown day type'):
+            tou_schedule.parse_schedule({'cycles': {'x': {'winter': {'holiday': FLAT_DAY}, 'summer': {'all': FLAT_DAY}}}})
+
+    def test_custom_cycle_side_by_side(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'retailer.json')
+        with open(path, 'w') as f:
+            json.dump(flat_schedule(), f)
+
+        schedule = tou_schedule.load_schedule(path)
+        self.assertIs(tou_schedule.load_schedule(path), schedule)
+        custom = portugal_tou.PortugueseTOUCycle('retailer', schedule=schedule)
+        erse = portugal_tou.PortugueseTOUCycle('daily')
+        dt = datetime.datetime(2025, 1, 15, 18, 0)
+        self.assertEqual(custom.get_period_name(dt), 'peak')
+        self.assertEqual(erse.get_period_name(dt), 'peak')
+        self.assertEqual(custom.get_period_name(dt.replace(hour=12)), 'off_peak')
+        self.assertEqual(erse.get_period_name(dt.replace(hour=12)), 'mid_peak')
+        self.assertNotEqual(schedule.digest(), tou_schedule.load_schedule().digest())
+
+        with self.assertRaises(ValueError):
+            portugal_tou.PortugueseTOUCycle('retailer')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import http.client
+import json
+import os
+import sys
+import threading
+from unittest import mock
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tou_service
+import portugal_tou
+from price_comparison_argparse import find_break_even
+
+class TestComparisonService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = tou_service.ComparisonService()
+        cls.loop = asyncio.new_event_loop()
+        cls.loop.run_until_complete(cls.service.start('127.0.0.1', 0))
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        async def stop():
+            cls.service.server.close()
+            await cls.service.server.wait_closed()
+        asyncio.run_coroutine_threadsafe(stop(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+
+    def request(self, method, path, payload=None, conn=None):
+        conn = conn or http.client.HTTPConnection('127.0.0.1', self.service.port, timeout=5)
+        body = json.dumps(payload) if payload is not None else None
+        conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_compare(self):
+        status, data = self.request('POST', '/compare', {
+            'ref_kwh': 500, 'ref_month': 1,
+            'contracts': [
+                {'name': 'A', 'tariff_type': 'bi-hourly', 'cycle': 'daily', 'daily_fee': 0.5, 'rates': [0.20, 0.10]},
+                {'name': 'B', 'tariff_type': 'simple', 'daily_fee': 0.4, 'rates': [0.16]},
+            ],
+        })
+        self.assertEqual(status, 200)
+        expected = portugal_tou.load_and_calculate_tou(self.service.csv_path, 'daily', 500, 1)
+        self.assertAlmostEqual(data['annual_kwh'], sum(expected.values()), places=6)
+        costs = {r['name']: r['cost'] for r in data['results']}
+        self.assertAlmostEqual(costs['A'], 0.2 * (expected['peak'] + expected['mid_peak'])
+                               + 0.1 * expected['off_peak'] + 0.5 * 365, places=6)
+        self.assertEqual([r['rank'] for r in data['results']], [1, 2])
+
+    def test_compare_is_memoized(self):
+        payload = {'ref_kwh': 321, 'ref_month': 2,
+                   'contracts': [{'name': 'A', 'tariff_type': 'simple', 'daily_fee': 0.4, 'rates': [0.16]}]}
+        _, before = self.request('GET', '/stats')
+        _, first = self.request('POST', '/compare', payload)
+        _, second = self.request('POST', '/compare', dict(payload, ref_kwh=321.0))
+        _, after = self.request('GET', '/stats')
+        self.assertEqual(first, second)
+        self.assertEqual(after['cache']['misses'] - before['cache']['misses'], 1)
+        self.assertEqual(after['cache']['memory_hits'] - before['cache']['memory_hits'], 1)
+
+    def test_compare_follows_schedule_changes(self):
+        payload = {'ref_kwh': 123, 'ref_month': 4,
+                   'contracts': [{'name': 'A', 'tariff_type': 'bi-hourly', 'cycle': 'daily',
+                                  'daily_fee': 0.4, 'rates': [0.2, 0.1]}]}
+        self.service.compare(payload)
+        misses = self.service.cache.stats.misses
+        with mock.patch.object(portugal_tou, 'schedule_version', return_value='changed'):
+            self.service.compare(payload)
+            self.assertEqual(self.service.index.schedule_hash, 'changed')
+        self.assertEqual(self.service.cache.stats.misses, misses + 1)
+        self.service.compare(payload)
+        self.assertEqual(self.service.index.schedule_hash, portugal_tou.schedule_version())
+
+    def test_break_even_and_keep_alive(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.service.port, timeout=5)
+        payload = {'price1': 0.15, 'fee1': 0.5, 'price2': 0.14, 'fee2': 0.6}
+        for _ in range(3):
+            status, data = self.request('POST', '/break-even', payload, conn)
+            self.assertEqual(status, 200)
+            self.assertAlmostEqual(data['break_even_kwh'], find_break_even(0.15, 0.5, 0.14, 0.6))
+        conn.close()
+
+    def test_tou_break_even(self):
+        status, data = self.request('POST', '/break-even', {
+            'contracts': [
+                {'tariff_type': 'bi-hourly', 'cycle': 'daily', 'daily_fee': 0.5, 'rates': [0.20, 0.10]},
+                {'tariff_type': 'simple', 'daily_fee': 0.3, 'rates': [0.16]},
+            ],
+            'off_peak_share': 0.5, 'kwh': 4000,
+        })
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(data['break_even_kwh'], 0.2 * 365 / 0.01, places=3)
+        self.assertIsNotNone(data['break_even_off_peak_share'])
+
+    def test_tou_break_even_cycle_mismatch(self):
+        contracts = [
+            {'tariff_type': 'bi-hourly', 'cycle': 'daily', 'daily_fee': 0.5, 'rates': [0.20, 0.10]},
+            {'tariff_type': 'bi-hourly', 'cycle': 'weekly', 'daily_fee': 0.3, 'rates': [0.21, 0.11]},
+        ]
+        status, data = self.request('POST', '/break-even', {'contracts': contracts})
+        self.assertEqual(status, 400)
+        self.assertIn('off_peak_share', data['error'])
+        status, _ = self.request('POST', '/break-even', {'contracts': contracts, 'off_peak_share': 0.4})
+        self.assertEqual(status, 200)
+
+    def test_errors(self):
+        self.assertEqual(self.request('GET', '/nope')[0], 404)
+        self.assertEqual(self.request('GET', '/compare')[0], 405)
+        status, data = self.request('POST', '/compare', {'ref_kwh': 100, 'contracts': [{'tariff_type': 'x'}]})
+        self.assertEqual(status, 400)
+        self.assertIn('error', data)
+        contracts = [{'tariff_type': 'simple', 'daily_fee': 0.4, 'rates': [0.16]}]
+        for top in ('x', None, 0, -1, 1.5):
+            status, data = self.request('POST', '/compare', {'ref_kwh': 100, 'contracts': contracts, 'top': top})
+            self.assertEqual(status, 400, top)
+            self.assertIn('top', data['error'])
+
+    def test_stats(self):
+        self.request('GET', '/health')
+        status, data = self.request('GET', '/stats')
+        self.assertEqual(status, 200)
+        self.assertGreaterEqual(data['/health']['count'], 1)
+        self.assertIsNotNone(data['/health']['p99_ms'])
+
+if __name__ == '__main__':
+    unittest.main()
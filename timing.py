@@ -0,0 +1,110 @@
+"""
+Phase-level timing instrumentation.
+
+Code marks its phases with
+
+    with timing.phase('profile.parse_timestamps') as p:
+        ...
+        p.rows = len(timestamps)
+
+Nothing is recorded until a Recorder is enabled; while disabled, phase()
+returns a shared no-op object, so the cost is one global lookup per phase.
+
+    recorder = timing.enable(listener=lambda name, seconds, rows: ...)
+    ...
+    print(recorder.table())   # or json.dumps(recorder.to_dict())
+
+The listener is called for every completed phase, e.g. to forward the
+numbers to a metrics system.
+"""
+import threading
+import time
+
+class Recorder:
+    """Calls, total wall time (s) and rows per phase, in first-seen order."""
+    def __init__(self, listener=None):
+        self.listener = listener
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, rows=0):
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                self.phases[name] = [1, seconds, rows]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] += rows
+        if self.listener is not None:
+            self.listener(name, seconds, rows)
+
+    def reset(self):
+        with self._lock:
+            self.phases.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {name: {'calls': calls, 'seconds': seconds, 'rows': rows}
+                    for name, (calls, seconds, rows) in self.phases.items()}
+
+    def table(self):
+        lines = [f"{'phase':<32} {'calls':>7} {'total (ms)':>11} {'rows':>10}"]
+        for name, s in self.to_dict().items():
+            rows = s['rows'] or '-'
+            lines.append(f"{name:<32} {s['calls']:>7} {s['seconds'] * 1000:>11.3f} {rows:>10}")
+        return "\n".join(lines)
+
+class _Phase:
+    __slots__ = ('recorder', 'name', 'rows', 'started')
+
+    def __init__(self, recorder, name, rows):
+        self.recorder = recorder
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, time.perf_counter() - self.started, self.rows)
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    rows = property(lambda self: 0, lambda self, value: None)
+
+_NULL_PHASE = _NullPhase()
+_recorder = None
+
+def enable(listener=None):
+    """Starts recording into a new Recorder and returns it."""
+    global _recorder
+    _recorder = Recorder(listener)
+    return _recorder
+
+def disable():
+    """Stops recording and returns the Recorder that was active (or None)."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+def current():
+    return _recorder
+
+def phase(name, rows=0):
+    if _recorder is None:
+        return _NULL_PHASE
+    return _Phase(_recorder, name, rows)
+
+def record(name, seconds, rows=0):
+    """Adds an externally measured phase (e.g. import time)."""
+    if _recorder is not None:
+        _recorder.add(name, seconds, rows)
@@ -0,0 +1,110 @@
+"""
+Break-even analysis for TOU (and simple) contracts.
+
+With annual consumption E and off-peak (vazio) share x, a contract costs
+    C(E, x) = E * (u + v * x) + daily_fee * days
+where u is the average fora-de-vazio rate (peak and mid-peak weighted by the
+profile's split between them) and v = off_peak_rate - u. A simple contract
+has v = 0. The difference between two contracts is therefore linear in E for
+a fixed x and linear in x for a fixed E, so break-even points have closed
+forms and whole curves and grids are plain arithmetic over arrays.
+"""
+from array import array
+
+from portugal_tou import CYCLES, DEFAULT_COLUMN, merge_super_off_peak
+
+_NAN = float('nan')
+
+class LinearCost:
+    """C(E, x) = E * (u + v * x) + fixed"""
+    __slots__ = ('u', 'v', 'fixed')
+
+    def __init__(self, u, v, fixed):
+        self.u = u
+        self.v = v
+        self.fixed = fixed
+
+    def cost(self, kwh, off_share):
+        return kwh * (self.u + self.v * off_share) + self.fixed
+
+    def __sub__(self, other):
+        return LinearCost(self.u - other.u, self.v - other.v, self.fixed - other.fixed)
+
+def profile_shares(index, cycle_type, column=DEFAULT_COLUMN):
+    """
+    Share of annual consumption per period (Super Off Peak merged into Off
+    Peak) for a cycle, from a TOUIndex.
+    """
+    totals = merge_super_off_peak(index.period_totals(cycle_type, column))
+    total = sum(totals.values())
+    return {p: v / total for p, v in totals.items()} if total else totals
+
+def linear_cost(offer, shares, days=365):
+    """
+    LinearCost of a tariff_catalog.Offer. shares: profile_shares of the
+    offer's cycle, used for the peak / mid-peak split of fora de vazio.
+    """
+    on = shares['peak'] + shares['mid_peak']
+    if on > 0:
+        u = (shares['peak'] * offer.rates['peak'] + shares['mid_peak'] * offer.rates['mid_peak']) / on
+    else:
+        u = offer.rates['peak']
+    return LinearCost(u, offer.rates['off_peak'] - u, offer.daily_fee * days)
+
+def linear_costs(index, offers, days=365, column=DEFAULT_COLUMN):
+    shares = {c: profile_shares(index, c, column) for c in CYCLES}
+    return [linear_cost(o, shares[o.cycle], days) for o in offers]
+
+def break_even_kwh(c1, c2, off_share):
+    """
+    Annual kWh at which both contracts cost the same for a given off-peak
+    share, or None if they never (or always) do.
+    """
+    d = c1 - c2
+    slope = d.u + d.v * off_share
+    if slope == 0:
+        return None
+    kwh = -d.fixed / slope
+    return kwh if kwh > 0 else None
+
+def break_even_share(c1, c2, kwh):
+    """
+    Off-peak share (0-1) at which both contracts cost the same for a given
+    annual consumption, or None if there is none in [0, 1].
+    """
+    d = c1 - c2
+    if d.v == 0 or kwh <= 0:
+        return None
+    x = -(d.fixed / kwh + d.u) / d.v
+    return x if 0.0 <= x <= 1.0 else None
+
+def break_even_curve(c1, c2, shares):
+    """
+    Break-even kWh for each off-peak share in `shares`, as array('d')
+    (NaN where there is no break-even).
+    """
+    d = c1 - c2
+    fixed, u, v = -d.fixed, d.u, d.v
+    out = array('d', [fixed / (u + v * x) if u + v * x else _NAN for x in shares])
+    return array('d', [k if k > 0 else _NAN for k in out])
+
+def difference_grid(c1, c2, kwh_values, shares):
+    """
+    Cost of contract 1 minus contract 2 over the grid: one array('d') row per
+    off-peak share, one column per kWh value. Negative means contract 1 is
+    cheaper. The zero contour is the break-even curve.
+    """
+    d = c1 - c2
+    kwh_values = kwh_values if isinstance(kwh_values, array) else array('d', kwh_values)
+    fixed = d.fixed
+    rows = []
+    for x in shares:
+        k = d.u + d.v * x
+        rows.append(array('d', [e * k + fixed for e in kwh_values]))
+    return rows
+
+def linspace(start, stop, num):
+    if num == 1:
+        return array('d', [start])
+    step = (stop - start) / (num - 1)
+    return array('d', [start + i * step for i in range(num)])
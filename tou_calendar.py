@@ -0,0 +1,147 @@
+"""
+Calendar tables for the TOU engine.
+
+Each day of a year is precomputed into one byte holding its season at
+midnight, its day type (weekday, Saturday, Sunday) and whether it is a DST
+transition day, so classification never repeats date arithmetic per row.
+
+Portugal (mainland) changes clocks at 01:00 UTC on the last Sunday of March
+and October. In local wall time summer time starts at 01:00 WET in March
+(01:00-01:59 does not exist and is treated as summer) and ends at 02:00 WEST
+in October, when 01:00-01:59 occurs twice. The first pass (fold=0) is summer
+and the repeated one (fold=1) is winter.
+"""
+import datetime
+import functools
+
+# Seasons
+WINTER = 0
+SUMMER = 1
+
+# Day types
+WEEKDAY = 0
+SATURDAY = 1
+SUNDAY = 2
+
+# Transition kinds
+NO_TRANSITION = 0
+SPRING_FORWARD = 1
+FALL_BACK = 2
+
+# Local hour at which the season changes on transition days
+SUMMER_START_HOUR = 1
+SUMMER_END_HOUR = 2
+
+HOLIDAY_FLAG = 0x20
+
+def _last_sunday(year, month):
+    last = datetime.date(year, month, 31)
+    return last - datetime.timedelta(days=(last.weekday() + 1) % 7)
+
+@functools.lru_cache(maxsize=None)
+def dst_transitions(year):
+    """(start, end) dates of summer time: last Sundays of March and October."""
+    return _last_sunday(year, 3), _last_sunday(year, 10)
+
+def easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+@functools.lru_cache(maxsize=None)
+def portuguese_holidays(year):
+    """National public holidays in Portugal."""
+    e = easter(year)
+    fixed = [(1, 1), (4, 25), (5, 1), (6, 10), (8, 15), (10, 5), (11, 1), (12, 1), (12, 8), (12, 25)]
+    days = {datetime.date(year, m, d) for m, d in fixed}
+    days.add(e - datetime.timedelta(days=2)) # Sexta-feira Santa
+    days.add(e)                              # Páscoa
+    days.add(e + datetime.timedelta(days=60)) # Corpo de Deus
+    return frozenset(days)
+
+def encode(season, day_type, transition=NO_TRANSITION, holiday=False):
+    return season | (day_type << 1) | (transition << 3) | (HOLIDAY_FLAG if holiday else 0)
+
+def decode(code):
+    """code -> (season at midnight, day type, transition kind)."""
+    return code & 1, (code >> 1) & 3, (code >> 3) & 3
+
+@functools.lru_cache(maxsize=None)
+def year_table(year, holidays=False):
+    """
+    One code per day of `year` (see encode). With holidays=True, national
+    holidays get the SUNDAY day type.
+    """
+    start, end = dst_transitions(year)
+    holiday_dates = portuguese_holidays(year)
+    first = datetime.date(year, 1, 1)
+    ndays = (datetime.date(year + 1, 1, 1) - first).days
+
+    table = bytearray(ndays)
+    weekday = first.weekday()
+    for i in range(ndays):
+        date = first + datetime.timedelta(days=i)
+        day_type = SUNDAY if weekday == 6 else SATURDAY if weekday == 5 else WEEKDAY
+        is_holiday = date in holiday_dates
+        if holidays and is_holiday:
+            day_type = SUNDAY
+
+        if date == start:
+            code = encode(WINTER, day_type, SPRING_FORWARD, is_holiday)
+        elif date == end:
+            code = encode(SUMMER, day_type, FALL_BACK, is_holiday)
+        else:
+            code = encode(SUMMER if start < date < end else WINTER, day_type, NO_TRANSITION, is_holiday)
+        table[i] = code
+        weekday = (weekday + 1) % 7
+    return bytes(table)
+
+def day_code(date, holidays=False):
+    return year_table(date.year, holidays)[date.timetuple().tm_yday - 1]
+
+def is_summer_time(dt):
+    """Summer time at a local wall-clock datetime (see module notes)."""
+    season, _, transition = decode(day_code(dt.date()))
+    if transition == SPRING_FORWARD:
+        return dt.hour >= SUMMER_START_HOUR
+    if transition == FALL_BACK:
+        return dt.hour < SUMMER_END_HOUR and not (dt.fold and dt.hour == SUMMER_END_HOUR - 1)
+    return season == SUMMER
+
+class CalendarTable:
+    """
+    Precomputed day codes for a range of years, indexed by days since
+    January 1st of first_year.
+    """
+    def __init__(self, first_year, last_year, holidays=False):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.holidays = holidays
+        self.origin = datetime.date(first_year, 1, 1).toordinal()
+        self.codes = b''.join(year_table(y, holidays) for y in range(first_year, last_year + 1))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def lookup(self, date):
+        """(season, day type, transition) for a date inside the range."""
+        i = date.toordinal() - self.origin
+        if not 0 <= i < len(self.codes):
+            raise KeyError(f"{date} outside {self.first_year}-{self.last_year}")
+        return decode(self.codes[i])
+
+    def transitions(self):
+        """Yields (date, transition kind) for every DST change in the range."""
+        for i, code in enumerate(self.codes):
+            kind = decode(code)[2]
+            if kind != NO_TRANSITION:
+                yield datetime.date.fromordinal(self.origin + i), kind
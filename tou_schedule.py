@@ -0,0 +1,220 @@
+"""
+Declarative TOU schedules.
+
+A schedule file (JSON) lists, per cycle, season and day type, the intervals
+of each period:
+
+    {"name": "ERSE BTN",
+     "cycles": {"daily": {"winter": {"all": {"peak": ["09:00-10:30", "18:00-20:30"],
+                                            "off_peak": ["22:00-02:00"], ...}},
+                          "summer": {...}}}}
+
+Seasons are "winter" and "summer"; day types are "weekday", "saturday" and
+"sunday", or "all" for a cycle that ignores the day of the week. Intervals
+are "HH:MM-HH:MM" on quarter-hours (an end before the start runs past
+midnight, "24:00" ends at midnight).
+
+Each day is compiled into one 96-bit mask per period (bit n = quarter-hour
+n). Compilation fails with ScheduleError unless the masks of a day are
+mutually exclusive and together cover all 96 quarter-hours, so a gap or an
+overlap in the file cannot fall through to a default period.
+
+Usage:
+    python tou_schedule.py schedules/erse.json   # validate and summarise
+"""
+import functools
+import hashlib
+import json
+import os
+import sys
+
+from tou_calendar import WEEKDAY, SATURDAY, SUNDAY, WINTER, SUMMER
+
+# Period codes of the compiled tables
+PERIODS = ('peak', 'mid_peak', 'off_peak', 'super_off_peak')
+
+SLOTS_PER_DAY = 96 # 15-minute slots
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+SEASONS = {'winter': WINTER, 'summer': SUMMER}
+DAY_TYPES = {'weekday': WEEKDAY, 'saturday': SATURDAY, 'sunday': SUNDAY}
+
+DEFAULT_SCHEDULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedules', 'erse.json')
+
+class ScheduleError(ValueError):
+    pass
+
+def parse_time(text):
+    """'HH:MM' -> quarter-hour slot (0-96)."""
+    try:
+        hours, minutes = (int(v) for v in text.strip().split(':'))
+    except ValueError:
+        raise ScheduleError(f"Invalid time {text!r}, expected HH:MM") from None
+    if minutes % 15 or not 0 <= minutes < 60 or not 0 <= hours * 60 + minutes <= 24 * 60:
+        raise ScheduleError(f"Time {text!r} is not a quarter-hour between 00:00 and 24:00")
+    return hours * 4 + minutes // 15
+
+def interval_mask(text):
+    """'HH:MM-HH:MM' -> bitmask of its quarter-hours."""
+    start, sep, end = text.partition('-')
+    if not sep:
+        raise ScheduleError(f"Invalid interval {text!r}, expected HH:MM-HH:MM")
+    start, end = parse_time(start), parse_time(end)
+    if start == end:
+        raise ScheduleError(f"Empty interval {text!r}")
+    if start < end:
+        return ((1 << end) - 1) ^ ((1 << start) - 1)
+    # Past midnight
+    return (FULL_DAY ^ ((1 << start) - 1)) | ((1 << end) - 1)
+
+def _runs(mask):
+    """Yields (start slot, end slot) of each run of set bits."""
+    slot = 0
+    while slot < SLOTS_PER_DAY:
+        if mask >> slot & 1:
+            start = slot
+            while slot < SLOTS_PER_DAY and mask >> slot & 1:
+                slot += 1
+            yield start, slot
+        else:
+            slot += 1
+
+def describe_mask(mask):
+    """Bitmask -> 'HH:MM-HH:MM, ...' for messages."""
+    return ", ".join(f"{s // 4:02d}:{s % 4 * 15:02d}-{e // 4:02d}:{e % 4 * 15:02d}" for s, e in _runs(mask))
+
+def compile_day(periods, where=''):
+    """
+    {period: [intervals]} -> tuple of one bitmask per PERIODS entry.
+    Raises ScheduleError on unknown periods, overlaps and gaps.
+    """
+    masks = [0] * len(PERIODS)
+    for name, intervals in periods.items():
+        if name not in PERIODS:
+            raise ScheduleError(f"{where}: unknown period {name!r}")
+        if isinstance(intervals, str):
+            intervals = [intervals]
+        code = PERIODS.index(name)
+        for text in intervals:
+            mask = interval_mask(text)
+            if masks[code] & mask:
+                raise ScheduleError(f"{where}: {name} intervals overlap at {describe_mask(masks[code] & mask)}")
+            masks[code] |= mask
+
+    covered = 0
+    for code, mask in enumerate(masks):
+        overlap = covered & mask
+        if overlap:
+            other = next(PERIODS[c] for c in range(code) if masks[c] & overlap)
+            raise ScheduleError(f"{where}: {other} and {PERIODS[code]} overlap at {describe_mask(overlap)}")
+        covered |= mask
+    if covered != FULL_DAY:
+        raise ScheduleError(f"{where}: no period covers {describe_mask(FULL_DAY ^ covered)}")
+    return tuple(masks)
+
+class Schedule:
+    """
+    Compiled schedule: masks[cycle][(season, day_type)] is a tuple of one
+    bitmask per period.
+    """
+    def __init__(self, name, masks):
+        self.name = name
+        self.masks = masks
+        self._tables = {}
+
+    @property
+    def cycles(self):
+        return tuple(self.masks)
+
+    def day_masks(self, cycle_type, season, day_type):
+        try:
+            return self.masks[cycle_type][(season, day_type)]
+        except KeyError:
+            raise KeyError(f"Schedule {self.name!r} has no cycle {cycle_type!r}") from None
+
+    def table(self, cycle_type):
+        """
+        Period codes indexed by (season * 3 + day_type) * SLOTS_PER_DAY + slot.
+        """
+        table = self._tables.get(cycle_type)
+        if table is None:
+            table = bytearray(2 * 3 * SLOTS_PER_DAY)
+            for season in (WINTER, SUMMER):
+                for day_type in (WEEKDAY, SATURDAY, SUNDAY):
+                    base = (season * 3 + day_type) * SLOTS_PER_DAY
+                    for code, mask in enumerate(self.day_masks(cycle_type, season, day_type)):
+                        for start, end in _runs(mask):
+                            table[base + start:base + end] = bytes([code]) * (end - start)
+            table = self._tables[cycle_type] = bytes(table)
+        return table
+
+    def intervals(self, cycle_type, season, day_type):
+        """{period: [(start hour, end hour)]} for one day, in hours."""
+        return {PERIODS[code]: [(s / 4.0, e / 4.0) for s, e in _runs(mask)]
+                for code, mask in enumerate(self.day_masks(cycle_type, season, day_type))}
+
+    def digest(self, cycles=None):
+        """SHA-256 of the compiled tables of `cycles` (default: all)."""
+        h = hashlib.sha256()
+        for cycle_type in cycles or self.cycles:
+            h.update(cycle_type.encode())
+            h.update(self.table(cycle_type))
+        return h.hexdigest()
+
+def parse_schedule(data, name=None):
+    """Compiles a schedule document (see module notes) into a Schedule."""
+    if not isinstance(data, dict) or not isinstance(data.get('cycles'), dict) or not data['cycles']:
+        raise ScheduleError("Schedule needs a non-empty 'cycles' object")
+    name = data.get('name', name)
+    masks = {}
+    for cycle_type, seasons in data['cycles'].items():
+        cycle_masks = {}
+        for season_name in SEASONS:
+            days = (seasons or {}).get(season_name)
+            if not isinstance(days, dict):
+                raise ScheduleError(f"{cycle_type}: missing {season_name} schedule")
+            for key in days:
+                if key != 'all' and key not in DAY_TYPES:
+                    raise ScheduleError(f"{cycle_type}/{season_name}: unknown day type {key!r}")
+            for day_name, day_type in DAY_TYPES.items():
+                periods = days.get(day_name, days.get('all'))
+                where = f"{cycle_type}/{season_name}/{day_name}"
+                if not isinstance(periods, dict):
+                    raise ScheduleError(f"{where}: missing schedule")
+                cycle_masks[(SEASONS[season_name], day_type)] = compile_day(periods, where)
+        masks[cycle_type] = cycle_masks
+    return Schedule(name, masks)
+
+@functools.lru_cache(maxsize=16)
+def _cached_schedule(path, size, mtime_ns):
+    with open(path, 'r') as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise ScheduleError(f"{path}: {e}") from None
+    return parse_schedule(data, os.path.basename(path))
+
+def load_schedule(path=None):
+    """
+    Compiled Schedule from a JSON file (default: schedules/erse.json).
+    Cached per file and reloaded when the file changes.
+    """
+    path = os.path.abspath(path or DEFAULT_SCHEDULE)
+    st = os.stat(path)
+    return _cached_schedule(path, st.st_size, st.st_mtime_ns)
+
+def main():
+    paths = sys.argv[1:] or [DEFAULT_SCHEDULE]
+    failed = False
+    for path in paths:
+        try:
+            schedule = load_schedule(path)
+        except (OSError, ScheduleError) as e:
+            print(f"{path}: {e}")
+            failed = True
+            continue
+        print(f"{path}: {schedule.name}, cycles {', '.join(schedule.cycles)} (version {schedule.digest()[:12]})")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Long-running HTTP/JSON comparison service.
+
+The profile aggregates are loaded once at startup, so each request is only a
+lookup and a few multiplications. Request handling runs in a thread pool so
+large catalogs do not block the event loop.
+
+Endpoints:
+    GET  /health      {"status": "ok"}
+    GET  /stats       request counts and p50/p99 latency per route (ms), result cache
+                      hits/misses under "cache", plus per-phase timings under
+                      "phases" when run with --profile
+    POST /compare     {"ref_kwh": 500, "ref_month": 1, "days": 365, "btn_class": "C", "top": 10,
+                       "contracts": [{"name": .., "tariff_type": .., "cycle": .., "daily_fee": .., "rates": [..]}]}
+    POST /break-even  {"price1": .., "fee1": .., "price2": .., "fee2": .., "days": 365}
+                      or {"contracts": [two contracts as above], "kwh": .., "off_peak_share": ..}
+                      (off_peak_share defaults to the profile's, and is required
+                      when the two TOU contracts use different cycles)
+
+/compare results are memoized (see scenario_cache): in memory, and on disk
+as well with --cache-dir.
+
+Usage:
+    python tou_service.py --port 8080 [--cache-dir ~/.cache/epc]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+# Ensure local modules can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import portugal_tou
+import scenario_cache
+import tariff_catalog
+import timing
+import tou_breakeven
+from price_comparison_argparse import find_break_even
+
+MAX_BODY = 1 << 20
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class BadRequest(ValueError):
+    pass
+
+class LatencyStats:
+    """Request count and latency percentiles over the most recent requests."""
+    def __init__(self, window=10000):
+        self.count = 0
+        self.errors = 0
+        self.samples = collections.deque(maxlen=window)
+
+    def record(self, seconds, ok=True):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.samples.append(seconds)
+
+    def copy(self):
+        other = LatencyStats(self.samples.maxlen)
+        other.count = self.count
+        other.errors = self.errors
+        other.samples.extend(self.samples)
+        return other
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+    def to_dict(self):
+        p50 = self.percentile(50)
+        p99 = self.percentile(99)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'p50_ms': None if p50 is None else p50 * 1000,
+            'p99_ms': None if p99 is None else p99 * 1000,
+        }
+
+def _number(payload, key, default=None):
+    value = payload.get(key, default)
+    if value is None:
+        raise BadRequest(f"'{key}' is required")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"'{key}' must be a number") from None
+
+def _positive_int(payload, key, default=None):
+    value = _number(payload, key, default)
+    if not value.is_integer() or value < 1:
+        raise BadRequest(f"'{key}' must be a positive integer")
+    return int(value)
+
+class ComparisonService:
+    def __init__(self, csv_path=None, cache=None):
+        self.csv_path = csv_path
+        self.index = None
+        self.cache = cache if cache is not None else scenario_cache.ScenarioCache()
+        # Written on the event loop, read by /stats in the executor
+        self.stats = collections.defaultdict(LatencyStats)
+        self._stats_lock = threading.Lock()
+        self.server = None
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/stats'): self.get_stats,
+            ('POST', '/compare'): self.compare,
+            ('POST', '/break-even'): self.break_even,
+        }
+
+    def warm(self):
+        if self.csv_path is None:
+            self.csv_path = portugal_tou.find_profile()
+        self.index = portugal_tou.get_tou_index(self.csv_path)
+
+    def current_index(self):
+        """The profile's TOUIndex, reloaded if the CSV or the schedule changed since warm()."""
+        self.index = portugal_tou.get_tou_index(self.csv_path)
+        return self.index
+
+    # Handlers: payload dict -> response dict. Run in the executor.
+
+    def health(self, payload):
+        return {'status': 'ok'}
+
+    def get_stats(self, payload):
+        with self._stats_lock:
+            snapshot = [(route, stats.copy()) for route, stats in self.stats.items()]
+        result = {route: stats.to_dict() for route, stats in snapshot}
+        result['cache'] = self.cache.stats.to_dict()
+        recorder = timing.current()
+        if recorder is not None:
+            result['phases'] = recorder.to_dict()
+        return result
+
+    def compare(self, payload):
+        ref_kwh = _number(payload, 'ref_kwh')
+        ref_month = int(_number(payload, 'ref_month', 0))
+        days = _number(payload, 'days', 365)
+        index = self.current_index()
+        column = f"BTN {payload.get('btn_class', 'C')} - Wh"
+        if column not in index.names:
+            raise BadRequest(f"Unknown btn_class: {payload.get('btn_class')!r}")
+        if not 0 <= ref_month <= 12:
+            raise BadRequest("'ref_month' must be 0-12")
+
+        contracts = payload.get('contracts')
+        if not isinstance(contracts, list) or not contracts:
+            raise BadRequest("'contracts' must be a non-empty list")
+        offers = self._offers(contracts)
+        top = _positive_int(payload, 'top', len(offers))
+        inputs = {'offers': scenario_cache.offers_key(offers), 'ref_kwh': ref_kwh, 'ref_month': ref_month,
+                  'column': column, 'top': top, 'days': days}
+
+        def compute():
+            consumption = {c: index.query(c, ref_kwh, ref_month, column) for c in portugal_tou.CYCLES}
+            catalog = tariff_catalog.TariffCatalog(offers)
+            results = [
+                {'rank': rank, 'name': offer.name, 'tariff_type': offer.tariff_type,
+                 'cycle': offer.cycle, 'cost': cost}
+                for rank, offer, cost in catalog.rank(consumption, top, days)
+            ]
+            return {
+                'annual_kwh': sum(consumption[portugal_tou.CYCLES[0]].values()),
+                'consumption': consumption,
+                'results': results,
+            }
+        return self.cache.memoize('compare', inputs, compute, index.source_hash, index.schedule_hash)
+
+    def _offers(self, contracts):
+        try:
+            return [tariff_catalog.make_offer(c.get('name', f"Contract {i}"), c['tariff_type'], c.get('cycle'),
+                                              c['daily_fee'], c['rates'])
+                    for i, c in enumerate(contracts, start=1)]
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            raise BadRequest(f"Invalid contract: {e}") from None
+
+    def break_even(self, payload):
+        days = _number(payload, 'days', 365)
+        if 'contracts' in payload:
+            return self._tou_break_even(payload, days)
+        kwh = find_break_even(_number(payload, 'price1'), _number(payload, 'fee1'),
+                              _number(payload, 'price2'), _number(payload, 'fee2'), days)
+        return {'break_even_kwh': kwh}
+
+    def _tou_break_even(self, payload, days):
+        contracts = payload['contracts']
+        if not isinstance(contracts, list) or len(contracts) != 2:
+            raise BadRequest("'contracts' must hold exactly two contracts")
+        offers = self._offers(contracts)
+        index = self.current_index()
+        c1, c2 = tou_breakeven.linear_costs(index, offers, days)
+        if 'off_peak_share' in payload:
+            off_share = _number(payload, 'off_peak_share')
+        else:
+            # The profile's share depends on the cycle (simple offers have none)
+            cycles = {o.cycle for o in offers if o.tariff_type != 'simple'} or {offers[0].cycle}
+            if len(cycles) > 1:
+                raise BadRequest("Contracts use different cycles; 'off_peak_share' is required")
+            off_share = tou_breakeven.profile_shares(index, cycles.pop())['off_peak']
+        result = {
+            'off_peak_share': off_share,
+            'break_even_kwh': tou_breakeven.break_even_kwh(c1, c2, off_share),
+        }
+        if 'kwh' in payload:
+            result['break_even_off_peak_share'] = tou_breakeven.break_even_share(c1, c2, _number(payload, 'kwh'))
+        return result
+
+    # HTTP plumbing
+
+    async def dispatch(self, method, path, body):
+        """Returns (status, response dict)."""
+        route = path.split('?', 1)[0]
+        handler = self.routes.get((method, route))
+        if handler is None:
+            if any(r == route for _, r in self.routes):
+                return 405, {'error': f"{method} not allowed on {route}"}
+            return 404, {'error': f"Unknown path {route}"}
+
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise BadRequest("Request body must be a JSON object")
+        except ValueError as e:
+            return 400, {'error': f"Invalid JSON: {e}"}
+
+        loop = asyncio.get_running_loop()
+        try:
+            return 200, await loop.run_in_executor(None, handler, payload)
+        except BadRequest as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY:
+                    status, response = 413, {'error': 'Request body too large'}
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = await self.dispatch(method, path, body)
+
+                data = json.dumps(response).encode('utf-8')
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                route = path.split('?', 1)[0]
+                if (method, route) not in self.routes:
+                    route = 'unmatched'
+                with self._stats_lock:
+                    self.stats[route].record(time.perf_counter() - started, status < 400)
+                if not keep_alive or status == 413:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.warm)
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+async def serve(host, port, csv_path, cache=None):
+    service = ComparisonService(csv_path, cache)
+    server = await service.start(host, port)
+    print(f"Serving on http://{host}:{service.port}")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the electricity price comparison HTTP service.")
+    parser.add_argument("--host", default='127.0.0.1', help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port (default: 8080)")
+    parser.add_argument("--rlp", help="Load profile CSV (default: latest profile in rlp/)")
+    parser.add_argument("--profile", action='store_true', help="Record per-phase timings, reported by /stats")
+    parser.add_argument("--cache-dir", metavar="DIR", help="Also keep /compare results on disk in DIR")
+    parser.add_argument("--cache-items", type=int, default=scenario_cache.MEMORY_ITEMS,
+                        help=f"Results kept in memory (default: {scenario_cache.MEMORY_ITEMS})")
+    parser.add_argument("--cache-max-mb", type=float, default=scenario_cache.MAX_BYTES / 2**20,
+                        help=f"Disk cache size limit in MB (default: {scenario_cache.MAX_BYTES >> 20})")
+    args = parser.parse_args()
+    if args.profile:
+        timing.enable()
+    cache = scenario_cache.ScenarioCache(args.cache_dir, args.cache_items, int(args.cache_max_mb * 2**20))
+    try:
+        asyncio.run(serve(args.host, args.port, args.rlp, cache))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()